@@ -1,11 +1,8 @@
 import streamlit as st
-import pickle
-import pandas as pd
-import numpy as np
-from sklearn.neighbors import NearestNeighbors
-import difflib
-import os
-from typing import List, Tuple, Optional
+from typing import List, Optional
+from engine import Recommendations, RecommenderEngine
+from ranking import Reranker
+from recommendation import DEFAULT_MIN_SIMILARITY
 
 # Page configuration
 st.set_page_config(
@@ -66,113 +63,50 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 @st.cache_resource
-def load_model_components():
+def load_engine() -> Optional[RecommenderEngine]:
     """
-    Load all pre-trained model components with caching for performance.
+    Load the model once per process (the same engine the API serves);
+    every session shares it.
     """
     try:
-        # Load the dataframe
-        with open('Pkled files/dataframe.pkl', 'rb') as f:
-            df = pickle.load(f)
-        
-        # Load the TF-IDF matrix
-        with open('Pkled files/tfidf_matrix.pkl', 'rb') as f:
-            tfidf_matrix = pickle.load(f)
-        
-        # Load the indices
-        with open('Pkled files/indices.pkl', 'rb') as f:
-            indices = pickle.load(f)
-        
-        # Create and fit the NearestNeighbors model
-        nn_model = NearestNeighbors(
-            n_neighbors=11,
-            metric='cosine',
-            algorithm='brute',
-            n_jobs=-1
-        )
-        nn_model.fit(tfidf_matrix)
-        
-        return df, tfidf_matrix, indices, nn_model
-    
+        return RecommenderEngine()
     except Exception as e:
         st.error(f"Error loading model components: {str(e)}")
-        return None, None, None, None
-
-
+        return None
 
 def get_recommendations(
+    engine: RecommenderEngine,
     movie_title: str,
-    df: pd.DataFrame,
-    tfidf_matrix,
-    indices: pd.Series,
-    nn_model: NearestNeighbors,
-    min_similarity: float = 0.8
-) -> Tuple[List[str], Optional[str]]:
+    min_similarity: float,
+    reranker: Optional[Reranker] = None
+) -> List[dict]:
     """
-    Get movie recommendations based on input title.
-    
+    Get movie recommendations for a title known to the catalog.
+
     Returns:
-        Tuple of (recommended_movies, corrected_title)
+        Recommended movie records (title, overview, genres, poster, year)
     """
     try:
-        # Normalize the input title
-        key = movie_title.lower().strip()
-        corrected_title = None
-        
-        # Require exact match in indices (no auto-correction here)
-        if key not in indices.index:
+        result: Recommendations = engine.recommend(movie_title, min_similarity, reranker=reranker)
+        if not result.found:
             st.error(f"Movie title '{movie_title}' not found.")
-            return [], None
-        
-        # Get the movie ID for the title
-        movie_id = indices[[key]].iloc[0]
-        
-        # Find the row index in the DataFrame
-        movie_row = df[df['id'] == movie_id]
-        if len(movie_row) == 0:
-            st.error(f"Movie with ID {movie_id} not found in DataFrame.")
-            return [], None
-        
-        row_idx = movie_row.index[0]
-        
-        # Get the TF-IDF vector for this movie
-        movie_vector = tfidf_matrix[row_idx]
-        
-        # Find the 11 nearest neighbors (including the movie itself)
-        distances, neighbor_indices = nn_model.kneighbors(movie_vector, return_distance=True)
-        
-        # Remove the first neighbor (it's the movie itself) and get the next 10
-        recommended_indices = neighbor_indices[0][1:11]  # Get indices 1-10
-        
-        # Get the recommended movie titles
-        recommended_movies = df.iloc[recommended_indices]['title'].tolist()
-        
-        return recommended_movies, corrected_title
-    
+        return result.movies
     except Exception as e:
         st.error(f"Error getting recommendations: {str(e)}")
-        return [], None
+        return []
 
-def display_movie_card(movie_title: str, df: pd.DataFrame):
+def display_movie_card(movie: dict):
     """
     Display a movie card with title, year, genres, overview, and poster.
     """
-    # Get movie details from dataframe
-    movie_data = df[df['title'] == movie_title]
-    
-    if len(movie_data) == 0:
-        st.write(f"**{movie_title}**")
-        return
-    
-    movie_info = movie_data.iloc[0]
+    movie_title = movie['title']
     
     # Create columns for poster and details
     col1, col2 = st.columns([1, 3])
     
     with col1:
-        # Get poster path from dataframe
-        poster_path = movie_info.get('poster_path', None)
-        if poster_path and pd.notna(poster_path):
+        poster_path = movie.get('poster_path')
+        if poster_path:
             try:
                 # Construct full poster URL
                 base_url = "https://image.tmdb.org/t/p/"
@@ -187,55 +121,45 @@ def display_movie_card(movie_title: str, df: pd.DataFrame):
             st.write("🎬")  # Placeholder for missing poster
     
     with col2:
-        # Get year from dataframe using the correct column name
-        year = movie_info.get('release_year', None)
+        year = movie.get('release_year')
         
         year_display = f" ({year})" if year else ""
         
-        # Get overview text
-        overview = movie_info.get('overview', 'No overview available.')
-        
-        if overview and pd.notna(overview) and overview != 'No overview available.':
-            overview_display = overview[:300] + "..." if len(overview) > 300 else overview
-        else:
-            overview_display = "No overview available."
+        # Records always carry an overview (a placeholder when missing)
+        overview = movie['overview']
+        overview_display = overview[:300] + "..." if len(overview) > 300 else overview
         
         st.markdown(f"""
         <div class="movie-card">
             <div class="movie-title">{movie_title}{year_display}</div>
-            <div class="movie-genres">{movie_info.get('genres', 'N/A')}</div>
+            <div class="movie-genres">{movie.get('genres') or 'N/A'}</div>
             <div class="movie-overview">{overview_display}</div>
         </div>
         """, unsafe_allow_html=True)
 
-def filter_movies_by_title(df: pd.DataFrame, search_term: str, max_results: int = 20) -> List[str]:
+def filter_movies_by_title(
+    engine: RecommenderEngine,
+    search_term: str,
+    max_results: int = 20,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY
+) -> List[str]:
     """
-    Filter movies by title search term for auto-complete dropdown.
+    Titles to suggest for a search term that is not an exact title.
     
     Args:
-        df: Movie dataframe
+        engine: Loaded recommender engine
         search_term: User input to search for
         max_results: Maximum number of results to return
+        min_similarity: Cutoff for the fuzzy fallback
     
     Returns:
-        List of matching movie titles
+        Matching movie titles (prefix matches first, then partial matches,
+        fuzzy matches when neither exists)
     """
     if not search_term or len(search_term.strip()) < 2:
         return []
     
-    search_term = search_term.lower().strip()
-    
-    # Filter movies that contain the search term
-    mask = df['title'].str.lower().str.contains(search_term, na=False)
-    filtered_movies = df[mask]['title'].tolist()
-    
-    # Sort by relevance (exact matches first, then partial matches)
-    exact_matches = [title for title in filtered_movies if title.lower().startswith(search_term)]
-    partial_matches = [title for title in filtered_movies if title not in exact_matches]
-    
-    # Combine and limit results
-    sorted_results = exact_matches + partial_matches
-    return sorted_results[:max_results]
+    return engine.suggest_titles(search_term, max_results, min_similarity)
 
 def main():
     """
@@ -245,11 +169,11 @@ def main():
     st.markdown('<h1 class="main-header">🎬 Movie Recommendation System</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">Discover your next favorite movie based on content similarity</p>', unsafe_allow_html=True)
     
-    # Load model components
+    # Load the shared engine
     with st.spinner("Loading movie recommendation model..."):
-        df, tfidf_matrix, indices, nn_model = load_model_components()
+        engine = load_engine()
     
-    if df is None:
+    if engine is None:
         st.error("Failed to load model components. Please check if the model files are available.")
         return
     
@@ -261,11 +185,30 @@ def main():
         "Similarity Threshold",
         min_value=0.1,
         max_value=1.0,
-        value=0.8,
+        value=DEFAULT_MIN_SIMILARITY,
         step=0.1,
         help="Minimum similarity for corrected-title suggestions (higher = stricter)"
     )
     
+    # Re-ranking of the similar movies
+    popularity_weight = st.sidebar.slider(
+        "Popularity Boost",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.0,
+        step=0.1,
+        help="Favor well-known movies over obscure ones with similar descriptions"
+    )
+    diversity = st.sidebar.slider(
+        "Diversity",
+        min_value=0.0,
+        max_value=1.0,
+        value=0.0,
+        step=0.1,
+        help="Favor recommendations that differ from each other"
+    )
+    reranker = Reranker(popularity=popularity_weight, diversity=diversity)
+    
     # Main content area
     st.markdown("---")
     
@@ -299,38 +242,19 @@ def main():
     with col2:
         search_button = st.button("🎯 Get Recommendations", use_container_width=True, key="get_recs_button")
 
-    recommended_movies: List[str] = []
-    corrected_title: Optional[str] = None
+    recommended_movies: List[dict] = []
     based_on_title_var: Optional[str] = None
 
     # Handle search
     if search_button and movie_input.strip():
-        user_key = movie_input.lower().strip()
-        if user_key in indices.index:
+        if engine.indices.resolve(movie_input) is not None:
             with st.spinner("Finding similar movies..."):
-                recommended_movies, corrected_title = get_recommendations(
-                    movie_input,
-                    df,
-                    tfidf_matrix,
-                    indices,
-                    nn_model,
-                    similarity_threshold
-                )
+                recommended_movies = get_recommendations(engine, movie_input, similarity_threshold, reranker)
             st.session_state['correction_mode'] = False
             st.session_state['suggestions'] = []
         else:
-            # Build suggestions: first substring matches, then difflib fallback
-            suggestions = filter_movies_by_title(df, movie_input, max_results=20)
-            if not suggestions:
-                close_keys = difflib.get_close_matches(user_key, indices.index, n=10, cutoff=similarity_threshold)
-                suggestions = []
-                for ck in close_keys:
-                    try:
-                        corrected_movie_id = indices[[ck]].iloc[0]
-                        title_candidate = df[df['id'] == corrected_movie_id]['title'].iloc[0]
-                        suggestions.append(title_candidate)
-                    except Exception:
-                        pass
+            # Build suggestions: first substring matches, then fuzzy fallback
+            suggestions = filter_movies_by_title(engine, movie_input, 20, similarity_threshold)
             if suggestions:
                 st.session_state['correction_mode'] = True
                 st.session_state['suggestions'] = suggestions
@@ -344,14 +268,7 @@ def main():
         confirm = st.button("Use selected title")
         if confirm and selected:
             with st.spinner("Finding similar movies..."):
-                recommended_movies, corrected_title = get_recommendations(
-                    selected,
-                    df,
-                    tfidf_matrix,
-                    indices,
-                    nn_model,
-                    similarity_threshold
-                )
+                recommended_movies = get_recommendations(engine, selected, similarity_threshold, reranker)
             # Update state and input field to the selected value
             # Update buffer instead of the widget key after instantiation
             st.session_state['pending_movie_input'] = selected
@@ -366,7 +283,7 @@ def main():
         based_on_title = based_on_title_var or st.session_state.get('pending_movie_input', movie_input)
         st.markdown(f"**Based on:** {based_on_title}")
         for i, movie in enumerate(recommended_movies, 1):
-            display_movie_card(movie, df)
+            display_movie_card(movie)
             if i < len(recommended_movies):
                 st.markdown("---")
     
@@ -0,0 +1,507 @@
+# backend/artifacts.py
+"""
+Memory-mapped, versioned model artifacts.
+
+A model version is a directory holding one raw ``.npy`` file per array
+plus a ``manifest.json`` describing schema version, row count, shapes,
+dtypes and checksums. Arrays are opened with ``mmap_mode='r'`` so several
+workers on one host share the same pages through the OS page cache instead
+of each unpickling a private copy.
+
+``Artifacts/`` keeps each version in ``versions/<version>/`` and names the
+current one in the ``CURRENT`` file. A new version is written completely
+before ``CURRENT`` is replaced with ``os.replace``, so a reader (or a
+crash) sees either the old or the new version, never none. Readers resolve
+``CURRENT`` once per load. The previous version is kept for loads that
+resolved it just before the switch. A directory with ``manifest.json`` at
+its top level (the layout before versions) is still read as one version.
+
+Convert the existing pickles with::
+
+    python artifacts.py convert --pickles "Pkled Files" --output Artifacts
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from dedup import DUPLICATES_PATH
+from ivf import IVF_PATH
+from lsa import LSA_PATH
+from neighbors import NEIGHBORS_PATH, NeighborTable, load_neighbor_table
+from ranking import compute_priors
+
+SCHEMA_VERSION = 1
+ARTIFACT_DIR = 'Artifacts'
+MANIFEST_NAME = 'manifest.json'
+# Pointer to the current version, and the directory of all versions
+CURRENT_NAME = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+# Files of the pickled model, all read by recommendation.load_model_components
+PICKLE_FILES = ('dataframe.pkl', 'tfidf_matrix.pkl', os.path.basename(NEIGHBORS_PATH), os.path.basename(DUPLICATES_PATH))
+# Engine indexes beside the pickles, also used for artifacts built without them
+ENGINE_FILES = (os.path.basename(LSA_PATH), os.path.basename(IVF_PATH))
+
+# Columns served in recommendation payloads, stored as packed UTF-8
+STRING_COLUMNS = ['title', 'overview', 'poster_path', 'genres']
+# Raw TMDB stats behind the re-ranking priors (see ranking.py), float32
+STAT_COLUMNS = ['popularity', 'vote_average', 'vote_count']
+
+
+class StringColumn:
+    """
+    Read-only string column backed by one UTF-8 byte buffer and an offsets
+    array; item ``i`` is ``data[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+        # Indexing memoryviews yields plain ints and bytes without creating
+        # NumPy scalars or arrays, several times faster per item
+        self._offsets_view = memoryview(offsets)
+        self._data_view = memoryview(data)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        offsets = self._offsets_view
+        return self._data_view[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        buf = bytes(self.data)
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets, offsets[1:]):
+            yield buf[start:stop].decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+    def take(self, rows: Sequence[int]) -> List[str]:
+        offsets, data = self._offsets_view, self._data_view
+        return [data[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8') for i in np.asarray(rows).tolist()]
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.data.nbytes
+
+
+def pack_strings(values: Iterable) -> StringColumn:
+    """Pack strings into a StringColumn; missing values become ''."""
+    encoded = [
+        b'' if v is None or (isinstance(v, float) and np.isnan(v)) else str(v).encode('utf-8')
+        for v in values
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return StringColumn(offsets, data)
+
+
+class ModelArtifacts:
+    """Arrays of one artifact directory, opened read-only."""
+
+    def __init__(self, path: str, manifest: dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def n_rows(self) -> int:
+        return self.manifest['n_rows']
+
+    @property
+    def tfidf_matrix(self) -> csr_matrix:
+        return csr_matrix(
+            (self.arrays['tfidf_data'], self.arrays['tfidf_indices'], self.arrays['tfidf_indptr']),
+            shape=tuple(self.manifest['tfidf_shape']),
+            copy=False
+        )
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.arrays['id']
+
+    @property
+    def release_year(self) -> np.ndarray:
+        return self.arrays['release_year']
+
+    def string_column(self, name: str) -> StringColumn:
+        return StringColumn(self.arrays[f'{name}_offsets'], self.arrays[f'{name}_data'])
+
+    @property
+    def neighbor_table(self) -> Optional[NeighborTable]:
+        if 'neighbor_ids' not in self.arrays:
+            return None
+        return NeighborTable(self.arrays['neighbor_ids'], self.arrays['neighbor_scores'])
+
+    @property
+    def lsa_index(self):
+        """Dense LSA engine (see lsa.py), when the build produced one."""
+        if 'lsa_vectors' not in self.arrays:
+            return None
+        from lsa import LSAIndex
+
+        return LSAIndex(self.arrays['lsa_components'], self.arrays['lsa_vectors'])
+
+    @property
+    def ivf_index(self):
+        """IVF approximate index over this matrix (see ivf.py), when built."""
+        if 'ivf_centroids' not in self.arrays:
+            return None
+        from ivf import IVFIndex
+
+        return IVFIndex(
+            self.tfidf_matrix, self.arrays['ivf_centroids'], self.arrays['ivf_offsets'], self.arrays['ivf_rows']
+        )
+
+    @property
+    def vocabulary(self) -> Optional[StringColumn]:
+        """TF-IDF terms in column order (absent for converted pickles)."""
+        if 'vocab_offsets' not in self.arrays:
+            return None
+        return self.string_column('vocab')
+
+    @property
+    def idf(self) -> Optional[np.ndarray]:
+        return self.arrays.get('idf')
+
+    @property
+    def stop_words(self) -> Optional[StringColumn]:
+        """The vectorizer's stop words (absent before they were stored)."""
+        if 'stop_words_offsets' not in self.arrays:
+            return None
+        return self.string_column('stop_words')
+
+    @property
+    def duplicate_clusters(self) -> Optional[np.ndarray]:
+        """Near-duplicate cluster label per row (see dedup.py)."""
+        return self.arrays.get('duplicate_cluster')
+
+    @property
+    def duplicate_threshold(self) -> Optional[float]:
+        if 'duplicate_threshold' not in self.arrays:
+            return None
+        return float(self.arrays['duplicate_threshold'][0])
+
+    @property
+    def priors(self) -> Optional[np.ndarray]:
+        """Re-ranking priors, ``(n_rows, len(ranking.PRIOR_NAMES))`` float32."""
+        return self.arrays.get('priors')
+
+    def to_dataframe(self):
+        """Materialize the serving columns as a DataFrame (decodes every string)."""
+        import pandas as pd
+
+        df = pd.DataFrame({'id': np.asarray(self.ids)})
+        for name in STRING_COLUMNS:
+            df[name] = self.string_column(name).tolist()
+        years = np.asarray(self.release_year)
+        df['release_year'] = years if np.isnan(years).any() else years.astype(np.int64)
+        # Older versions carry no stats; NaN keeps their priors at 0
+        for name in STAT_COLUMNS:
+            df[name] = np.asarray(self.arrays[name]) if name in self.arrays else np.nan
+        df['title_lower'] = df['title'].str.lower().str.strip()
+        return df
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _index_dtype(max_value: int):
+    return np.int32 if max_value < np.iinfo(np.int32).max else np.int64
+
+
+def save_artifacts(
+    output_dir: str,
+    df,
+    tfidf_matrix,
+    neighbor_table: Optional[NeighborTable] = None,
+    extra_arrays: Optional[Dict[str, np.ndarray]] = None,
+    vocabulary: Optional[Sequence[str]] = None,
+    idf: Optional[np.ndarray] = None,
+    stop_words: Optional[Sequence[str]] = None
+) -> dict:
+    """
+    Write an artifact directory from a serving DataFrame and TF-IDF matrix.
+
+    ``vocabulary`` (terms in column order) and ``idf`` freeze the fitted
+    vectorizer so later updates can transform new rows without a refit;
+    its ``stop_words`` let free-text queries be tokenized without
+    scikit-learn.
+
+    The version is assembled in a staging directory, renamed to
+    ``versions/<version>`` and then made current by atomically replacing
+    ``CURRENT``, so readers never observe a half-written or missing
+    version. Versions older than the previous one are removed.
+
+    Returns:
+        The written manifest
+    """
+    matrix = csr_matrix(tfidf_matrix)
+    matrix.sort_indices()
+    n_rows = matrix.shape[0]
+    if len(df) != n_rows:
+        raise ValueError(f"DataFrame has {len(df)} rows but TF-IDF matrix has {n_rows}")
+
+    arrays = {
+        'tfidf_data': matrix.data.astype(np.float32),
+        'tfidf_indices': matrix.indices.astype(_index_dtype(matrix.shape[1])),
+        'tfidf_indptr': matrix.indptr.astype(_index_dtype(matrix.nnz)),
+        'id': df['id'].to_numpy(dtype=np.int64),
+        'release_year': df['release_year'].to_numpy(dtype=np.float32, na_value=np.nan),
+    }
+    for name in STRING_COLUMNS:
+        column = pack_strings(df[name] if name in df else [''] * n_rows)
+        arrays[f'{name}_offsets'] = column.offsets
+        arrays[f'{name}_data'] = column.data
+    if 'popularity' in df:
+        stats = {
+            name: df[name].to_numpy(dtype=np.float32, na_value=np.nan) if name in df else np.full(n_rows, np.nan, np.float32)
+            for name in STAT_COLUMNS
+        }
+        arrays.update(stats)
+        arrays['priors'] = compute_priors(
+            stats['popularity'], stats['vote_average'], stats['vote_count'], arrays['release_year']
+        )
+    if neighbor_table is not None:
+        arrays['neighbor_ids'] = np.ascontiguousarray(neighbor_table.ids, dtype=np.int32)
+        arrays['neighbor_scores'] = np.ascontiguousarray(neighbor_table.scores, dtype=np.float16)
+    if vocabulary is not None:
+        if idf is None or len(idf) != len(vocabulary) or len(vocabulary) != matrix.shape[1]:
+            raise ValueError("vocabulary and idf must both match the TF-IDF columns")
+        column = pack_strings(vocabulary)
+        arrays['vocab_offsets'] = column.offsets
+        arrays['vocab_data'] = column.data
+        arrays['idf'] = np.asarray(idf, dtype=np.float64)
+    if stop_words is not None:
+        column = pack_strings(sorted(stop_words))
+        arrays['stop_words_offsets'] = column.offsets
+        arrays['stop_words_data'] = column.data
+    arrays.update(extra_arrays or {})
+
+    versions_dir = os.path.join(output_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=versions_dir)
+    try:
+        entries = {}
+        for name, array in arrays.items():
+            filename = f'{name}.npy'
+            np.save(os.path.join(staging, filename), np.ascontiguousarray(array))
+            entries[name] = {
+                'file': filename,
+                'dtype': str(array.dtype),
+                'shape': list(array.shape),
+                'sha256': _sha256(os.path.join(staging, filename)),
+            }
+
+        version = hashlib.sha256(
+            ''.join(f"{k}:{v['sha256']}" for k, v in sorted(entries.items())).encode()
+        ).hexdigest()[:16]
+        manifest = {
+            'schema_version': SCHEMA_VERSION,
+            'version': version,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'n_rows': n_rows,
+            'tfidf_shape': list(matrix.shape),
+            'arrays': entries,
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(os.path.join(versions_dir, version)):
+            # Identical content was written before
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, os.path.join(versions_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    previous = _current_name(output_dir)
+    _write_current(output_dir, version)
+    _remove_old_versions(output_dir, keep={version, previous})
+    return manifest
+
+
+def _current_name(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_current(path: str, version: str):
+    fd, tmp = tempfile.mkstemp(prefix='.current-', dir=path)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(version + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, CURRENT_NAME))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _remove_old_versions(path: str, keep: set):
+    versions_dir = os.path.join(path, VERSIONS_DIR)
+    for name in os.listdir(versions_dir):
+        if name not in keep and not name.startswith('.'):
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+    # Files of the unversioned layout are the version before the previous
+    # one once CURRENT existed before this save
+    if None not in keep and os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        for name in os.listdir(path):
+            if name == MANIFEST_NAME or name.endswith('.npy'):
+                os.remove(os.path.join(path, name))
+
+
+def resolve_artifact_dir(path: str = ARTIFACT_DIR) -> str:
+    """
+    Directory of the current version: ``versions/<CURRENT>``, or ``path``
+    itself when it has no ``CURRENT`` (unversioned layout).
+    """
+    name = _current_name(path)
+    return path if name is None else os.path.join(path, VERSIONS_DIR, name)
+
+
+def read_manifest(path: str = ARTIFACT_DIR) -> dict:
+    with open(os.path.join(resolve_artifact_dir(path), MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def artifacts_exist(path: str = ARTIFACT_DIR) -> bool:
+    return os.path.exists(os.path.join(resolve_artifact_dir(path), MANIFEST_NAME))
+
+
+def _files_digest(directory: str, names: Sequence[str]) -> Optional[str]:
+    """Digest of the names, sizes and modification times of the files that exist."""
+    digest = hashlib.sha256()
+    found = False
+    for name in names:
+        file_path = os.path.join(directory, name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+            found = True
+    return digest.hexdigest()[:12] if found else None
+
+
+def current_model_version(path: str = ARTIFACT_DIR, pickle_dir: str = 'Pkled Files') -> str:
+    """
+    Identifier of the model files the process would load: the manifest
+    version for an artifact directory, else a digest of the pickles'
+    names, sizes and modification times. Engine index files beside the
+    pickles (``ENGINE_FILES``) are part of it either way, as
+    ``<version>+<digest>``, so regenerating one is a new version too.
+    """
+    engines = _files_digest(pickle_dir, ENGINE_FILES)
+    if artifacts_exist(path):
+        version = read_manifest(path)['version']
+    else:
+        version = 'pkl-' + (_files_digest(pickle_dir, PICKLE_FILES) or hashlib.sha256().hexdigest()[:12])
+    return version if engines is None else f'{version}+{engines}'
+
+
+def manifest_version(model_version: str) -> str:
+    """The artifact manifest version within a ``current_model_version`` id."""
+    return model_version.partition('+')[0]
+
+
+def load_artifacts(path: str = ARTIFACT_DIR, verify: bool = False, mmap: bool = True) -> ModelArtifacts:
+    """
+    Open an artifact directory.
+
+    Args:
+        path: Artifact directory (its current version is opened)
+        verify: Re-hash every file against the manifest (reads all bytes)
+        mmap: Memory-map arrays instead of reading them into private memory
+
+    Raises:
+        ValueError: On schema version, shape or checksum mismatch
+    """
+    # Resolved once: a version switch during the load does not mix versions
+    path = resolve_artifact_dir(path)
+    manifest = read_manifest(path)
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        raise ValueError(
+            f"Unsupported artifact schema {manifest.get('schema_version')} "
+            f"(expected {SCHEMA_VERSION})"
+        )
+
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        file_path = os.path.join(path, entry['file'])
+        if verify and _sha256(file_path) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {file_path}")
+        array = np.load(file_path, mmap_mode='r' if mmap else None)
+        if list(array.shape) != entry['shape'] or str(array.dtype) != entry['dtype']:
+            raise ValueError(f"{file_path} does not match its manifest entry")
+        arrays[name] = array
+
+    n_rows = manifest['n_rows']
+    if len(arrays['id']) != n_rows or len(arrays['tfidf_indptr']) != n_rows + 1:
+        raise ValueError(f"Artifact arrays in {path} disagree with n_rows={n_rows}")
+
+    return ModelArtifacts(path, manifest, arrays)
+
+
+def convert_pickles(pickle_dir: str = 'Pkled Files', output_dir: str = ARTIFACT_DIR) -> dict:
+    """Convert ``dataframe.pkl``/``tfidf_matrix.pkl`` (and neighbors) to artifacts."""
+    with open(os.path.join(pickle_dir, 'dataframe.pkl'), 'rb') as f:
+        df = pickle.load(f)
+    with open(os.path.join(pickle_dir, 'tfidf_matrix.pkl'), 'rb') as f:
+        tfidf_matrix = pickle.load(f)
+
+    neighbor_table = None
+    neighbors_path = os.path.join(pickle_dir, os.path.basename(NEIGHBORS_PATH))
+    if os.path.exists(neighbors_path):
+        neighbor_table = load_neighbor_table(neighbors_path)
+
+    return save_artifacts(output_dir, df.reset_index(drop=True), tfidf_matrix, neighbor_table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage memory-mapped model artifacts")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convert', help="Convert the pickled model files")
+    convert.add_argument('--pickles', default='Pkled Files')
+    convert.add_argument('--output', default=ARTIFACT_DIR)
+
+    verify = sub.add_parser('verify', help="Check an artifact directory against its manifest")
+    verify.add_argument('path', nargs='?', default=ARTIFACT_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        manifest = convert_pickles(args.pickles, args.output)
+        print(f"Wrote {manifest['n_rows']} rows to {args.output} (version {manifest['version']})")
+    else:
+        artifacts = load_artifacts(args.path, verify=True)
+        print(f"{args.path}: OK, {artifacts.n_rows} rows, version {artifacts.version}")
+
+
+if __name__ == '__main__':
+    main()
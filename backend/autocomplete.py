@@ -0,0 +1,153 @@
+# backend/autocomplete.py
+"""
+Prefix and substring title autocomplete.
+
+Prefix matches come from the normalized titles in sorted order: every
+prefix maps to one contiguous slice (found with two binary searches), which
+is the flattened form of a prefix trie. The most popular rows of each
+one- and two-character prefix are precomputed since those slices cover a
+large part of the catalog. Substring matches come from a bigram/trigram
+inverted index whose posting lists are intersected and then verified.
+
+Results rank prefix matches first and substring matches second, each by
+popularity.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from title_index import normalize_title
+
+# Prefixes up to this length get their top results precomputed
+CACHED_PREFIX_LEN = 2
+MAX_LIMIT = 50
+
+
+def _ngrams(text: str, n: int) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TitleAutocomplete:
+    """
+    Autocomplete index over catalog titles.
+
+    Args:
+        titles: Display titles, one per catalog row
+        ids: TMDB ids aligned with ``titles``
+        years: Release years aligned with ``titles`` (optional)
+        popularity: Higher is more popular; defaults to catalog order, which
+            is popularity order for the notebook-built catalog
+    """
+
+    def __init__(
+        self,
+        titles: Sequence[str],
+        ids: Sequence[int],
+        years: Optional[Sequence] = None,
+        popularity: Optional[Sequence[float]] = None
+    ):
+        self.titles = list(titles)
+        self.ids = np.asarray(ids)
+        self.years = None if years is None else np.asarray(years, dtype=np.float64)
+        n_rows = len(self.titles)
+
+        # rank 0 = most popular
+        if popularity is None:
+            self._rank = np.arange(n_rows, dtype=np.int64)
+        else:
+            self._rank = np.empty(n_rows, dtype=np.int64)
+            self._rank[np.argsort(-np.asarray(popularity, dtype=np.float64), kind='stable')] = np.arange(n_rows)
+
+        keys = [normalize_title(t) for t in self.titles]
+        self._keys = keys
+        self._sorted_rows = np.array(sorted(range(n_rows), key=keys.__getitem__), dtype=np.int64)
+        self._sorted_keys = [keys[r] for r in self._sorted_rows]
+        self._sorted_ranks = self._rank[self._sorted_rows]
+
+        self._prefix_cache: Dict[str, np.ndarray] = {}
+        prefixes = {key[:length] for key in keys for length in range(1, CACHED_PREFIX_LEN + 1) if len(key) >= length}
+        for prefix in prefixes:
+            self._prefix_cache[prefix] = self._prefix_rows(prefix, MAX_LIMIT, use_cache=False)
+
+        # Posting lists hold ranks, not rows, so intersections come out
+        # already sorted by popularity
+        self._row_by_rank = np.empty(n_rows, dtype=np.int64)
+        self._row_by_rank[self._rank] = np.arange(n_rows)
+        postings: Dict[str, List[int]] = {}
+        for rank, row in enumerate(self._row_by_rank.tolist()):
+            key = keys[row]
+            for gram in _ngrams(key, 2) | _ngrams(key, 3):
+                postings.setdefault(gram, []).append(rank)
+        self._postings = {g: np.asarray(ranks, dtype=np.int64) for g, ranks in postings.items()}
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'TitleAutocomplete':
+        years = df['release_year'].to_numpy(dtype=np.float64, na_value=np.nan) if 'release_year' in df else None
+        popularity = df['popularity'].to_numpy(dtype=np.float64) if 'popularity' in df else None
+        return cls(df['title'].tolist(), df['id'].to_numpy(), years, popularity)
+
+    def _top_by_rank(self, rows: np.ndarray, ranks: np.ndarray, limit: int) -> np.ndarray:
+        if len(rows) > limit:
+            keep = np.argpartition(ranks, limit - 1)[:limit]
+            rows, ranks = rows[keep], ranks[keep]
+        return rows[np.argsort(ranks, kind='stable')]
+
+    def _prefix_rows(self, prefix: str, limit: int, use_cache: bool = True) -> np.ndarray:
+        if use_cache and len(prefix) <= CACHED_PREFIX_LEN and limit <= MAX_LIMIT:
+            return self._prefix_cache.get(prefix, self._sorted_rows[:0])[:limit]
+        lo = bisect_left(self._sorted_keys, prefix)
+        # Every key starting with prefix sorts before prefix + U+10FFFF
+        hi = bisect_left(self._sorted_keys, prefix + '\U0010ffff', lo)
+        return self._top_by_rank(self._sorted_rows[lo:hi], self._sorted_ranks[lo:hi], limit)
+
+    def _substring_rows(self, query: str, limit: int, exclude: np.ndarray) -> List[int]:
+        lists = []
+        for gram in _ngrams(query, min(len(query), 3)):
+            ranks = self._postings.get(gram)
+            if ranks is None:
+                return []
+            lists.append(ranks)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ranks in lists[1:]:
+            candidates = np.intersect1d(candidates, ranks, assume_unique=True)
+            if len(candidates) == 0:
+                return []
+
+        # A single gram is the query itself; otherwise the grams only prove
+        # the pieces occur somewhere, so check the full substring
+        verify = len(lists) > 1
+        excluded = set(exclude.tolist())
+        matches = []
+        for rank in candidates.tolist():
+            row = int(self._row_by_rank[rank])
+            if row in excluded or (verify and query not in self._keys[row]):
+                continue
+            matches.append(row)
+            if len(matches) == limit:
+                break
+        return matches
+
+    def search_rows(self, query: str, limit: int = 10) -> List[int]:
+        """Row positions matching ``query``: prefix matches, then substrings."""
+        query = normalize_title(query)
+        limit = max(0, min(limit, MAX_LIMIT))
+        if not query or limit == 0:
+            return []
+
+        prefix_rows = self._prefix_rows(query, limit)
+        rows = prefix_rows.tolist()
+        if len(rows) < limit and len(query) >= 2:
+            rows += self._substring_rows(query, limit - len(rows), prefix_rows)
+        return rows
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Autocomplete suggestions as ``{"title", "id", "release_year"}`` dicts."""
+        results = []
+        for row in self.search_rows(query, limit):
+            year = None
+            if self.years is not None and not np.isnan(self.years[row]):
+                year = int(self.years[row])
+            results.append({"title": self.titles[row], "id": int(self.ids[row]), "release_year": year})
+        return results
@@ -0,0 +1,424 @@
+# backend/benchmark.py
+"""
+Reproducible benchmark and load test for the recommendation backend.
+
+Generates a synthetic TMDB-style catalog of the requested size (the real
+CSV is not needed), builds it with ``build_model.py`` in a child process,
+then serves it in this process through ``main.app`` and measures:
+
+* cold start: importing the API, loading the model, then the first request
+* latency percentiles for exact, fuzzy and batch lookups, calling
+  ``recommendation.py`` directly (no response cache, no HTTP)
+* throughput and latency under concurrent load, sending ``POST /recommend``
+  through the ASGI app in-process (middleware, compute pool and cache included)
+* peak RSS of the build and of the serving process
+
+Results are written as JSON; pass ``--baseline`` with an earlier result to
+print the relative change of every metric.
+
+    python benchmark.py --movies 50000 --output bench.json
+    python benchmark.py --movies 50000 --baseline bench.json
+
+Engine settings come from the usual environment variables
+(``SIMILARITY_ENGINE``, ``RECOMMEND_WORKERS``, ...). A ``--workdir`` that
+already contains ``Artifacts/`` is served as is, so real builds can be
+benchmarked too.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BENCHMARK_VERSION = 1
+
+TMDB_GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+    'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction',
+    'TV Movie', 'Thriller', 'War', 'Western',
+]
+_ONSETS = ['b', 'br', 'c', 'ch', 'd', 'dr', 'f', 'g', 'gr', 'h', 'k', 'l', 'm', 'n', 'p',
+           'pr', 'r', 's', 'sh', 'st', 't', 'tr', 'v', 'w', 'z']
+_VOWELS = ['a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'ou']
+_CODAS = ['', 'n', 'r', 's', 't', 'l', 'nd', 'rk', 'st']
+
+
+def _pseudo_words(n: int, rng: np.random.Generator) -> List[str]:
+    """``n`` distinct pronounceable words of 2-3 syllables."""
+    words = set()
+    while len(words) < n:
+        syllables = rng.integers(2, 4)
+        words.add(''.join(
+            _ONSETS[rng.integers(len(_ONSETS))] + _VOWELS[rng.integers(len(_VOWELS))]
+            for _ in range(syllables)
+        ) + _CODAS[rng.integers(len(_CODAS))])
+    return sorted(words)
+
+
+def _zipf_draw(rng: np.random.Generator, n_words: int, size: int, exponent: float = 1.1) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n_words + 1) ** exponent
+    return rng.choice(n_words, size=size, p=weights / weights.sum())
+
+
+def synthetic_catalog(n_movies: int, seed: int = 0, vocabulary_size: int = 20000):
+    """
+    DataFrame shaped like the TMDB CSV, passing every ``build_model`` filter.
+
+    Overviews and keywords draw from a Zipf-distributed pseudo-word
+    vocabulary, so the TF-IDF matrix has a realistic long tail. About 3% of
+    titles repeat an earlier title with another year (remakes), and titles
+    share words, so fuzzy matching has near neighbors to rank.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    words = np.array(_pseudo_words(vocabulary_size, rng))
+    title_words = np.array([w.capitalize() for w in _pseudo_words(max(500, n_movies // 4), rng)])
+
+    overview_lengths = rng.integers(15, 80, size=n_movies)
+    overview_words = words[_zipf_draw(rng, len(words), int(overview_lengths.sum()))]
+    keyword_lengths = rng.integers(2, 8, size=n_movies)
+    keyword_words = words[_zipf_draw(rng, len(words), int(keyword_lengths.sum()))]
+    overview_bounds = np.concatenate([[0], np.cumsum(overview_lengths)])
+    keyword_bounds = np.concatenate([[0], np.cumsum(keyword_lengths)])
+
+    titles = []
+    for i in range(n_movies):
+        if i > 0 and rng.random() < 0.03:
+            titles.append(titles[rng.integers(i)])
+        else:
+            titles.append(' '.join(rng.choice(title_words, size=rng.integers(1, 5))))
+
+    years = rng.integers(1950, 2026, size=n_movies)
+    return pd.DataFrame({
+        'id': np.arange(1, n_movies + 1) * 7,
+        'title': titles,
+        'release_date': [f'{y}-{m:02d}-{d:02d}' for y, m, d in zip(
+            years, rng.integers(1, 13, size=n_movies), rng.integers(1, 29, size=n_movies)
+        )],
+        'overview': [' '.join(overview_words[a:b]) for a, b in zip(overview_bounds[:-1], overview_bounds[1:])],
+        'genres': [', '.join(rng.choice(TMDB_GENRES, size=rng.integers(1, 4), replace=False))
+                   for _ in range(n_movies)],
+        'original_language': 'en',
+        'keywords': [', '.join(keyword_words[a:b]) for a, b in zip(keyword_bounds[:-1], keyword_bounds[1:])],
+        'popularity': 5.0 + rng.lognormal(1.5, 1.2, size=n_movies),
+        'vote_average': rng.uniform(3.0, 9.0, size=n_movies).round(1),
+        'vote_count': rng.lognormal(4.0, 1.5, size=n_movies).round(),
+        'status': 'Released',
+        'adult': 'False',
+        'poster_path': [f'/synthetic{i}.jpg' for i in range(n_movies)],
+    })
+
+
+def _prepare(workdir: str, n_movies: int, seed: int, neighbors_k: int, n_jobs: int) -> dict:
+    """Child process: write the synthetic CSV and build ``workdir/Artifacts``."""
+    from build_model import build_model
+
+    start = time.perf_counter()
+    csv_path = os.path.join(workdir, 'synthetic.csv')
+    synthetic_catalog(n_movies, seed).to_csv(csv_path, index=False)
+    generate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manifest = build_model(csv_path, os.path.join(workdir, 'Artifacts'), neighbors_k, n_jobs)
+    return {
+        'generate_seconds': generate_seconds,
+        'build_seconds': time.perf_counter() - start,
+        'stages': manifest['build'],
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Count, mean and percentiles of a list of latencies in milliseconds."""
+    if not samples_ms:
+        return {'count': 0}
+    values = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max()),
+    }
+
+
+def _timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return 1000 * (time.perf_counter() - start)
+
+
+def _typo(title: str, rng: np.random.Generator) -> str:
+    """Drop or swap one character inside the title."""
+    pos = int(rng.integers(1, len(title) - 1))
+    if rng.random() < 0.5:
+        return title[:pos] + title[pos + 1:]
+    return title[:pos - 1] + title[pos] + title[pos - 1] + title[pos + 1:]
+
+
+def sample_queries(model, n: int, rng: np.random.Generator) -> Dict[str, List[dict]]:
+    """Exact queries (title + year) and one-typo variants that miss the index."""
+    rows = rng.choice(len(model.movies), size=min(n, len(model.movies)), replace=False)
+    exact, fuzzy = [], []
+    for row in rows.tolist():
+        title, year = model.movies.titles[row], model.movies.year(row)
+        exact.append({'title': title, 'release_year': year})
+        if len(title) >= 6:
+            typo = _typo(title, rng)
+            if typo not in model.indices:
+                fuzzy.append({'title': typo})
+    return {'exact': exact, 'fuzzy': fuzzy}
+
+
+def measure_latency(model, queries: Dict[str, List[dict]], batch_size: int, warmup: int) -> dict:
+    def recommend(query):
+        # Records included, as a front end renders them
+        return model.recommend(query['title'], release_year=query.get('release_year')).movies
+
+    def batch(items):
+        return list(model.iter_batch(items))
+
+    for query in queries['exact'][:warmup]:
+        recommend(query)
+
+    # Batches mix exact and fuzzy queries in the catalog's proportions
+    mixed = [q for pair in zip(queries['exact'], queries['fuzzy']) for q in pair]
+    batches = [mixed[i:i + batch_size] for i in range(0, len(mixed) - batch_size + 1, batch_size)]
+    batch_ms = [_timed(batch, items) for items in batches]
+    return {
+        'exact': summarize([_timed(recommend, q) for q in queries['exact']]),
+        'fuzzy': summarize([_timed(recommend, q) for q in queries['fuzzy']]),
+        'batch': {
+            **summarize(batch_ms),
+            'batch_size': batch_size,
+            'per_item_ms': float(np.sum(batch_ms) / max(1, len(batches) * batch_size)),
+        },
+    }
+
+
+async def asgi_request(app, method: str, path: str, payload: Optional[dict] = None) -> int:
+    """Send one request straight to the ASGI app and return the status code."""
+    body = json.dumps(payload).encode() if payload is not None else b''
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 0), 'server': ('benchmark', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = 0
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # never disconnects; the app cancels this
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _load_test(app, payloads: List[dict], concurrency: int) -> dict:
+    queue = list(reversed(payloads))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker():
+        while queue:
+            payload = queue.pop()
+            start = time.perf_counter()
+            status = await asgi_request(app, 'POST', '/recommend', payload)
+            latencies.append(1000 * (time.perf_counter() - start))
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'requests': len(payloads),
+        'seconds': elapsed,
+        'throughput_rps': len(payloads) / elapsed,
+        'latency': summarize(latencies),
+        'status': statuses,
+    }
+
+
+def measure_load(main_module, queries: Dict[str, List[dict]], concurrency: int, n_requests: int,
+                 rng: np.random.Generator) -> dict:
+    """
+    ``POST /recommend`` at the given concurrency. A quarter of the requests
+    are fuzzy, and queries repeat, so the response cache sees a realistic
+    mix of hits and misses.
+    """
+    pool = queries['exact'] * 3 + queries['fuzzy']
+    payloads = [pool[i] for i in rng.integers(len(pool), size=n_requests)]
+    result = asyncio.run(_load_test(main_module.app, payloads, concurrency))
+    result['cache_hit_rate'] = main_module.serving_model.cache.stats()['hit_rate']
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args) -> dict:
+    result = {
+        'benchmark_version': BENCHMARK_VERSION,
+        'config': {
+            'movies': args.movies, 'seed': args.seed, 'queries': args.queries,
+            'batch_size': args.batch_size, 'concurrency': args.concurrency, 'requests': args.requests,
+            'similarity_engine': os.environ.get('SIMILARITY_ENGINE', 'exact'),
+        },
+        'environment': {
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+    }
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='cinematch-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        if os.path.isdir(os.path.join(workdir, 'Artifacts')):
+            result['build'] = None
+        else:
+            # Built in a child so the build's memory does not count towards serving RSS
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result['build'] = pool.submit(
+                    _prepare, workdir, args.movies, args.seed, args.neighbors_k, args.n_jobs
+                ).result()
+
+        # main loads Artifacts/ relative to the working directory
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            import main
+            import_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            asyncio.run(main.reload_model(force=True))
+            load_seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        from metrics import resident_memory
+
+        model = main.serving_model
+        rng = np.random.default_rng(args.seed)
+        queries = sample_queries(model, args.queries, rng)
+        first_ms = _timed(asyncio.run, asgi_request(main.app, 'POST', '/recommend', queries['exact'][0]))
+        result['cold_start'] = {
+            'import_seconds': import_seconds,
+            'model_load_seconds': load_seconds,
+            'load_stages': model.load_stages,
+            'first_request_ms': first_ms,
+        }
+        result['catalog'] = {
+            'rows': len(model.movies),
+            'features': model.tfidf_matrix.shape[1],
+            'nnz': int(model.tfidf_matrix.nnz),
+            'model_version': model.version,
+        }
+
+        result['latency'] = measure_latency(model, queries, args.batch_size, args.warmup)
+        result['load'] = measure_load(main, queries, args.concurrency, args.requests, rng)
+
+        memory = resident_memory()
+        result['memory'] = {
+            'serving_peak_rss_bytes': memory['peak'],
+            'serving_current_rss_bytes': memory.get('current'),
+            'model_arrays_bytes': model.memory_bytes(),
+            'build_peak_rss_bytes': result['build']['peak_rss_bytes'] if result['build'] else None,
+        }
+    finally:
+        if args.workdir is None and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def _flatten(value, prefix: str = '') -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f'{prefix}{key}.'))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix[:-1]: float(value)}
+    return {}
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """One line per numeric metric present in both results, with the relative change."""
+    old, new = _flatten(baseline), _flatten(current)
+    lines = []
+    for key in sorted(old.keys() & new.keys()):
+        if key.startswith(('config.', 'environment.', 'benchmark_version')):
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else float('nan')
+        lines.append(f'{key:55s} {old[key]:14.3f} -> {new[key]:14.3f}  {change:+7.1f}%')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation backend on a synthetic catalog")
+    parser.add_argument('--movies', type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=500, help="Distinct titles sampled for lookups")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000, help="Requests sent in the load test")
+    parser.add_argument('--neighbors-k', type=int, default=50, help="Neighbor table size for the build (0 to skip)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Build parallelism")
+    parser.add_argument('--workdir', default=None,
+                        help="Build here (or serve its existing Artifacts/); default: a temporary directory")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary directory")
+    parser.add_argument('--output', default=None, help="Write the JSON result here (default: stdout)")
+    parser.add_argument('--baseline', default=None, help="Earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print('\n'.join(compare(baseline, result)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
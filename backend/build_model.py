@@ -0,0 +1,281 @@
+# backend/build_model.py
+"""
+Reproducible offline build of the serving artifacts (replaces the notebook).
+
+    python build_model.py --csv Datasets/TMDB_movie_dataset_v11.csv --output Artifacts
+
+Steps, matching ``main nb.ipynb``:
+
+1. Stream the CSV in chunks, reading only the needed columns with explicit
+   dtypes, and apply the notebook's filters per chunk (non-null release
+   date/overview/genres/language/poster, first occurrence of each id, not
+   adult, released, 1950-2025, popularity > 5, English). Memory is bounded
+   by the chunk size plus the filtered catalog.
+2. Sort by popularity (descending), as the notebook's checkpoint does.
+3. Stem overviews: the distinct words are stemmed once each, in parallel
+   across processes, and the word -> stem map is applied to every row.
+4. Build the soup, fit TfidfVectorizer and optionally the top-K neighbor
+   table, then write the memory-mapped artifact directory, including the
+   vocabulary, IDF weights and stop words, the re-ranking priors and the
+   near-duplicate clusters of dedup.py (and, with
+   ``--pickles``, the legacy pickle files).
+"""
+import argparse
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from artifacts import ARTIFACT_DIR, save_artifacts
+from dedup import DEFAULT_THRESHOLD, cluster_near_duplicates, cluster_sizes, duplicate_arrays, save_duplicates
+from ivf import IVFIndex
+from lsa import LSAIndex, evaluate_recall
+from neighbors import DEFAULT_TOP_K, build_neighbor_table
+from preprocessing import (
+    TFIDF_PARAMS, CachedStemmer, build_soup, clean_text, decade_label, tokenize_overview
+)
+
+DATASET_PATH = 'Datasets/TMDB_movie_dataset_v11.csv'
+CHUNK_SIZE = 100_000
+
+CSV_DTYPES = {
+    'id': 'Int64',
+    'title': 'string',
+    'release_date': 'string',
+    'overview': 'string',
+    'genres': 'string',
+    'original_language': 'category',
+    'keywords': 'string',
+    'popularity': 'float64',
+    'vote_average': 'float64',
+    'vote_count': 'float64',
+    'status': 'category',
+    'adult': 'string',
+    'poster_path': 'string',
+}
+NA_DROP = ['release_date', 'overview', 'genres', 'original_language', 'poster_path']
+# Only feed the re-ranking priors; files without them still build
+OPTIONAL_COLUMNS = ['vote_average', 'vote_count']
+MIN_YEAR, MAX_YEAR = 1950, 2025
+MIN_POPULARITY = 5
+LANGUAGE = 'en'
+
+# Columns kept in the serving DataFrame (the notebook's df3, plus the stats
+# behind the re-ranking priors)
+SERVING_COLUMNS = [
+    'id', 'title', 'overview', 'genres', 'release_year', 'title_lower', 'poster_path',
+    'popularity', 'vote_average', 'vote_count'
+]
+
+
+class _Timer:
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = now - self._last
+        self._last = now
+        print(f"  {stage}: {self.stages[stage]:.2f}s")
+
+
+def read_filtered_catalog(csv_path: str, chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Stream the TMDB CSV and return the filtered catalog, most popular first."""
+    seen_ids = set()
+    kept: List[pd.DataFrame] = []
+
+    columns = set(pd.read_csv(csv_path, nrows=0).columns)
+    missing = [name for name in CSV_DTYPES if name not in columns]
+    if set(missing) - set(OPTIONAL_COLUMNS):
+        raise ValueError(f"{csv_path} is missing columns {missing}")
+    usecols = [name for name in CSV_DTYPES if name in columns]
+
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=CSV_DTYPES, chunksize=chunk_size):
+        chunk = chunk.assign(**{name: np.nan for name in missing})
+        chunk = chunk.dropna(subset=NA_DROP + ['id'])
+        chunk = chunk.fillna({'title': '', 'keywords': '', 'adult': 'False', 'popularity': 0.0})
+
+        # The notebook drops duplicate ids before any other filter, keeping
+        # the first occurrence over the whole file
+        chunk = chunk[~chunk['id'].duplicated()]
+        first_seen = ~chunk['id'].isin(seen_ids)
+        seen_ids.update(chunk['id'].tolist())
+        chunk = chunk[first_seen]
+
+        chunk = chunk[chunk['adult'].str.lower() == 'false']
+        chunk = chunk[chunk['status'] == 'Released']
+        release_date = pd.to_datetime(chunk['release_date'], errors='coerce')
+        chunk = chunk.assign(release_year=release_date.dt.year)
+        chunk = chunk[chunk['release_year'].between(MIN_YEAR, MAX_YEAR)]
+        chunk = chunk[chunk['popularity'] > MIN_POPULARITY]
+        chunk = chunk[chunk['original_language'] == LANGUAGE]
+        kept.append(chunk)
+
+    df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=list(CSV_DTYPES) + ['release_year'])
+    df['id'] = df['id'].astype(np.int64)
+    df['release_year'] = df['release_year'].astype(np.int64)
+    df = df.sort_values('popularity', ascending=False, kind='stable').reset_index(drop=True)
+    df['decade_label'] = df['release_year'].map(decade_label)
+    return df
+
+
+def _stem_words(words: List[str]) -> Dict[str, str]:
+    stemmer = CachedStemmer()
+    return {word: stemmer.stem(word) for word in words}
+
+
+def build_stem_map(token_lists: Iterable[List[str]], n_jobs: int = -1, batch_size: int = 5000) -> Dict[str, str]:
+    """Stem every distinct word once, spread over ``n_jobs`` processes."""
+    vocabulary = sorted({word for tokens in token_lists for word in tokens})
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs <= 1 or len(vocabulary) <= batch_size:
+        return _stem_words(vocabulary)
+
+    stem_map: Dict[str, str] = {}
+    batches = [vocabulary[i:i + batch_size] for i in range(0, len(vocabulary), batch_size)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        for partial in pool.map(_stem_words, batches):
+            stem_map.update(partial)
+    return stem_map
+
+
+def stem_overviews(overviews: List[str], n_jobs: int = -1) -> Tuple[List[str], int]:
+    """Stemmed overviews and the number of distinct words stemmed."""
+    # Tokenize twice rather than holding every token list in memory
+    stem_map = build_stem_map((tokenize_overview(text) for text in overviews), n_jobs)
+    stemmed = [' '.join(stem_map[w] for w in tokenize_overview(text)) for text in overviews]
+    return stemmed, len(stem_map)
+
+
+def build_soups(df: pd.DataFrame, n_jobs: int = -1) -> List[str]:
+    """TF-IDF input per row; cleans ``genres``/``keywords`` in place like the notebook."""
+    stemmed, _ = stem_overviews(df['overview'].tolist(), n_jobs)
+    for col in ['genres', 'keywords']:
+        df[col] = df[col].map(clean_text)
+    return [
+        build_soup(g, k, o, d)
+        for g, k, o, d in zip(df['genres'], df['keywords'], stemmed, df['decade_label'])
+    ]
+
+
+def build_model(
+    csv_path: str = DATASET_PATH,
+    output_dir: str = ARTIFACT_DIR,
+    neighbors_k: int = DEFAULT_TOP_K,
+    n_jobs: int = -1,
+    chunk_size: int = CHUNK_SIZE,
+    pickle_dir: Optional[str] = None,
+    lsa_rank: int = 0,
+    lsa_dtype: str = 'float32',
+    ivf_lists: Optional[int] = None,
+    dedup_threshold: float = DEFAULT_THRESHOLD
+) -> dict:
+    """
+    Run the full pipeline and write the serving artifacts.
+
+    Returns:
+        The artifact manifest, with per-stage timings under ``build``
+    """
+    timer = _Timer()
+    df = read_filtered_catalog(csv_path, chunk_size)
+    timer.mark(f"read + filter ({len(df)} movies)")
+
+    soups = build_soups(df, n_jobs)
+    timer.mark("stem overviews + soup")
+
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    tfidf_matrix = tfidf.fit_transform(soups)
+    del soups
+    timer.mark(f"tf-idf {tfidf_matrix.shape}")
+
+    neighbor_table = None
+    if neighbors_k > 0:
+        neighbor_table = build_neighbor_table(tfidf_matrix, neighbors_k, n_jobs=n_jobs)
+        timer.mark(f"neighbor table (k={neighbor_table.k})")
+
+    extra_arrays = {}
+    if lsa_rank > 0:
+        lsa_index = LSAIndex.fit(tfidf_matrix, lsa_rank, np.dtype(lsa_dtype))
+        extra_arrays = {
+            'lsa_components': lsa_index.components,
+            'lsa_vectors': lsa_index.vectors.astype(lsa_index.dtype),
+        }
+        recall, latency = evaluate_recall(lsa_index, tfidf_matrix)
+        timer.mark(f"lsa rank {lsa_index.rank} (recall@10 {recall:.3f}, {latency:.2f} ms/query)")
+
+    if ivf_lists is not None:
+        ivf_index = IVFIndex.train(tfidf_matrix, ivf_lists or None, n_jobs=n_jobs)
+        extra_arrays.update(ivf_index.arrays())
+        recall, latency = evaluate_recall(ivf_index, tfidf_matrix)
+        timer.mark(
+            f"ivf {ivf_index.n_lists} lists, nprobe {ivf_index.nprobe} "
+            f"(recall@10 {recall:.3f}, {latency:.2f} ms/query)"
+        )
+
+    duplicates = None
+    if dedup_threshold > 0:
+        duplicates = cluster_near_duplicates(tfidf_matrix, dedup_threshold)
+        extra_arrays.update(duplicate_arrays(duplicates, dedup_threshold))
+        timer.mark(f"near-duplicate clusters ({int((cluster_sizes(duplicates) > 1).sum())} movies clustered)")
+
+    df['title_lower'] = df['title'].str.lower().str.strip()
+    serving_df = df[SERVING_COLUMNS].copy()
+    # Vocabulary and IDF are stored so incremental.py can add rows without a refit
+    manifest = save_artifacts(
+        output_dir, serving_df, tfidf_matrix, neighbor_table, extra_arrays,
+        vocabulary=tfidf.get_feature_names_out().tolist(), idf=tfidf.idf_,
+        stop_words=tfidf.get_stop_words()
+    )
+    timer.mark(f"write {output_dir}")
+
+    if pickle_dir:
+        os.makedirs(pickle_dir, exist_ok=True)
+        indices = pd.Series(serving_df['id'].values, index=serving_df['title_lower']).drop_duplicates()
+        for name, obj in (('dataframe', serving_df), ('indices', indices), ('tfidf_matrix', tfidf_matrix)):
+            with open(os.path.join(pickle_dir, f'{name}.pkl'), 'wb') as f:
+                pickle.dump(obj, f)
+        if duplicates is not None:
+            save_duplicates(duplicates, os.path.join(pickle_dir, 'duplicates.npy'))
+        timer.mark(f"write pickles to {pickle_dir}")
+
+    manifest['build'] = timer.stages
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the recommendation model artifacts")
+    parser.add_argument('--csv', default=DATASET_PATH)
+    parser.add_argument('--output', default=ARTIFACT_DIR)
+    parser.add_argument('--neighbors-k', type=int, default=DEFAULT_TOP_K,
+                        help="Top-K neighbor table size (0 to skip)")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--pickles', default=None, metavar='DIR',
+                        help="Also write dataframe/indices/tfidf_matrix pickles to DIR")
+    parser.add_argument('--lsa-rank', type=int, default=0,
+                        help="Also store an LSA engine of this rank (0 to skip)")
+    parser.add_argument('--lsa-dtype', choices=['float32', 'float16'], default='float32')
+    parser.add_argument('--ivf-lists', type=int, default=None,
+                        help="Also store an IVF index with this many lists (0 = sqrt(rows))")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Jaccard threshold for near-duplicate clusters (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"Building model from {args.csv}")
+    start = time.perf_counter()
+    manifest = build_model(
+        args.csv, args.output, args.neighbors_k, args.n_jobs, args.chunk_size, args.pickles,
+        args.lsa_rank, args.lsa_dtype, args.ivf_lists, args.dedup_threshold
+    )
+    print(f"Done in {time.perf_counter() - start:.1f}s: {manifest['n_rows']} movies, version {manifest['version']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+# backend/cache.py
+"""
+Response caching for recommendation endpoints.
+
+Two tiers:
+
+* ``LRUCache`` - in-process, bounded by entry count and by the encoded size
+  of the cached values, with an optional TTL.
+* ``SqliteCache`` - optional file-backed tier that several uvicorn workers
+  on one host can share.
+
+``TieredCache`` checks the local tier first, then the shared one (promoting
+hits), and counts hits and misses per tier. Keys always start with the model
+version, so a new set of artifacts never serves stale entries; the shared
+tier also drops rows written for other versions when it is opened.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Defaults, overridable through the environment
+CACHE_MAX_ENTRIES = int(os.environ.get('RECOMMEND_CACHE_SIZE', 4096))
+CACHE_MAX_BYTES = int(os.environ.get('RECOMMEND_CACHE_BYTES', 64 * 1024 * 1024))
+CACHE_TTL_SECONDS = float(os.environ.get('RECOMMEND_CACHE_TTL', 3600))
+SHARED_CACHE_PATH = os.environ.get('RECOMMEND_SHARED_CACHE')  # sqlite file, off when unset
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+class LRUCache:
+    """Thread-safe LRU cache with entry, byte-size and TTL limits."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl: Optional[float] = CACHE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._data: 'OrderedDict[Hashable, Tuple[Any, int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, size, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self.current_bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        if size is None:
+            size = len(_encode(value))
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else float('inf')
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._data[key] = (value, size, expires)
+            self.current_bytes += size
+            while len(self._data) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+
+class SqliteCache:
+    """
+    File-backed JSON cache shared between processes.
+
+    Rows carry the model version and an expiry time; rows for other versions
+    are deleted when the cache is opened, and the oldest rows are pruned once
+    ``max_entries`` is exceeded.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        path: str,
+        version: str,
+        max_entries: int = CACHE_MAX_ENTRIES * 4,
+        ttl: Optional[float] = CACHE_TTL_SECONDS
+    ):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL, '
+            'expires REAL NOT NULL, created REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_created ON responses (created)')
+        with self._lock:
+            self._conn.execute('DELETE FROM responses WHERE version != ?', (version,))
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(',', ':'))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM responses WHERE key = ? AND version = ?',
+                (self._key(key), self.version)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: Hashable, value: Any, encoded: Optional[bytes] = None):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else float('inf')
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, version, value, expires, created) VALUES (?, ?, ?, ?, ?)',
+                (self._key(key), self.version, encoded if encoded is not None else _encode(value), expires, now)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        self._conn.execute('DELETE FROM responses WHERE expires < ?', (now,))
+        self._conn.execute(
+            'DELETE FROM responses WHERE key IN ('
+            'SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    Local LRU in front of an optional shared tier, with hit/miss counters.
+
+    Keys are tuples; the model version is prepended automatically.
+    """
+
+    def __init__(self, version: str, local: Optional[LRUCache] = None, shared: Optional[SqliteCache] = None):
+        self.version = version
+        self.local = local if local is not None else LRUCache()
+        self.shared = shared
+        self._counts = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, key: tuple) -> Optional[Any]:
+        key = (self.version,) + tuple(key)
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._count('shared_hits')
+                self.local.put(key, value)
+                return value
+        self._count('misses')
+        return None
+
+    def get_local(self, key: tuple) -> Optional[Any]:
+        """Local tier only; counts hits but not misses (follow up with get())."""
+        value = self.local.get((self.version,) + tuple(key))
+        if value is not None:
+            self._count('local_hits')
+        return value
+
+    def put(self, key: tuple, value: Any):
+        key = (self.version,) + tuple(key)
+        encoded = _encode(value)
+        self.local.put(key, value, size=len(encoded))
+        if self.shared is not None:
+            self.shared.put(key, value, encoded=encoded)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = sum(counts.values())
+        hits = counts['local_hits'] + counts['shared_hits']
+        return {
+            'model_version': self.version,
+            **counts,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'local_entries': len(self.local),
+            'local_bytes': self.local.current_bytes,
+            'shared_enabled': self.shared is not None,
+        }
+
+
+def create_response_cache(version: str) -> TieredCache:
+    """Cache configured from the environment (shared tier only if a path is set)."""
+    shared = SqliteCache(SHARED_CACHE_PATH, version) if SHARED_CACHE_PATH else None
+    return TieredCache(version, LRUCache(), shared)
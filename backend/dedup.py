@@ -0,0 +1,180 @@
+# backend/dedup.py
+"""
+Offline near-duplicate clustering with MinHash/LSH over TF-IDF terms.
+
+Re-releases, director's cuts and sequels that reuse an overview end up
+with almost the same TF-IDF terms and crowd each other's recommendation
+lists. The build treats each movie as its set of TF-IDF terms and computes
+``NUM_PERM`` MinHash values per movie, one per random hash of the term
+ids. It then buckets movies by bands of ``NUM_PERM / BANDS`` values.
+Movies sharing a bucket in any band are candidates. A candidate pair is
+kept when the MinHash estimate of their Jaccard similarity reaches the
+threshold. Clusters are the connected components of the kept pairs, and
+each is labelled by its first (most popular) row.
+
+The result is one int32 label per row (a movie outside any cluster is its
+own label), stored with the artifacts. At query time results keep only the
+first movie per label and drop the seed's own duplicates (see
+recommendation.py), which costs a lookup per candidate.
+
+    python dedup.py build --threshold 0.8
+    python dedup.py report --top 20
+"""
+import argparse
+from typing import Optional
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+DUPLICATES_PATH = 'Pkled Files/duplicates.npy'
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 64
+# 8 bands of 8 values: pairs at Jaccard 0.8 become candidates with
+# probability 0.98, pairs at 0.5 with 0.03
+BANDS = 8
+# Movies with fewer terms (no overview, only genres and a decade) look
+# alike without being duplicates and never join a cluster
+MIN_TERMS = 10
+
+_PRIME = (1 << 31) - 1
+
+
+def minhash_signatures(tfidf_matrix, num_perm: int = NUM_PERM, seed: int = 0) -> np.ndarray:
+    """
+    MinHash of every row's term set, ``(n_rows, num_perm)`` uint32; empty
+    rows get the maximum value everywhere.
+    """
+    matrix = csr_matrix(tfidf_matrix)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+    terms = np.arange(matrix.shape[1], dtype=np.int64)
+    signatures = np.full((matrix.shape[0], num_perm), _PRIME, dtype=np.uint32)
+    nonempty = np.flatnonzero(np.diff(matrix.indptr))
+    if len(nonempty) == 0:
+        return signatures
+    starts = matrix.indptr[nonempty]
+    for i in range(num_perm):
+        # Universal hash of each term id, gathered per stored entry
+        hashed = ((a[i] * terms + b[i]) % _PRIME).astype(np.uint32)
+        signatures[nonempty, i] = np.minimum.reduceat(hashed[matrix.indices], starts)
+    return signatures
+
+
+def _candidate_pairs(signatures: np.ndarray, rows: np.ndarray, bands: int) -> np.ndarray:
+    """Pairs of ``rows`` that share a bucket in some band (adjacent members of each bucket)."""
+    width = signatures.shape[1] // bands
+    rng = np.random.default_rng(1)
+    pairs = []
+    for band in range(bands):
+        block = signatures[rows, band * width:(band + 1) * width].astype(np.uint64)
+        # Random odd multipliers, wrapping in uint64, hash a band into one key
+        multipliers = rng.integers(1, 1 << 62, size=width, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        keys = (block * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        same = np.flatnonzero(keys[order][1:] == keys[order][:-1])
+        pairs.append(np.column_stack([rows[order[same]], rows[order[same + 1]]]))
+    return np.unique(np.concatenate(pairs), axis=0) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def cluster_near_duplicates(
+    tfidf_matrix,
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+    min_terms: int = MIN_TERMS
+) -> np.ndarray:
+    """
+    Cluster label per row: the smallest row of its near-duplicate cluster.
+
+    Args:
+        threshold: Estimated Jaccard similarity of the term sets at which
+            two movies are duplicates
+    """
+    # Build-time only; the serving side reads DUPLICATES_PATH without it
+    from scipy.sparse.csgraph import connected_components
+
+    matrix = csr_matrix(tfidf_matrix)
+    n_rows = matrix.shape[0]
+    labels = np.arange(n_rows, dtype=np.int32)
+    rows = np.flatnonzero(np.diff(matrix.indptr) >= min_terms)
+    if len(rows) < 2:
+        return labels
+    signatures = minhash_signatures(matrix, num_perm)
+    pairs = _candidate_pairs(signatures, rows, bands)
+    if len(pairs) == 0:
+        return labels
+    # Share of equal MinHash values estimates the Jaccard similarity
+    agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[agreement >= threshold]
+    graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n_rows, n_rows))
+    _, component = connected_components(graph, directed=False)
+    # Label each component by its first row
+    first = np.full(component.max() + 1, n_rows, dtype=np.int64)
+    np.minimum.at(first, component, np.arange(n_rows))
+    return first[component].astype(np.int32)
+
+
+def duplicate_arrays(labels: np.ndarray, threshold: float) -> dict:
+    """Artifact arrays for the cluster labels (see artifacts.save_artifacts)."""
+    return {
+        'duplicate_cluster': labels.astype(np.int32),
+        # Kept so incremental updates recluster with the build's setting
+        'duplicate_threshold': np.array([threshold], dtype=np.float32),
+    }
+
+
+def save_duplicates(labels: np.ndarray, path: str = DUPLICATES_PATH):
+    np.save(path, labels.astype(np.int32))
+
+
+def load_duplicates(path: str = DUPLICATES_PATH) -> np.ndarray:
+    return np.load(path)
+
+
+def cluster_sizes(labels: np.ndarray) -> np.ndarray:
+    """Size of each row's cluster."""
+    return np.bincount(labels, minlength=len(labels))[labels]
+
+
+def main():
+    from lsa import load_engine_inputs
+
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate movies (MinHash/LSH)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Cluster the catalog and save the labels (for the pickled model)")
+    build.add_argument('--matrix', default=None, help="TF-IDF pickle (default: Artifacts/ if present)")
+    build.add_argument('--output', default=DUPLICATES_PATH)
+    build.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    report = sub.add_parser('report', help="Print the largest clusters")
+    report.add_argument('--matrix', default=None)
+    report.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    report.add_argument('--top', type=int, default=20)
+
+    args = parser.parse_args()
+    tfidf_matrix, artifacts = load_engine_inputs(args.matrix)
+    labels = cluster_near_duplicates(tfidf_matrix, args.threshold)
+    clustered = int((cluster_sizes(labels) > 1).sum())
+    n_clusters = len(np.unique(labels[cluster_sizes(labels) > 1]))
+    print(f"{clustered} of {len(labels)} movies in {n_clusters} near-duplicate clusters")
+    if args.command == 'build':
+        save_duplicates(labels, args.output)
+        print(f"Saved cluster labels to {args.output}")
+        return
+
+    titles: Optional[list] = None
+    if artifacts is not None:
+        titles = artifacts.string_column('title')
+    counts = np.bincount(labels, minlength=len(labels))
+    for label in np.argsort(-counts, kind='stable')[:args.top]:
+        if counts[label] < 2:
+            break
+        members = np.flatnonzero(labels == label)
+        names = [titles[row] for row in members[:5]] if titles is not None else members[:5].tolist()
+        print(f"{counts[label]:4d}  {names}")
+
+
+if __name__ == '__main__':
+    main()
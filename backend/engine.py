@@ -0,0 +1,243 @@
+# backend/engine.py
+"""
+One object per process that owns a loaded model and answers queries.
+
+Both front ends go through ``RecommenderEngine``: the FastAPI app creates
+it in its lifespan and swaps it on reload, the Streamlit app keeps one in
+``st.cache_resource``. It holds the catalog, the TF-IDF matrix, the title
+index, the kNN engine, autocomplete, filters, the free-text query
+vectorizer and the response cache. Its query methods return
+``Recommendations``: result rows that render to full movie records (see
+``MovieStore.records``) or to cached JSON fragments (see responses.py), so
+callers never look movies up again.
+"""
+import time
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from artifacts import current_model_version
+from autocomplete import TitleAutocomplete
+from cache import create_response_cache
+from filters import CatalogFilters
+from metrics import stage_timer
+from movie_store import MovieStore
+from postings import PostingIndex
+from ranking import Reranker
+from responses import MovieFragments
+from recommendation import (
+    DEFAULT_MIN_SIMILARITY, get_multi_seed_recommendations, iter_batch_recommendations,
+    load_model_components, recommend_for_query, recommend_for_row, resolve_title
+)
+from text_search import QueryVectorizer, load_query_vectorizer
+from title_index import normalize_title
+
+
+class Recommendations:
+    """
+    Result of a query, as catalog rows; movie records are built on access.
+
+    Attributes:
+        rows: Recommended rows, best first
+        seed_rows: Rows the query resolved to
+        unresolved: Queries (titles or seed dicts) that matched nothing
+        corrected_title: Matched title when a single title needed fuzzy
+            correction
+    """
+
+    __slots__ = ('store', 'rows', 'seed_rows', 'unresolved', 'corrected_title')
+
+    def __init__(
+        self,
+        store: MovieStore,
+        rows: Sequence[int],
+        seed_rows: Sequence[int],
+        unresolved: Optional[list] = None,
+        corrected_title: Optional[str] = None
+    ):
+        self.store = store
+        self.rows = [int(row) for row in rows]
+        self.seed_rows = [int(row) for row in seed_rows]
+        self.unresolved = unresolved or []
+        self.corrected_title = corrected_title
+
+    @property
+    def movies(self) -> List[dict]:
+        """Recommended movie records, best first."""
+        return self.store.records(self.rows)
+
+    @property
+    def seeds(self) -> List[dict]:
+        """Records of the movies the query resolved to."""
+        return self.store.records(self.seed_rows)
+
+    @property
+    def found(self) -> bool:
+        return bool(self.seed_rows)
+
+    @property
+    def seed(self) -> Optional[dict]:
+        """The first resolved movie (the only one for single-title queries)."""
+        return self.store.record(self.seed_rows[0]) if self.seed_rows else None
+
+
+class RecommenderEngine:
+    """
+    Everything needed to serve one model version.
+
+    Construction loads the current model files. The instance is read-only
+    afterwards (apart from its cache), so one copy can be shared by all
+    requests or Streamlit sessions of a process, and replacing a loaded
+    model is a single reference swap.
+    """
+
+    def __init__(self):
+        # Version first: if the files change during the load, the next
+        # reload check sees a newer version and loads again
+        self.version = current_model_version()
+        start = time.perf_counter()
+        # Seconds per load stage, reported by /readyz and /metrics
+        self.load_stages = {}
+        self.movies, self.tfidf_matrix, self.indices, self.nn_model, self.neighbor_table = \
+            load_model_components(timings=self.load_stages)
+        stage_start = time.perf_counter()
+        self.autocomplete = TitleAutocomplete(self.movies.titles, self.movies.ids, self.movies.years)
+        self.filters = CatalogFilters(self.movies.years, self.movies.genres)
+        # Responses are cached per model version, so new artifacts never hit old entries
+        self.cache = create_response_cache(self.version)
+        # Encoded movie JSON for API responses (see responses.py)
+        self.fragments = MovieFragments(self.movies)
+        self.load_stages['autocomplete_filters'] = time.perf_counter() - stage_start
+        stage_start = time.perf_counter()
+        # Free-text search; None for models without a stored vocabulary
+        self.query_vectorizer: Optional[QueryVectorizer] = load_query_vectorizer(self.version)
+        self.load_stages['query_vectorizer'] = time.perf_counter() - stage_start
+        self.load_seconds = time.perf_counter() - start
+
+    def __len__(self) -> int:
+        return len(self.movies)
+
+    def memory_bytes(self) -> dict:
+        """Approximate footprint of the large model arrays."""
+        matrix = self.tfidf_matrix
+        footprint = {
+            'tfidf': matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes,
+            'movie_store': self.movies.nbytes,
+        }
+        if self.neighbor_table is not None:
+            footprint['neighbor_table'] = self.neighbor_table.ids.nbytes + self.neighbor_table.scores.nbytes
+        if isinstance(self.nn_model, PostingIndex):
+            footprint['postings'] = self.nn_model.nbytes
+        return footprint
+
+    def mask(
+        self,
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        genres: Optional[Sequence[str]] = None,
+        exclude_genres: Optional[Sequence[str]] = None,
+        decades: Optional[Sequence[str]] = None,
+        exclude_ids: Optional[Sequence[int]] = None
+    ) -> Optional[np.ndarray]:
+        """Candidate mask for the given filters (None when nothing is filtered)."""
+        exclude_rows = [self.indices.row_for_id(i) for i in exclude_ids or []]
+        return self.filters.mask(
+            year_min, year_max, genres, exclude_genres, decades,
+            [row for row in exclude_rows if row is not None]
+        )
+
+    def recommend(
+        self,
+        title: Optional[str],
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        release_year: Optional[int] = None,
+        k: int = 10,
+        offset: int = 0,
+        mask: Optional[np.ndarray] = None,
+        reranker: Optional[Reranker] = None,
+        movie_id: Optional[int] = None
+    ) -> Recommendations:
+        """
+        Recommendations ``offset .. offset + k`` for one title, or for the
+        TMDB ``movie_id`` when given (no title matching at all).
+        """
+        if movie_id is not None:
+            row_idx, corrected_title = self.indices.row_for_id(movie_id), None
+        else:
+            row_idx, corrected_title = resolve_title(title, self.movies, self.indices, min_similarity, release_year)
+        if row_idx is None:
+            return Recommendations(self.movies, [], [], [title if movie_id is None else movie_id])
+        rows = recommend_for_row(
+            row_idx, self.movies, self.tfidf_matrix, self.nn_model, self.neighbor_table, k, offset, mask, reranker
+        )
+        return Recommendations(self.movies, rows, [row_idx], corrected_title=corrected_title)
+
+    def same_title_rows(self, row: int) -> List[int]:
+        """Other movies titled like ``row`` (remakes, same-named films), most popular first."""
+        return [other for other in self.indices.rows_for_title(self.movies.titles[row]) if other != row]
+
+    def recommend_multi(
+        self,
+        seeds: Sequence[dict],
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        method: str = 'centroid',
+        k: int = 10,
+        offset: int = 0,
+        mask: Optional[np.ndarray] = None,
+        reranker: Optional[Reranker] = None
+    ) -> Recommendations:
+        """"More like these" for seed query dicts (see get_multi_seed_recommendations)."""
+        rows, seed_rows, unresolved = get_multi_seed_recommendations(
+            seeds, self.movies, self.tfidf_matrix, self.indices, self.nn_model, min_similarity,
+            neighbor_table=self.neighbor_table, method=method, k=k, offset=offset, mask=mask, reranker=reranker
+        )
+        return Recommendations(self.movies, rows, seed_rows, unresolved)
+
+    def search(
+        self,
+        text: str,
+        k: int = 10,
+        offset: int = 0,
+        mask: Optional[np.ndarray] = None,
+        reranker: Optional[Reranker] = None
+    ) -> Recommendations:
+        """
+        Movies ``offset .. offset + k`` best matching a free-text description
+        (there are no seed rows).
+
+        Raises:
+            ValueError: When the model has no stored vocabulary
+        """
+        if self.query_vectorizer is None:
+            raise ValueError("Text search needs artifacts built by build_model.py")
+        with stage_timer('vectorize'):
+            query = self.query_vectorizer.transform(text)
+        rows = recommend_for_query(query, self.movies, self.tfidf_matrix, self.nn_model, k, offset, mask, reranker)
+        return Recommendations(self.movies, rows, [])
+
+    def iter_batch(
+        self,
+        queries: Iterable[dict],
+        min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ) -> Iterator[dict]:
+        """Per-query result dicts in order (see iter_batch_recommendations)."""
+        return iter_batch_recommendations(
+            queries, self.movies, self.tfidf_matrix, self.indices, self.nn_model, min_similarity,
+            neighbor_table=self.neighbor_table
+        )
+
+    def suggest_titles(
+        self,
+        query: str,
+        limit: int = 10,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ) -> List[str]:
+        """
+        Titles to offer for an unknown query: prefix/substring matches
+        first, fuzzy matches when there are none.
+        """
+        titles = [movie['title'] for movie in self.autocomplete.search(query, limit)]
+        if not titles:
+            keys = self.indices.fuzzy.get_close_matches(normalize_title(query), n=limit, cutoff=min_similarity)
+            titles = [self.movies.titles[self.indices.resolve(key)] for key in keys]
+        return titles
@@ -0,0 +1,135 @@
+# backend/filters.py
+"""
+Catalog filters as boolean row masks.
+
+Genres are encoded once per model as a 64-bit set per row (one bit per
+distinct genre), and years as a float array, so building the mask for a
+request is a handful of vectorized comparisons over the catalog. The mask
+is then applied inside similarity scoring (see ``recommendation.py``):
+rejected rows can never take a result slot, so a filtered request still
+returns the full page instead of whatever survives a post-filter.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+MAX_GENRES = 64
+_DECADE = re.compile(r'^(\d{3})0s$')
+
+
+def split_genres(genres: str) -> List[str]:
+    """``"Action, Science Fiction"`` -> ``['action', 'science fiction']``."""
+    return [g.strip().lower() for g in str(genres).split(',') if g.strip()]
+
+
+def parse_decade(label) -> int:
+    """
+    ``"1990s"`` or ``1990`` -> 1990.
+
+    Raises:
+        ValueError: For anything else, e.g. ``"nineties"``
+    """
+    text = str(label).strip().lower()
+    match = _DECADE.match(text)
+    if match:
+        return int(match.group(1)) * 10
+    if not text.isdigit():
+        raise ValueError(f"Invalid decade {label!r}, expected e.g. '1990s' or 1990")
+    return (int(text) // 10) * 10
+
+
+class CatalogFilters:
+    """
+    Per-row filter columns for one catalog.
+
+    Args:
+        years: Release year per row, NaN when unknown
+        genres: Comma-separated genre string per row
+    """
+
+    def __init__(self, years: Sequence, genres: Sequence[str]):
+        self.years = np.asarray(years, dtype=np.float64)
+        self.genre_bits: Dict[str, np.uint64] = {}
+        # Few distinct genre strings repeat over the catalog; parse each once
+        value_bits: Dict[str, int] = {}
+        bits = np.zeros(len(self.years), dtype=np.uint64)
+        for row, value in enumerate(genres):
+            row_bits = value_bits.get(value)
+            if row_bits is None:
+                row_bits = value_bits[value] = self._parse_genres(value)
+            bits[row] = row_bits
+        self.row_genres = bits
+
+    def _parse_genres(self, value: str) -> int:
+        row_bits = 0
+        for genre in split_genres(value):
+            bit = self.genre_bits.get(genre)
+            if bit is None:
+                if len(self.genre_bits) == MAX_GENRES:
+                    continue
+                bit = self.genre_bits[genre] = np.uint64(1 << len(self.genre_bits))
+            row_bits |= int(bit)
+        return row_bits
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    @property
+    def genres(self) -> List[str]:
+        return list(self.genre_bits)
+
+    def unknown_genres(self, genres: Iterable[str]) -> List[str]:
+        """The given genres that no movie of the catalog has."""
+        return [genre for genre in genres if genre.strip().lower() not in self.genre_bits]
+
+    def _genre_mask(self, genres: Iterable[str]) -> np.uint64:
+        # Unknown genres match nothing rather than raising
+        bits = 0
+        for genre in genres:
+            bits |= int(self.genre_bits.get(genre.strip().lower(), 0))
+        return np.uint64(bits)
+
+    def mask(
+        self,
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        genres: Optional[Iterable[str]] = None,
+        exclude_genres: Optional[Iterable[str]] = None,
+        decades: Optional[Iterable] = None,
+        exclude_rows: Optional[Iterable[int]] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Boolean mask of allowed rows, or None when nothing is filtered.
+
+        Args:
+            year_min, year_max: Inclusive release-year bounds (unknown years fail)
+            genres: Keep movies with at least one of these genres
+            exclude_genres: Drop movies with any of these genres
+            decades: Keep movies from these decades (``"1990s"`` or 1990)
+            exclude_rows: Row positions to drop
+        """
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if year_min is not None:
+            narrow(self.years >= year_min)
+        if year_max is not None:
+            narrow(self.years <= year_max)
+        if decades:
+            starts = np.array(sorted({parse_decade(d) for d in decades}), dtype=np.float64)
+            narrow(np.isin(np.floor(self.years / 10) * 10, starts))
+        if genres:
+            narrow((self.row_genres & self._genre_mask(genres)) != 0)
+        if exclude_genres:
+            narrow((self.row_genres & self._genre_mask(exclude_genres)) == 0)
+
+        exclude_rows = list(exclude_rows or [])
+        if exclude_rows:
+            if mask is None:
+                mask = np.ones(len(self), dtype=bool)
+            mask[exclude_rows] = False
+        return mask
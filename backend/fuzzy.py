@@ -0,0 +1,117 @@
+# backend/fuzzy.py
+"""
+Fast fuzzy title matching.
+
+``difflib.get_close_matches`` runs a SequenceMatcher against every title in
+the catalog. FuzzyMatcher instead keeps a character trigram inverted index:
+a query's trigrams select a short list of candidates by Dice overlap, and
+only those are scored with SequenceMatcher. Scores are therefore exactly
+difflib's ``ratio()``, so existing ``cutoff``/``min_similarity`` values keep
+their meaning, but the result set is approximate: a key outside the
+trigram-ranked candidates (or sharing no trigram with the query) is never
+scored, even if difflib would have returned it.
+"""
+import heapq
+from difflib import SequenceMatcher
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _trigrams(text: str) -> set:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyMatcher:
+    """
+    Trigram candidate index over a fixed list of keys.
+
+    Args:
+        keys: Normalized strings to match against (e.g. lowercase titles)
+        candidates: Minimum number of trigram-ranked candidates verified
+            with SequenceMatcher per query (at least ``2 * n`` are checked)
+    """
+
+    def __init__(self, keys: Sequence[str], candidates: int = 32):
+        self.keys = list(keys)
+        self.candidates = candidates
+        self._lengths = np.fromiter((len(k) for k in self.keys), dtype=np.int32, count=len(self.keys))
+
+        postings: Dict[str, List[int]] = {}
+        gram_counts = np.zeros(len(self.keys), dtype=np.int32)
+        for i, key in enumerate(self.keys):
+            grams = _trigrams(key)
+            gram_counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._gram_counts = gram_counts
+        self._postings = {g: np.asarray(rows, dtype=np.int32) for g, rows in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def match(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[Tuple[str, float]]:
+        """
+        Best matches for ``word`` with their SequenceMatcher ratio.
+
+        Returns:
+            Up to ``n`` (key, score) pairs with score >= ``cutoff``, best first
+        """
+        if n <= 0 or not word or not self.keys:
+            return []
+
+        grams = _trigrams(word)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        rows = np.flatnonzero(overlap)
+        lengths = self._lengths[rows]
+        # ratio() can never exceed 2*min(len)/sum(len); skip keys that can't pass
+        length = len(word)
+        possible = 2.0 * np.minimum(lengths, length) / (lengths + length) >= cutoff
+        rows = rows[possible]
+        if len(rows) == 0:
+            return []
+        dice = overlap[rows] / (self._gram_counts[rows] + len(grams))
+
+        n_candidates = min(max(self.candidates, 2 * n), len(rows))
+        top = rows[np.argpartition(-dice, n_candidates - 1)[:n_candidates]]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        # quick_ratio() is a cheap upper bound on ratio(); verify candidates
+        # in bound order and stop once no remaining one can enter the top n.
+        bounded = []
+        for i in top.tolist():
+            matcher.set_seq1(self.keys[i])
+            if matcher.real_quick_ratio() >= cutoff:
+                bound = matcher.quick_ratio()
+                if bound >= cutoff:
+                    bounded.append((bound, i))
+        bounded.sort(reverse=True)
+
+        best: List[Tuple[float, str]] = []
+        for bound, i in bounded:
+            if len(best) == n and best[0][0] > bound:
+                break
+            matcher.set_seq1(self.keys[i])
+            score = matcher.ratio()
+            if score >= cutoff:
+                item = (score, self.keys[i])
+                if len(best) < n:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        return [(key, score) for score, key in sorted(best, reverse=True)]
+
+    def get_close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        """
+        Approximate ``difflib.get_close_matches`` over the keys: only the
+        ``max(candidates, 2 * n)`` keys with the best trigram overlap (32 by
+        default) are scored, so a match outside them can be missed.
+        """
+        return [key for key, _ in self.match(word, n, cutoff)]
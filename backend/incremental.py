@@ -0,0 +1,197 @@
+# backend/incremental.py
+"""
+Incremental catalog updates against the frozen TF-IDF space.
+
+    python incremental.py --updates new_releases.csv --artifacts Artifacts
+
+The updates file uses the TMDB CSV layout and goes through the same filters
+and soup construction as ``build_model.py``. Instead of refitting, rows are
+transformed with the vocabulary and IDF weights stored at build time. A
+movie whose TMDB id is already in the catalog replaces its row; new ids
+are added. Only the affected neighbor table entries are recomputed (see
+``neighbors.update_neighbor_table``); changed rows are projected into the
+stored LSA space and assigned to the nearest IVF list when the build
+included those engines.
+
+Rows are then put back in popularity order, as ``build_model.py`` leaves
+them: title tie-breaks and autocomplete rank by row position. Row
+positions therefore change between versions; the neighbor table and IVF
+lists are renumbered with them. Catalogs without popularity for every
+movie (converted pickles) keep new movies at the end instead.
+
+The result is written as a new artifact version through the usual staged
+rename; a running API switches to it on ``POST /model/reload`` or on its
+own when ``MODEL_RELOAD_INTERVAL`` is set.
+
+IDF weights and vocabulary stay those of the last full build, so words that
+only appear in new movies are ignored until the next ``build_model.py`` run.
+"""
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from artifacts import ARTIFACT_DIR, ModelArtifacts, load_artifacts, save_artifacts
+from build_model import SERVING_COLUMNS, build_soups, read_filtered_catalog
+from dedup import cluster_near_duplicates, duplicate_arrays
+from neighbors import NeighborTable, update_neighbor_table
+from preprocessing import frozen_vectorizer
+
+
+def load_vectorizer(artifacts: ModelArtifacts) -> TfidfVectorizer:
+    """
+    The build's TfidfVectorizer, restored from the artifact directory.
+
+    Raises:
+        ValueError: When the artifacts carry no vocabulary (converted pickles)
+    """
+    if artifacts.vocabulary is None or artifacts.idf is None:
+        raise ValueError(
+            f"{artifacts.path} has no stored vocabulary; rebuild it with build_model.py"
+        )
+    return frozen_vectorizer(artifacts.vocabulary.tolist(), artifacts.idf)
+
+
+def transform_rows(df: pd.DataFrame, vectorizer: TfidfVectorizer, n_jobs: int = 1) -> csr_matrix:
+    """TF-IDF rows for catalog-filtered movies, in the frozen feature space."""
+    return vectorizer.transform(build_soups(df, n_jobs)).astype(np.float32)
+
+
+def apply_updates(
+    artifacts: ModelArtifacts,
+    updates: pd.DataFrame,
+    output_dir: str,
+    n_jobs: int = 1
+) -> dict:
+    """
+    Merge filtered update rows into an artifact set and write a new version.
+
+    Args:
+        artifacts: Current artifact set
+        updates: Output of ``read_filtered_catalog`` for the new/changed movies
+        output_dir: Artifact directory to write the new version to (may be
+            the one ``artifacts`` was loaded from)
+
+    Returns:
+        The written manifest, with ``update`` counts added
+    """
+    vectorizer = load_vectorizer(artifacts)
+    updates = updates.reset_index(drop=True)
+    update_matrix = transform_rows(updates, vectorizer, n_jobs)
+    updates['title_lower'] = updates['title'].str.lower().str.strip()
+
+    n_old = artifacts.n_rows
+    row_of_id = pd.Series(np.arange(n_old), index=np.asarray(artifacts.ids))
+    existing = updates['id'].map(row_of_id)
+    replaced = existing.notna().to_numpy()
+    replaced_rows = existing[replaced].to_numpy(dtype=np.int64)
+    appended = np.flatnonzero(~replaced)
+
+    # Final row r takes stacked row take[r]: old rows stay in place unless
+    # replaced, appended movies follow the existing catalog
+    take = np.arange(n_old + len(appended))
+    take[replaced_rows] = n_old + np.flatnonzero(replaced)
+    take[n_old:] = n_old + appended
+
+    tfidf_matrix = vstack([artifacts.tfidf_matrix, update_matrix], format='csr')[take]
+    catalog = pd.concat(
+        [artifacts.to_dataframe()[SERVING_COLUMNS], updates[SERVING_COLUMNS]],
+        ignore_index=True
+    ).iloc[take].reset_index(drop=True)
+
+    neighbor_table = artifacts.neighbor_table
+    if neighbor_table is not None:
+        neighbor_table = update_neighbor_table(neighbor_table, tfidf_matrix, replaced_rows)
+
+    # LSA components and IVF centroids are frozen like the vocabulary;
+    # changed rows are placed in the existing space
+    extra_arrays = {}
+    lsa_index = artifacts.lsa_index
+    if lsa_index is not None:
+        vectors = np.vstack([lsa_index.vectors, lsa_index.project(update_matrix)])[take]
+        extra_arrays = {'lsa_components': lsa_index.components, 'lsa_vectors': vectors.astype(lsa_index.dtype)}
+    ivf_index = artifacts.ivf_index
+    if ivf_index is not None:
+        extra_arrays.update(ivf_index.with_rows(tfidf_matrix, replaced_rows).arrays())
+
+    order = _popularity_order(catalog)
+    if order is not None:
+        catalog, tfidf_matrix, neighbor_table = _reorder(order, catalog, tfidf_matrix, neighbor_table, extra_arrays)
+    # Near-duplicate clusters are recomputed (seconds for the whole catalog)
+    threshold = artifacts.duplicate_threshold
+    if threshold is not None:
+        extra_arrays.update(duplicate_arrays(cluster_near_duplicates(tfidf_matrix, threshold), threshold))
+
+    manifest = save_artifacts(
+        output_dir, catalog, tfidf_matrix, neighbor_table, extra_arrays,
+        vocabulary=artifacts.vocabulary.tolist(), idf=np.asarray(artifacts.idf),
+        stop_words=vectorizer.get_stop_words()
+    )
+    manifest['update'] = {
+        'base_version': artifacts.version,
+        'replaced': int(len(replaced_rows)),
+        'appended': int(len(appended)),
+    }
+    return manifest
+
+
+def _popularity_order(catalog: pd.DataFrame) -> Optional[np.ndarray]:
+    """Row order by descending popularity (stable), None when unknown for some row or already ordered."""
+    popularity = catalog['popularity'].to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.isnan(popularity).any():
+        return None
+    order = np.argsort(-popularity, kind='stable')
+    if (order == np.arange(len(order))).all():
+        return None
+    return order
+
+
+def _reorder(order: np.ndarray, catalog: pd.DataFrame, tfidf_matrix, neighbor_table, extra_arrays: dict):
+    """Put row ``order[r]`` at position ``r`` and renumber the row references of the indexes."""
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    catalog = catalog.iloc[order].reset_index(drop=True)
+    tfidf_matrix = tfidf_matrix[order]
+    if neighbor_table is not None:
+        neighbor_table = NeighborTable(
+            position[neighbor_table.ids[order]].astype(neighbor_table.ids.dtype), neighbor_table.scores[order]
+        )
+    if 'lsa_vectors' in extra_arrays:
+        extra_arrays['lsa_vectors'] = extra_arrays['lsa_vectors'][order]
+    if 'ivf_rows' in extra_arrays:
+        extra_arrays['ivf_rows'] = position[extra_arrays['ivf_rows']].astype(extra_arrays['ivf_rows'].dtype)
+    return catalog, tfidf_matrix, neighbor_table
+
+
+def update_from_csv(
+    csv_path: str,
+    artifact_dir: str = ARTIFACT_DIR,
+    output_dir: Optional[str] = None,
+    n_jobs: int = 1
+) -> dict:
+    updates = read_filtered_catalog(csv_path)
+    artifacts = load_artifacts(artifact_dir)
+    return apply_updates(artifacts, updates, output_dir or artifact_dir, n_jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add or replace movies without refitting TF-IDF")
+    parser.add_argument('--updates', required=True, help="CSV of new/changed movies (TMDB layout)")
+    parser.add_argument('--artifacts', default=ARTIFACT_DIR)
+    parser.add_argument('--output', default=None, help="Defaults to replacing --artifacts")
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    manifest = update_from_csv(args.updates, args.artifacts, args.output, args.n_jobs)
+    counts = manifest['update']
+    print(
+        f"{counts['replaced']} replaced, {counts['appended']} appended: "
+        f"{manifest['n_rows']} rows, version {manifest['version']}"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# backend/ivf.py
+"""
+Inverted-file (IVF) approximate nearest neighbor index.
+
+Brute-force kNN touches every row per query, which is what forces the
+catalog filters. IVF splits the catalog into ``n_lists`` clusters with
+spherical k-means over the TF-IDF rows. A query scores the cluster
+centroids, then rescores exactly only the rows of its ``nprobe`` closest
+clusters. With ``n_lists`` around ``sqrt(n)`` a query touches roughly
+``nprobe * sqrt(n)`` rows, so latency stays sublinear in catalog size.
+Raising ``nprobe`` trades latency for recall.
+
+The index stores only centroids and the row ids of each list; rescoring
+reads the serving TF-IDF matrix, so no vectors are duplicated. A saved
+index also records a fingerprint of the matrix it was built for (row count
+and row lengths), so an ``ivf.npz`` left over from another catalog is
+rejected instead of answering with the wrong rows.
+
+    python ivf.py build --lists 1024
+    python ivf.py evaluate --nprobe 8
+
+``IVFIndex.kneighbors`` follows ``NearestNeighbors.kneighbors``; set
+``SIMILARITY_ENGINE=ivf`` (and optionally ``IVF_NPROBE``) to serve from it.
+"""
+import argparse
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from lsa import evaluate_recall, load_engine_inputs
+from neighbors import matrix_fingerprint
+
+IVF_PATH = 'Pkled Files/ivf.npz'
+DEFAULT_NPROBE = int(os.environ.get('IVF_NPROBE', 8))
+
+# k-means is trained on a sample of this many rows per list
+TRAIN_ROWS_PER_LIST = 32
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def default_n_lists(n_rows: int) -> int:
+    return max(1, int(math.sqrt(n_rows)))
+
+
+def _assign_block(matrix, centroids_t: np.ndarray, start: int, stop: int) -> np.ndarray:
+    return np.asarray(matrix[start:stop] @ centroids_t).argmax(axis=1)
+
+
+def _assign(matrix, centroids_t: np.ndarray, n_jobs: int = -1) -> np.ndarray:
+    """Nearest centroid (by dot product) for every row."""
+    from joblib import Parallel, delayed
+
+    blocks = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_assign_block)(matrix, centroids_t, start, min(start + ASSIGN_BLOCK_ROWS, matrix.shape[0]))
+        for start in range(0, matrix.shape[0], ASSIGN_BLOCK_ROWS)
+    )
+    return np.concatenate(blocks).astype(np.int32)
+
+
+def _normalize_rows(matrix):
+    # scikit-learn is only needed to train or update an index, not to
+    # serve one, so it is imported here rather than at startup
+    from sklearn.preprocessing import normalize
+
+    return normalize(matrix, norm='l2')
+
+
+def _lists_from_labels(labels: np.ndarray, n_lists: int) -> Tuple[np.ndarray, np.ndarray]:
+    list_rows = np.argsort(labels, kind='stable').astype(np.int32)
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=list_offsets[1:])
+    return list_offsets, list_rows
+
+
+class IVFIndex:
+    """
+    Centroids plus inverted lists over a row-normalized TF-IDF matrix.
+
+    Args:
+        tfidf_matrix: Serving matrix (L2-normalized rows, as TfidfVectorizer
+            produces); used for exact rescoring of probed lists
+        centroids: ``n_lists x n_features`` unit-norm float32 centroids
+        list_offsets: List ``l`` holds ``list_rows[list_offsets[l]:list_offsets[l + 1]]``
+        list_rows: Row positions grouped by list
+        nprobe: Lists scanned per query
+    """
+
+    def __init__(
+        self,
+        tfidf_matrix,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        nprobe: int = DEFAULT_NPROBE,
+        n_neighbors: int = 11
+    ):
+        if len(list_offsets) != centroids.shape[0] + 1 or list_offsets[-1] != len(list_rows):
+            raise ValueError("list_offsets does not match centroids and list_rows")
+        self.matrix = csr_matrix(tfidf_matrix)
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+        self.n_neighbors = n_neighbors
+        # Feature-major copy: a query gathers only its nonzero features
+        self._centroids_t = np.ascontiguousarray(centroids.T)
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    def __len__(self) -> int:
+        # Rows the lists were built over (each row is in exactly one list),
+        # which differs from the matrix when the index is stale
+        return len(self.list_rows)
+
+    @classmethod
+    def train(
+        cls,
+        tfidf_matrix,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+        random_state: int = 0,
+        n_jobs: int = -1,
+        nprobe: int = DEFAULT_NPROBE
+    ) -> 'IVFIndex':
+        """
+        Spherical k-means on a row sample, then assign every row to a list.
+
+        Args:
+            tfidf_matrix: Sparse TF-IDF matrix (one row per movie)
+            n_lists: Number of clusters; ``sqrt(n_rows)`` when omitted
+            n_iter: Lloyd iterations on the training sample
+        """
+        matrix = _normalize_rows(csr_matrix(tfidf_matrix, dtype=np.float32))
+        n_rows = matrix.shape[0]
+        n_lists = min(n_lists or default_n_lists(n_rows), n_rows)
+        rng = np.random.default_rng(random_state)
+
+        sample_size = min(n_rows, n_lists * TRAIN_ROWS_PER_LIST)
+        sample = matrix[np.sort(rng.choice(n_rows, size=sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].toarray()
+
+        for _ in range(n_iter):
+            labels = _assign(sample, np.ascontiguousarray(centroids.T), n_jobs)
+            membership = csr_matrix(
+                (np.ones(sample_size, dtype=np.float32), (labels, np.arange(sample_size))),
+                shape=(n_lists, sample_size)
+            )
+            sums = np.asarray((membership @ sample).todense())
+            # Empty clusters restart from a random sample row
+            empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(sample_size, size=len(empty), replace=False)].toarray()
+            centroids = _normalize_rows(sums).astype(np.float32)
+
+        labels = _assign(matrix, np.ascontiguousarray(centroids.T), n_jobs)
+        list_offsets, list_rows = _lists_from_labels(labels, n_lists)
+        return cls(tfidf_matrix, centroids, list_offsets, list_rows, nprobe)
+
+    def labels(self) -> np.ndarray:
+        """List id of every row."""
+        labels = np.empty(len(self.list_rows), dtype=np.int32)
+        labels[self.list_rows] = np.repeat(np.arange(self.n_lists, dtype=np.int32), np.diff(self.list_offsets))
+        return labels
+
+    def with_rows(self, tfidf_matrix, changed_rows) -> 'IVFIndex':
+        """
+        Index for an updated matrix: changed and appended rows are assigned
+        to their nearest existing centroid, the centroids stay frozen.
+        """
+        n_old = len(self.list_rows)
+        labels = np.zeros(tfidf_matrix.shape[0], dtype=np.int32)
+        labels[:n_old] = self.labels()
+        changed = np.union1d(np.asarray(changed_rows, dtype=np.int64), np.arange(n_old, tfidf_matrix.shape[0]))
+        if len(changed):
+            rows = _normalize_rows(csr_matrix(tfidf_matrix, dtype=np.float32)[changed])
+            labels[changed] = np.asarray(rows @ self._centroids_t).argmax(axis=1)
+        list_offsets, list_rows = _lists_from_labels(labels, self.n_lists)
+        return IVFIndex(tfidf_matrix, self.centroids, list_offsets, list_rows, self.nprobe, self.n_neighbors)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'ivf_centroids': self.centroids, 'ivf_offsets': self.list_offsets, 'ivf_rows': self.list_rows}
+
+    def _search(
+        self,
+        query: csr_matrix,
+        k: int,
+        nprobe: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        norm = np.sqrt(query.data @ query.data) or 1.0
+        centroid_scores = (query.data / norm) @ self._centroids_t[query.indices]
+
+        # Probe more lists if the nearest ones hold fewer than k allowed rows
+        nprobe = min(nprobe, self.n_lists)
+        while True:
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            rows = np.concatenate([self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probed])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            if len(rows) >= k or nprobe == self.n_lists:
+                break
+            nprobe = min(2 * nprobe, self.n_lists)
+
+        k = min(k, len(rows))
+        if k == 0:
+            return np.empty(0, dtype=np.float32), rows
+        sims = np.asarray(self.matrix[rows] @ query.T.toarray()).ravel() / norm
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind='stable')]
+        return sims[top], rows[top]
+
+    def kneighbors(
+        self,
+        X,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None
+    ):
+        """
+        Approximate cosine kNN for TF-IDF rows, nearest first.
+
+        Args:
+            mask: Boolean array of allowed rows; only allowed rows are
+                rescored, and more lists are probed until enough pass.
+                Slots left empty have distance inf
+
+        Returns:
+            ``(distances, indices)`` like NearestNeighbors, or only the
+            indices when ``return_distance`` is False
+        """
+        X = csr_matrix(X, dtype=np.float32)
+        n_neighbors = min(n_neighbors or self.n_neighbors, len(self))
+        distances = np.full((X.shape[0], n_neighbors), np.inf, dtype=np.float32)
+        indices = np.zeros((X.shape[0], n_neighbors), dtype=np.int64)
+        for i in range(X.shape[0]):
+            sims, rows = self._search(X[i], n_neighbors, nprobe or self.nprobe, mask)
+            distances[i, :len(rows)] = 1.0 - sims
+            indices[i, :len(rows)] = rows
+        if not return_distance:
+            return indices
+        return distances, indices
+
+
+def save_ivf_index(index: IVFIndex, path: str = IVF_PATH):
+    np.savez(path, **index.arrays(), ivf_fingerprint=matrix_fingerprint(index.matrix))
+
+
+def load_ivf_index(tfidf_matrix, path: str = IVF_PATH, nprobe: int = DEFAULT_NPROBE) -> IVFIndex:
+    """
+    Raises:
+        ValueError: When the index was built for a different matrix
+    """
+    with np.load(path) as data:
+        # Files saved before fingerprints were stored are checked by row count
+        if 'ivf_fingerprint' in data and not np.array_equal(data['ivf_fingerprint'], matrix_fingerprint(tfidf_matrix)):
+            raise ValueError(f"{path} was built for a different TF-IDF matrix")
+        index = IVFIndex(tfidf_matrix, data['ivf_centroids'], data['ivf_offsets'], data['ivf_rows'], nprobe)
+    if len(index) != tfidf_matrix.shape[0]:
+        raise ValueError(f"{path} indexes {len(index)} rows, the TF-IDF matrix has {tfidf_matrix.shape[0]}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the IVF approximate index")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Train centroids and assign every movie to a list")
+    build.add_argument('--matrix', default=None, help="TF-IDF pickle (default: Artifacts/ if present)")
+    build.add_argument('--output', default=IVF_PATH)
+    build.add_argument('--lists', type=int, default=None, help="Default: sqrt(number of movies)")
+    build.add_argument('--n-jobs', type=int, default=-1)
+
+    evaluate = sub.add_parser('evaluate', help="Recall@10 and latency against exact cosine")
+    evaluate.add_argument('--matrix', default=None)
+    evaluate.add_argument('--index', default=None, help=f"Default: Artifacts/ if it has one, else {IVF_PATH}")
+    evaluate.add_argument('--nprobe', type=int, nargs='+', default=[DEFAULT_NPROBE])
+    evaluate.add_argument('--sample', type=int, default=1000)
+
+    args = parser.parse_args()
+    tfidf_matrix, artifacts = load_engine_inputs(args.matrix)
+    if args.command == 'build':
+        index = IVFIndex.train(tfidf_matrix, args.lists, n_jobs=args.n_jobs)
+        save_ivf_index(index, args.output)
+        print(f"Saved IVF index with {index.n_lists} lists for {len(index)} movies to {args.output}")
+    else:
+        index = artifacts.ivf_index if artifacts is not None and args.index is None else None
+        if index is None:
+            index = load_ivf_index(tfidf_matrix, args.index or IVF_PATH)
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            recall, latency = evaluate_recall(index, tfidf_matrix, args.sample)
+            print(f"nprobe={nprobe}: recall@10 = {recall:.3f}, {latency:.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# backend/lsa.py
+"""
+Dense low-rank (LSA) similarity engine.
+
+Truncated SVD projects the TF-IDF rows to ``rank`` dimensions; the
+projected rows are L2-normalized and stored as float32 or float16. A query
+is projected the same way and scored against every movie with one BLAS
+matrix product followed by ``argpartition``, instead of a sparse scan over
+15,000 features.
+
+scikit-learn is imported only to fit or evaluate an index; serving a
+stored one needs NumPy alone.
+
+Float16 only halves the stored size: vectors are widened to float32 once
+at load, since NumPy has no float16 BLAS and converting per query costs
+more than the product itself.
+
+A saved ``lsa.npz`` carries the fingerprint of the matrix it was fitted
+on (shape and row lengths, see ``neighbors.matrix_fingerprint``), so one
+left over from another catalog or from before an incremental update is
+rejected instead of answering with the wrong rows.
+
+``LSAIndex.kneighbors`` follows ``NearestNeighbors.kneighbors`` (cosine
+distances, nearest first), so ``recommendation.py`` can use it in place of
+the brute-force model; set ``SIMILARITY_ENGINE=lsa``. The result is
+approximate: check ``python lsa.py evaluate`` for recall@10 against exact
+cosine before switching.
+
+    python lsa.py build --rank 256 --dtype float16
+    python lsa.py evaluate --sample 1000
+"""
+import argparse
+import pickle
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from neighbors import exact_neighbors, matrix_fingerprint
+
+DEFAULT_RANK = 256
+LSA_PATH = 'Pkled Files/lsa.npz'
+
+
+class LSAIndex:
+    """
+    Normalized low-rank movie vectors plus the projection for new queries.
+
+    Attributes:
+        components: ``rank x n_features`` float32 projection (SVD components)
+        vectors: ``n_rows x rank`` L2-normalized float32 movie vectors
+        dtype: Storage type used when the index is saved
+    """
+
+    def __init__(self, components: np.ndarray, vectors: np.ndarray, n_neighbors: int = 11):
+        if components.shape[0] != vectors.shape[1]:
+            raise ValueError("components and vectors disagree on the rank")
+        self.components = components
+        self.dtype = vectors.dtype
+        self.vectors = vectors if vectors.dtype == np.float32 else vectors.astype(np.float32)
+        self.n_neighbors = n_neighbors
+        self._projection = np.ascontiguousarray(components.T)
+
+    @property
+    def rank(self) -> int:
+        return self.components.shape[0]
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def fit(
+        cls,
+        tfidf_matrix,
+        rank: int = DEFAULT_RANK,
+        dtype=np.float32,
+        random_state: int = 0
+    ) -> 'LSAIndex':
+        """
+        Fit truncated SVD on the TF-IDF matrix.
+
+        Args:
+            tfidf_matrix: Sparse TF-IDF matrix (one row per movie)
+            rank: Dimensions kept (capped below the number of features)
+            dtype: Storage type of the movie vectors (float32 or float16)
+        """
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.preprocessing import normalize
+
+        rank = min(rank, tfidf_matrix.shape[1] - 1)
+        svd = TruncatedSVD(n_components=rank, algorithm='randomized', random_state=random_state)
+        vectors = svd.fit_transform(tfidf_matrix.astype(np.float32))
+        vectors = normalize(vectors, norm='l2', copy=False).astype(dtype)
+        return cls(svd.components_.astype(np.float32), vectors)
+
+    def project(self, X) -> np.ndarray:
+        """L2-normalized low-rank vectors for TF-IDF rows."""
+        projected = np.asarray(X @ self._projection, dtype=np.float32)
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        return projected / np.maximum(norms, 1e-12)
+
+    def similarities(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of projected queries to every movie (``m x n_rows``)."""
+        return queries @ self.vectors.T
+
+    def kneighbors(
+        self,
+        X,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True,
+        mask: Optional[np.ndarray] = None
+    ):
+        """
+        Approximate cosine kNN for TF-IDF rows, nearest first.
+
+        Args:
+            mask: Boolean array of allowed rows; rejected rows score -inf
+                (distance inf) and only fill slots the mask cannot
+
+        Returns:
+            ``(distances, indices)`` like NearestNeighbors, or only the
+            indices when ``return_distance`` is False
+        """
+        n_neighbors = min(n_neighbors or self.n_neighbors, len(self))
+        sims = self.similarities(self.project(X))
+        if mask is not None:
+            sims[:, ~mask] = -np.inf
+        part = np.argpartition(-sims, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind='stable')
+        indices = np.take_along_axis(part, order, axis=1)
+        if not return_distance:
+            return indices
+        return 1.0 - np.take_along_axis(part_sims, order, axis=1), indices
+
+
+def save_lsa_index(index: LSAIndex, tfidf_matrix, path: str = LSA_PATH):
+    """Save ``index`` with the fingerprint of the matrix it was fitted on."""
+    np.savez(
+        path, components=index.components, vectors=index.vectors.astype(index.dtype),
+        lsa_fingerprint=matrix_fingerprint(tfidf_matrix)
+    )
+
+
+def load_lsa_index(tfidf_matrix, path: str = LSA_PATH) -> LSAIndex:
+    """
+    Raises:
+        ValueError: When the index was built for a different matrix
+    """
+    with np.load(path) as data:
+        # Files saved before fingerprints were stored are checked by row count
+        if 'lsa_fingerprint' in data and not np.array_equal(data['lsa_fingerprint'], matrix_fingerprint(tfidf_matrix)):
+            raise ValueError(f"{path} was built for a different TF-IDF matrix")
+        index = LSAIndex(data['components'], data['vectors'])
+    if len(index) != tfidf_matrix.shape[0]:
+        raise ValueError(f"{path} indexes {len(index)} rows, the TF-IDF matrix has {tfidf_matrix.shape[0]}")
+    return index
+
+
+def evaluate_recall(
+    index,
+    tfidf_matrix,
+    sample: int = 1000,
+    k: int = 10,
+    random_state: int = 0
+) -> Tuple[float, float]:
+    """
+    Mean recall@k of ``index.kneighbors`` against exact cosine (self
+    excluded) on a random sample of movies.
+
+    Works for any engine with a NearestNeighbors-style ``kneighbors``.
+
+    Returns:
+        ``(recall, milliseconds per query)``
+    """
+    rng = np.random.default_rng(random_state)
+    rows = np.sort(rng.choice(tfidf_matrix.shape[0], size=min(sample, tfidf_matrix.shape[0]), replace=False))
+    # Blocked and partially sorted: the sample never needs a dense
+    # (sample x catalog) array
+    exact = exact_neighbors(tfidf_matrix, rows, k)
+
+    hits = 0
+    start = time.perf_counter()
+    for row, expected in zip(rows, exact):
+        found = index.kneighbors(tfidf_matrix[row], n_neighbors=k + 1, return_distance=False)[0]
+        hits += len(set(found[found != row][:k].tolist()) & set(expected.tolist()))
+    elapsed = time.perf_counter() - start
+    return hits / (len(rows) * k), 1000 * elapsed / len(rows)
+
+
+def load_engine_inputs(matrix_path: Optional[str] = None):
+    """
+    TF-IDF matrix for the engine CLIs: the given pickle, else ``Artifacts/``
+    when present, else the default pickle.
+
+    Returns:
+        ``(tfidf_matrix, artifacts)``; ``artifacts`` is None for pickles
+    """
+    from artifacts import ARTIFACT_DIR, artifacts_exist, load_artifacts
+
+    if matrix_path is None and artifacts_exist(ARTIFACT_DIR):
+        artifacts = load_artifacts(ARTIFACT_DIR)
+        return artifacts.tfidf_matrix, artifacts
+    with open(matrix_path or 'Pkled Files/tfidf_matrix.pkl', 'rb') as f:
+        return pickle.load(f), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the LSA similarity engine")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Fit truncated SVD and save the index")
+    build.add_argument('--matrix', default=None, help="TF-IDF pickle (default: Artifacts/ if present)")
+    build.add_argument('--output', default=LSA_PATH)
+    build.add_argument('--rank', type=int, default=DEFAULT_RANK)
+    build.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+
+    evaluate = sub.add_parser('evaluate', help="Recall@10 and latency against exact cosine")
+    evaluate.add_argument('--matrix', default=None)
+    evaluate.add_argument('--index', default=None, help=f"Default: Artifacts/ if it has one, else {LSA_PATH}")
+    evaluate.add_argument('--sample', type=int, default=1000)
+
+    args = parser.parse_args()
+    tfidf_matrix, artifacts = load_engine_inputs(args.matrix)
+    if args.command == 'build':
+        index = LSAIndex.fit(tfidf_matrix, args.rank, np.dtype(args.dtype))
+        save_lsa_index(index, tfidf_matrix, args.output)
+        print(f"Saved rank-{index.rank} {args.dtype} LSA index for {len(index)} movies to {args.output}")
+    else:
+        index = artifacts.lsa_index if artifacts is not None and args.index is None else None
+        if index is None:
+            index = load_lsa_index(tfidf_matrix, args.index or LSA_PATH)
+        recall, latency = evaluate_recall(index, tfidf_matrix, args.sample)
+        print(f"recall@10 = {recall:.3f}, {latency:.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,47 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from recommendation import load_model_components, get_recommendations
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Annotated, Callable, List, Literal, Optional
+from artifacts import current_model_version
+from engine import RecommenderEngine
+from filters import parse_decade
+from itertools import islice
+from metrics import REGISTRY, REQUEST_SECONDS, TITLE_LOOKUPS, Gauge, stage_timer
+from ranking import Reranker
+from recommendation import BATCH_CHUNK_SIZE, DEFAULT_MIN_SIMILARITY, MAX_SEEDS
+from responses import (
+    compress_stream, dumps, encode_page, negotiate_encoding, parse_fields, prepare_body, select_fields
+)
+from serving import ComputePool, OverloadedError
+from title_index import normalize_title
+import asyncio
+import hmac
 import os
+import profiling
+import time
+
+# Startup time is measured from here to the first loaded model
+IMPORTED_AT = time.perf_counter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the model (in the background by default) and start the reload watcher."""
+    loop = asyncio.get_running_loop()
+    tasks = []
+    if MODEL_BACKGROUND_LOAD:
+        tasks.append(loop.create_task(_load_initial_model()))
+    else:
+        await _load_initial_model()
+    if MODEL_RELOAD_INTERVAL > 0:
+        tasks.append(loop.create_task(_watch_model_version()))
+    yield
+    for task in tasks:
+        task.cancel()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration for production
 origins = [
@@ -22,23 +58,501 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load model on startup
-df, tfidf_matrix, indices, nn_model = load_model_components()
+# Seconds between checks for a new model version (0 disables polling)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 0))
+# Shared secret for POST /model/reload, sent as X-Reload-Token; the endpoint
+# answers 403 to everyone while it is unset
+MODEL_RELOAD_TOKEN = os.environ.get('MODEL_RELOAD_TOKEN')
+# Load the model after the server starts listening (/readyz reports when it
+# is done); 0 loads it before the port is bound
+MODEL_BACKGROUND_LOAD = os.environ.get('MODEL_BACKGROUND_LOAD', '1') != '0'
 
-class MovieRequest(BaseModel):
-    title: str
-    similarity_threshold: float = 0.6
+# The process's one RecommenderEngine; None until the first load finishes
+# (see lifespan). Requests take a reference once and use it throughout, so a
+# reload is a single atomic swap and in-flight work finishes on the old one.
+serving_model: Optional[RecommenderEngine] = None
+_load_error: Optional[str] = None
+_ready_seconds: Optional[float] = None
+_reload_lock = asyncio.Lock()
 
-@app.post("/recommend")
-def recommend_movies(req: MovieRequest):
-    movies, corrected = get_recommendations(
-        req.title,
-        df,
-        tfidf_matrix,
-        indices,
-        nn_model,
-        req.similarity_threshold
+def _ready_model() -> RecommenderEngine:
+    model = serving_model
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model is loading", headers={"Retry-After": "5"})
+    return model
+
+# Similarity work runs here, with queue limits and in-flight coalescing
+compute_pool = ComputePool()
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, so path parameters don't explode the series
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        path=route.path if route is not None else request.url.path,
+        status=response.status_code
+    )
+    return response
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)}
     )
-    if not movies:
+
+class OutputOptions(BaseModel):
+    # Response shaping only: cached responses hold rows, so these are not
+    # part of the cache keys
+    fields: Optional[str] = None  # e.g. "title,poster_path"; all fields by default
+    overview_chars: Optional[int] = Field(None, ge=16, le=5000)  # truncate overviews
+
+    @field_validator('fields')
+    @classmethod
+    def known_fields(cls, fields: Optional[str]) -> Optional[str]:
+        parse_fields(fields)
+        return fields
+
+    def selected_fields(self):
+        return parse_fields(self.fields)
+
+def _json_response(body: bytes, request: Request) -> Response:
+    # Strong ETag, 304 for matching conditional GETs, compression when accepted
+    status, body, headers = prepare_body(
+        body, request.method, request.headers.get("if-none-match"), request.headers.get("accept-encoding")
+    )
+    return Response(body, status_code=status, headers=headers, media_type=None if status == 304 else "application/json")
+
+def _page_response(model: RecommenderEngine, response: dict, req: OutputOptions, request: Request) -> Response:
+    with stage_timer('serialize'):
+        body = encode_page(model.fragments, response, req.selected_fields(), req.overview_chars)
+    return _json_response(body, request)
+
+class RecommendOptions(OutputOptions):
+    similarity_threshold: float = DEFAULT_MIN_SIMILARITY
+    k: int = Field(10, ge=1, le=50)  # page size
+    offset: int = Field(0, ge=0, le=500)
+    # Filters are applied while scoring, so pages stay full
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    genres: Optional[List[str]] = None  # any of these
+    exclude_genres: Optional[List[str]] = None
+    decades: Optional[List[str]] = None  # e.g. ["1990s", "2000s"]
+    exclude_ids: Optional[List[Annotated[int, Field(ge=0, lt=2**63)]]] = None  # TMDB ids
+    # Re-ranking: prior weights added to the cosine similarity, and the MMR
+    # diversity trade-off (all 0 = pure similarity order)
+    popularity_weight: float = Field(0.0, ge=0, le=10)
+    rating_weight: float = Field(0.0, ge=0, le=10)
+    recency_weight: float = Field(0.0, ge=0, le=10)
+    diversity: float = Field(0.0, ge=0, le=1)
+
+    @field_validator('decades')
+    @classmethod
+    def known_decades(cls, decades: Optional[List[str]]) -> Optional[List[str]]:
+        # "1990", " 1990S " -> "1990s"; anything else is a 422, not a 500 in the pool
+        if decades is None:
+            return None
+        return [f"{parse_decade(decade)}s" for decade in decades]
+
+    @model_validator(mode='after')
+    def year_range(self):
+        if self.year_min is not None and self.year_max is not None and self.year_min > self.year_max:
+            raise ValueError("year_min must not be greater than year_max")
+        return self
+
+    def check_genres(self, model: RecommenderEngine):
+        """422 for genre names no movie of the model has, so a typo is not an empty page."""
+        unknown = model.filters.unknown_genres([*(self.genres or []), *(self.exclude_genres or [])])
+        if unknown:
+            raise HTTPException(status_code=422, detail={
+                "message": "Unknown genres",
+                "unknown": unknown,
+                "genres": model.filters.genres
+            })
+
+    def options_key(self) -> tuple:
+        def normalized(values):
+            return tuple(sorted({str(v).strip().lower() for v in values or []}))
+
+        return (
+            self.similarity_threshold, self.k, self.offset, self.year_min, self.year_max,
+            normalized(self.genres), normalized(self.exclude_genres), normalized(self.decades),
+            tuple(sorted(set(self.exclude_ids or []))),
+            self.popularity_weight, self.rating_weight, self.recency_weight, self.diversity
+        )
+
+    def mask(self, model: RecommenderEngine):
+        return model.mask(
+            self.year_min, self.year_max, self.genres, self.exclude_genres, self.decades, self.exclude_ids
+        )
+
+    def reranker(self) -> Optional[Reranker]:
+        reranker = Reranker(self.popularity_weight, self.rating_weight, self.recency_weight, self.diversity)
+        return reranker if reranker.active else None
+
+    def page(self, recommended: Optional[list]) -> dict:
+        return {
+            "k": self.k,
+            "offset": self.offset,
+            "next_offset": self.offset + self.k if recommended and len(recommended) == self.k else None
+        }
+
+class MovieRequest(RecommendOptions):
+    title: Optional[str] = None
+    id: Optional[int] = Field(None, ge=0, lt=2**63)  # TMDB id, takes precedence over title
+    release_year: Optional[int] = None  # disambiguates same-titled movies
+
+    @model_validator(mode='after')
+    def title_or_id(self):
+        if self.id is None and not (self.title or "").strip():
+            raise ValueError("Either title or id is required")
+        return self
+
+# Fields listed for the other movies sharing the requested title
+ALTERNATIVE_FIELDS = ('id', 'title', 'release_year')
+
+def _compute_recommendations(model: RecommenderEngine, req: MovieRequest, cache_key: tuple) -> dict:
+    response = model.cache.get(cache_key)
+    if response is None:
+        with profiling.track('recommend'):
+            result = model.recommend(
+                req.title,
+                req.similarity_threshold,
+                release_year=req.release_year,
+                k=req.k,
+                offset=req.offset,
+                mask=req.mask(model),
+                reranker=req.reranker(),
+                movie_id=req.id
+            )
+        recommended = result.rows if result.found else None
+        # Same-titled movies the client could have meant, when it did not
+        # pin one down with an id or year
+        alternatives = []
+        if result.found and req.id is None and model.indices.split_year(req.title, req.release_year)[1] is None:
+            alternatives = [
+                {field: record[field] for field in ALTERNATIVE_FIELDS}
+                for record in model.movies.records(model.same_title_rows(result.seed_rows[0]))
+            ]
+        # Misses are cached too; typo'd titles are the most expensive lookups
+        response = {
+            "recommended": recommended,
+            "corrected_title": result.corrected_title,
+            "alternatives": alternatives,
+            **req.page(recommended)
+        }
+        if not result.found and req.id is None:
+            # A known title asked for with a year none of its movies has
+            response["release_years"] = model.indices.unmatched_years(req.title, req.release_year)
+        model.cache.put(cache_key, response)
+    return response
+
+async def _recommend(req: MovieRequest, request: Request) -> Response:
+    model = _ready_model()
+    req.check_genres(model)
+    if req.id is not None:
+        cache_key = ("recommend_id", req.id) + req.options_key()
+    else:
+        cache_key = ("recommend", normalize_title(req.title), req.release_year) + req.options_key()
+    response = model.cache.get_local(cache_key)
+    if response is None:
+        response = await compute_pool.run(
+            _compute_recommendations, model, req, cache_key, key=(model.version,) + cache_key
+        )
+    if response["recommended"] is None:
+        if response.get("release_years") is not None:
+            raise HTTPException(status_code=404, detail={
+                "message": "No movie with this title was released in that year",
+                "release_years": response["release_years"]
+            })
         raise HTTPException(status_code=404, detail="Movie not found")
-    return {"recommended": movies, "corrected_title": corrected}
+    return _page_response(model, response, req, request)
+
+@app.post("/recommend")
+async def recommend_movies(req: MovieRequest, request: Request):
+    return await _recommend(req, request)
+
+@app.get("/recommend")
+async def recommend_movies_get(req: Annotated[MovieRequest, Query()], request: Request):
+    """``POST /recommend`` with query parameters, so clients can revalidate with If-None-Match."""
+    return await _recommend(req, request)
+
+class SeedItem(BaseModel):
+    title: Optional[str] = None
+    id: Optional[int] = Field(None, ge=0, lt=2**63)  # TMDB id, takes precedence over title
+    release_year: Optional[int] = None
+    weight: float = Field(1.0, gt=0)
+
+class MultiSeedRequest(RecommendOptions):
+    seeds: List[SeedItem] = Field(..., min_length=1, max_length=MAX_SEEDS)
+    method: Literal["centroid", "rrf"] = "centroid"
+
+def _compute_multi_seed(model: RecommenderEngine, req: MultiSeedRequest, cache_key: tuple) -> dict:
+    response = model.cache.get(cache_key)
+    if response is None:
+        with profiling.track('multi'):
+            result = model.recommend_multi(
+                [seed.model_dump() for seed in req.seeds],
+                req.similarity_threshold,
+                method=req.method,
+                k=req.k,
+                offset=req.offset,
+                mask=req.mask(model),
+                reranker=req.reranker()
+            )
+        response = {
+            "recommended": result.rows,
+            "seeds": [seed["title"] for seed in result.seeds],
+            "unresolved": result.unresolved,
+            **req.page(result.rows)
+        }
+        model.cache.put(cache_key, response)
+    return response
+
+@app.post("/recommend/multi")
+async def recommend_multi_seed(req: MultiSeedRequest, request: Request):
+    model = _ready_model()
+    req.check_genres(model)
+    seeds_key = tuple(
+        (seed.id, normalize_title(seed.title or ""), seed.release_year, seed.weight) for seed in req.seeds
+    )
+    cache_key = ("multi", req.method, seeds_key) + req.options_key()
+    response = model.cache.get_local(cache_key)
+    if response is None:
+        response = await compute_pool.run(
+            _compute_multi_seed, model, req, cache_key, key=(model.version,) + cache_key
+        )
+    if not response["seeds"]:
+        raise HTTPException(status_code=404, detail="None of the seed movies were found")
+    return _page_response(model, response, req, request)
+
+class SearchRequest(RecommendOptions):
+    query: str = Field(..., min_length=1, max_length=500)  # free-text description
+
+def _compute_search(model: RecommenderEngine, req: SearchRequest, cache_key: tuple) -> dict:
+    response = model.cache.get(cache_key)
+    if response is None:
+        with profiling.track('search'):
+            recommended = model.search(
+                req.query, k=req.k, offset=req.offset, mask=req.mask(model), reranker=req.reranker()
+            ).rows
+        response = {"recommended": recommended, **req.page(recommended)}
+        model.cache.put(cache_key, response)
+    return response
+
+async def _search(req: SearchRequest, request: Request) -> Response:
+    model = _ready_model()
+    req.check_genres(model)
+    if model.query_vectorizer is None:
+        raise HTTPException(status_code=501, detail="Text search needs artifacts built by build_model.py")
+    # Queries differing only in case or spacing vectorize the same
+    cache_key = ("search", " ".join(req.query.lower().split())) + req.options_key()
+    response = model.cache.get_local(cache_key)
+    if response is None:
+        response = await compute_pool.run(
+            _compute_search, model, req, cache_key, key=(model.version,) + cache_key
+        )
+    return _page_response(model, response, req, request)
+
+@app.post("/search")
+async def search_movies(req: SearchRequest, request: Request):
+    return await _search(req, request)
+
+@app.get("/search")
+async def search_movies_get(req: Annotated[SearchRequest, Query()], request: Request):
+    """``POST /search`` with query parameters."""
+    return await _search(req, request)
+
+@app.get("/cache/stats")
+def cache_stats():
+    return _ready_model().cache.stats()
+
+@app.get("/pool/stats")
+def pool_stats():
+    return compute_pool.stats()
+
+# Scrape-time gauges read the current model and pool, so they follow
+# reloads; model gauges are empty until the first load finishes
+def _model_samples(sample) -> Callable[[], dict]:
+    def samples() -> dict:
+        model = serving_model
+        return {} if model is None else sample(model)
+    return samples
+
+def _cache_samples(model: RecommenderEngine) -> dict:
+    stats = model.cache.stats()
+    return {
+        ('local_hits',): stats['local_hits'],
+        ('shared_hits',): stats['shared_hits'],
+        ('misses',): stats['misses'],
+    }
+
+def _fuzzy_ratio() -> dict:
+    exact, fuzzy = TITLE_LOOKUPS.value(result='exact'), TITLE_LOOKUPS.value(result='fuzzy')
+    return {(): fuzzy / (exact + fuzzy) if exact + fuzzy else 0.0}
+
+def _pool_samples() -> dict:
+    stats = compute_pool.stats()
+    return {(name,): stats[name] for name in ('pending', 'submitted', 'coalesced', 'rejected')}
+
+REGISTRY.register(Gauge(
+    'response_cache_lookups', 'Response cache lookups by outcome', ['result'],
+    callback=_model_samples(_cache_samples)
+))
+REGISTRY.register(Gauge(
+    'response_cache_hit_rate', 'Response cache hit rate',
+    callback=_model_samples(lambda model: {(): model.cache.stats()['hit_rate']})
+))
+REGISTRY.register(Gauge('recommend_fuzzy_fallback_ratio', 'Share of resolved titles that needed fuzzy matching', callback=_fuzzy_ratio))
+REGISTRY.register(Gauge('compute_pool_tasks', 'Compute pool queue depth and task counts', ['state'], callback=_pool_samples))
+REGISTRY.register(Gauge(
+    'model_info', 'Serving model version', ['version'],
+    callback=_model_samples(lambda model: {(model.version,): 1})
+))
+REGISTRY.register(Gauge(
+    'model_rows', 'Movies in the serving model',
+    callback=_model_samples(lambda model: {(): len(model)})
+))
+REGISTRY.register(Gauge(
+    'model_load_seconds', 'Time to load the serving model',
+    callback=_model_samples(lambda model: {(): model.load_seconds})
+))
+REGISTRY.register(Gauge(
+    'model_load_stage_seconds', 'Time per stage of the serving model load', ['stage'],
+    callback=_model_samples(lambda model: {(stage,): s for stage, s in model.load_stages.items()})
+))
+REGISTRY.register(Gauge(
+    'model_memory_bytes', 'Size of the large model arrays', ['component'],
+    callback=_model_samples(lambda model: {(name,): size for name, size in model.memory_bytes().items()})
+))
+REGISTRY.register(Gauge(
+    'api_ready_seconds', 'Time from API import until the first model was ready',
+    callback=lambda: {} if _ready_seconds is None else {(): _ready_seconds}
+))
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/autocomplete")
+def autocomplete_titles(q: str = Query(..., max_length=200), limit: int = Query(10, ge=1, le=50)):
+    return {"query": q, "results": _ready_model().autocomplete.search(q, limit)}
+
+class BatchItem(BaseModel):
+    title: Optional[str] = None
+    id: Optional[int] = Field(None, ge=0, lt=2**63)  # TMDB id, takes precedence over title
+    release_year: Optional[int] = None
+
+class BatchRequest(OutputOptions):
+    items: List[BatchItem]
+    similarity_threshold: float = DEFAULT_MIN_SIMILARITY
+
+@app.post("/recommend/batch")
+async def recommend_batch(req: BatchRequest, request: Request):
+    # Admission is decided up front; once streaming has started the
+    # remaining chunks are continuation work and are not rejected.
+    model = _ready_model()
+    compute_pool.check_admission()
+    results = model.iter_batch((item.model_dump() for item in req.items), req.similarity_threshold)
+    fields = req.selected_fields()
+
+    def encode(result: dict) -> bytes:
+        # The status line is already sent, so a failing item becomes an
+        # error line instead of cutting the stream short
+        try:
+            if result.get("recommended"):
+                result["recommended"] = [select_fields(movie, fields, req.overview_chars) for movie in result["recommended"]]
+            return dumps(result) + b"\n"
+        except Exception as exc:
+            return dumps({"error": f"Could not encode result: {exc}"}) + b"\n"
+
+    async def stream():
+        # Streamed as NDJSON, one line per item in request order
+        while True:
+            chunk = await compute_pool.run(
+                lambda: [encode(result) for result in islice(results, BATCH_CHUNK_SIZE)],
+                admit=False
+            )
+            if not chunk:
+                return
+            yield b"".join(chunk)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    return StreamingResponse(
+        compress_stream(stream(), encoding),
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    )
+
+async def reload_model(force: bool = False) -> bool:
+    """
+    Load the current model files into a new RecommenderEngine and swap it in.
+
+    Loading runs off the event loop and outside the compute pool, so
+    requests keep being served by the old model until the swap.
+    """
+    global serving_model
+    async with _reload_lock:
+        if not force and serving_model is not None and current_model_version() == serving_model.version:
+            return False
+        serving_model = await asyncio.get_running_loop().run_in_executor(None, RecommenderEngine)
+        return True
+
+@app.post("/model/reload")
+async def model_reload(force: bool = False, x_reload_token: Optional[str] = Header(None)):
+    if not MODEL_RELOAD_TOKEN or not hmac.compare_digest(
+        (x_reload_token or "").encode(), MODEL_RELOAD_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Reloading needs a valid X-Reload-Token header")
+    reloaded = await reload_model(force)
+    return {"reloaded": reloaded, "model_version": serving_model.version}
+
+@app.get("/model/version")
+def model_version():
+    model = _ready_model()
+    return {"model_version": model.version, "rows": len(model)}
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: the model is loaded and recommendations can be served."""
+    model = serving_model
+    if model is None:
+        return JSONResponse(status_code=503, content={"ready": False, "error": _load_error})
+    return {
+        "ready": True,
+        "model_version": model.version,
+        "ready_seconds": _ready_seconds,
+        "load_seconds": model.load_seconds,
+        "load_stages": model.load_stages,
+    }
+
+async def _load_initial_model():
+    global _load_error, _ready_seconds
+    try:
+        await reload_model(force=True)
+    except Exception as exc:  # stay alive; /readyz reports the error
+        _load_error = repr(exc)
+        print(f"Model load failed: {exc!r}")
+        return
+    _load_error = None
+    _ready_seconds = time.perf_counter() - IMPORTED_AT
+
+async def _watch_model_version():
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            await reload_model()
+        except Exception as exc:  # keep serving the loaded model
+            print(f"Model reload failed: {exc!r}")
@@ -0,0 +1,209 @@
+# backend/movie_store.py
+"""
+Compact column store of the movie metadata used in responses.
+
+Only the response fields are kept, without the DataFrame. Strings are
+packed into one UTF-8 buffer per column plus an offsets array
+(``artifacts.StringColumn``). When loading from ``Artifacts/`` those
+buffers are the memory-mapped files themselves, so every worker shares
+them through the page cache. Genres are dictionary-encoded, since a few
+hundred distinct genre lists cover the catalog, and years are int16.
+Response dicts are built per request from these columns. The re-ranking
+priors (see ranking.py) and the near-duplicate cluster labels (see
+dedup.py) ride along as one array each.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from artifacts import StringColumn, pack_strings
+from ranking import compute_priors
+
+# Fallback for a missing or empty overview
+DEFAULT_OVERVIEW = 'No description available'
+# int16 stand-in for an unknown release year
+MISSING_YEAR = -1
+
+
+class CategoricalColumn:
+    """
+    Dictionary-encoded string column: item ``i`` is ``categories[codes[i]]``.
+    """
+
+    def __init__(self, codes: np.ndarray, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def encode(cls, values: Iterable) -> 'CategoricalColumn':
+        """Encode strings; missing values become ''."""
+        lookup: Dict[str, int] = {}
+        codes = [
+            lookup.setdefault('' if v is None or (isinstance(v, float) and np.isnan(v)) else str(v), len(lookup))
+            for v in values
+        ]
+        dtype = np.uint16 if len(lookup) <= np.iinfo(np.uint16).max + 1 else np.int32
+        return cls(np.asarray(codes, dtype=dtype), list(lookup))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> str:
+        return self.categories[self.codes[i]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[code] for code in self.codes.tolist())
+
+    def take(self, rows: Sequence[int]) -> List[str]:
+        categories = self.categories
+        return [categories[code] for code in self.codes[np.asarray(rows, dtype=np.int64)].tolist()]
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(len(c.encode('utf-8')) for c in self.categories)
+
+
+def _string_column(values: Optional[Sequence], n_rows: int) -> StringColumn:
+    if isinstance(values, StringColumn):
+        return values  # already packed (memory-mapped artifact columns)
+    return pack_strings([''] * n_rows if values is None else values)
+
+
+def _int16_years(years: Optional[Sequence], n_rows: int) -> np.ndarray:
+    if years is None:
+        return np.full(n_rows, MISSING_YEAR, dtype=np.int16)
+    years = np.asarray(years, dtype=np.float64)
+    return np.where(np.isnan(years), MISSING_YEAR, years).astype(np.int16)
+
+
+class MovieStore:
+    """
+    Serving metadata, one entry per TF-IDF row.
+
+    Attributes:
+        ids: TMDB ids (int64 array)
+        titles, overviews, poster_paths: Packed string columns
+        genres: Dictionary-encoded genre strings
+        release_years: int16 years, ``MISSING_YEAR`` when unknown
+        priors: Re-ranking priors ``(n_rows, 3)``, None when the catalog
+            has no popularity/vote stats
+        clusters: Near-duplicate cluster label per row (int32), None when
+            the model was built without them
+    """
+
+    __slots__ = ('ids', 'titles', 'overviews', 'poster_paths', 'genres', 'release_years', 'priors', 'clusters')
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        titles: Sequence[str],
+        overviews: Optional[Sequence[str]] = None,
+        poster_paths: Optional[Sequence[str]] = None,
+        genres: Optional[Sequence[str]] = None,
+        years: Optional[Sequence] = None,
+        priors: Optional[np.ndarray] = None,
+        clusters: Optional[np.ndarray] = None
+    ):
+        n_rows = len(titles)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.titles = _string_column(titles, n_rows)
+        self.overviews = _string_column(overviews, n_rows)
+        self.poster_paths = _string_column(poster_paths, n_rows)
+        self.genres = CategoricalColumn.encode([''] * n_rows if genres is None else genres)
+        self.release_years = _int16_years(years, n_rows)
+        self.priors = priors
+        if clusters is not None and len(clusters) != n_rows:
+            raise ValueError(f"{len(clusters)} cluster labels for {n_rows} movies")
+        self.clusters = clusters
+
+    @classmethod
+    def from_dataframe(cls, df, clusters: Optional[np.ndarray] = None) -> 'MovieStore':
+        def column(name):
+            return df[name].tolist() if name in df else None
+
+        def stat(name):
+            return df[name].to_numpy(dtype=np.float64, na_value=np.nan) if name in df else np.full(len(df), np.nan)
+
+        years = stat('release_year') if 'release_year' in df else None
+        priors = None
+        if 'popularity' in df:
+            priors = compute_priors(stat('popularity'), stat('vote_average'), stat('vote_count'), stat('release_year'))
+        return cls(
+            df['id'].to_numpy(),
+            df['title'].tolist(),
+            column('overview'),
+            column('poster_path'),
+            column('genres'),
+            years,
+            priors,
+            clusters
+        )
+
+    @classmethod
+    def from_artifacts(cls, artifacts) -> 'MovieStore':
+        # String columns stay memory-mapped; only codes and years are copied
+        return cls(
+            artifacts.ids,
+            artifacts.string_column('title'),
+            artifacts.string_column('overview'),
+            artifacts.string_column('poster_path'),
+            artifacts.string_column('genres'),
+            artifacts.release_year,
+            artifacts.priors,
+            artifacts.duplicate_clusters
+        )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @property
+    def years(self) -> np.ndarray:
+        """Release years as float64 with NaN for unknown (a new array)."""
+        return np.where(self.release_years == MISSING_YEAR, np.nan, self.release_years.astype(np.float64))
+
+    def year(self, row: int) -> Optional[int]:
+        year = int(self.release_years[row])
+        return None if year == MISSING_YEAR else year
+
+    def record(self, row: int) -> dict:
+        """Response object for one row (a fresh dict the caller may modify)."""
+        return self.records([row])[0]
+
+    def records(self, rows: Sequence[int]) -> List[dict]:
+        rows = np.asarray(rows, dtype=np.int64)
+        years = self.release_years[rows].tolist()
+        return [
+            {
+                'id': movie_id,
+                'title': title,
+                'overview': overview or DEFAULT_OVERVIEW,
+                'poster_path': poster_path,
+                'genres': genres,
+                'release_year': None if year == MISSING_YEAR else year,
+            }
+            for movie_id, title, overview, poster_path, genres, year in zip(
+                self.ids[rows].tolist(), self.titles.take(rows), self.overviews.take(rows), self.poster_paths.take(rows),
+                self.genres.take(rows), years
+            )
+        ]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes per column (memory-mapped columns included)."""
+        return {
+            'ids': self.ids.nbytes,
+            'titles': self.titles.nbytes,
+            'overviews': self.overviews.nbytes,
+            'poster_paths': self.poster_paths.nbytes,
+            'genres': self.genres.nbytes,
+            'release_years': self.release_years.nbytes,
+            'priors': 0 if self.priors is None else self.priors.nbytes,
+            'clusters': 0 if self.clusters is None else self.clusters.nbytes,
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.memory_usage().values())
@@ -0,0 +1,336 @@
+# backend/neighbors.py
+"""
+Offline top-K neighbor table for the TF-IDF catalog.
+
+The catalog only changes when the model is rebuilt, so the K most similar
+movies for every row can be computed once and stored as compact arrays.
+At request time a known title is answered with a slice of the table instead
+of a brute-force scan of the whole matrix.
+"""
+import argparse
+import hashlib
+import pickle
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+DEFAULT_TOP_K = 50
+NEIGHBORS_PATH = 'Pkled Files/neighbors.npz'
+
+# Upper bound on the number of dense similarity cells held per block
+# (rows x catalog size); keeps each worker at ~128 MB of float32.
+BLOCK_CELL_BUDGET = 32_000_000
+
+# The most frequent terms (genres, decade labels) make sparse x sparse
+# products nearly dense; those columns are multiplied as dense arrays
+# through BLAS and only the long tail stays sparse.
+DENSE_TERMS = 256
+
+
+class NeighborTable:
+    """
+    Row-aligned top-K neighbors: ``ids[i]`` holds the row positions of the
+    movies most similar to row ``i`` (itself excluded), best first, and
+    ``scores[i]`` the matching cosine similarities.
+    """
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray):
+        if ids.shape != scores.shape:
+            raise ValueError("ids and scores must have the same shape")
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    @property
+    def k(self) -> int:
+        return self.ids.shape[1]
+
+    def __contains__(self, row_idx: int) -> bool:
+        return 0 <= row_idx < len(self)
+
+    def lookup(self, row_idx: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ``n`` nearest neighbor rows and their similarities."""
+        return self.ids[row_idx, :n], self.scores[row_idx, :n]
+
+
+class ExactIndex:
+    """
+    Brute-force cosine kNN with the interface of
+    ``NearestNeighbors(metric='cosine', algorithm='brute')``.
+
+    TF-IDF rows are already L2-normalized, so a query is one sparse product
+    against the matrix and there is nothing to fit. Unlike NearestNeighbors
+    it does not need scikit-learn, which keeps it off the API's startup path.
+    """
+
+    def __init__(self, tfidf_matrix, n_neighbors: int = 11):
+        self.matrix = csr_matrix(tfidf_matrix)
+        self.n_neighbors = n_neighbors
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def kneighbors(
+        self,
+        X,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True,
+        mask: Optional[np.ndarray] = None
+    ):
+        """
+        Exact cosine kNN for TF-IDF rows, nearest first.
+
+        Args:
+            mask: Boolean array of allowed rows; rejected rows have distance
+                inf and only fill slots the mask cannot
+
+        Returns:
+            ``(distances, indices)`` like NearestNeighbors, or only the
+            indices when ``return_distance`` is False
+        """
+        X = csr_matrix(X)
+        n_neighbors = min(n_neighbors or self.n_neighbors, len(self))
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1))).ravel()
+        # matrix @ X.T keeps the big operand in CSR; X.T @ matrix.T would
+        # convert the whole matrix per call
+        sims = (self.matrix @ X.T).toarray().T / np.maximum(norms, 1e-12)[:, None]
+        if mask is not None:
+            sims[:, ~mask] = -np.inf
+        part = np.argpartition(-sims, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind='stable')
+        indices = np.take_along_axis(part, order, axis=1)
+        if not return_distance:
+            return indices
+        return 1.0 - np.take_along_axis(part_sims, order, axis=1), indices
+
+
+class _SplitMatrix:
+    """Row-normalized TF-IDF split into dense frequent-term and sparse tail columns."""
+
+    def __init__(self, matrix, dense_terms: int):
+        doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        order = np.argsort(-doc_freq, kind='stable')
+        dense_cols = np.sort(order[:dense_terms])
+        sparse_cols = np.sort(order[dense_terms:])
+        columns = matrix.tocsc()
+        self.dense = columns[:, dense_cols].toarray() if dense_terms else None
+        self.sparse = columns[:, sparse_cols].tocsr()
+        self.sparse_t = self.sparse.T.tocsr()
+        self.n_rows = matrix.shape[0]
+
+    def similarities(self, start: int, stop: int) -> np.ndarray:
+        if self.dense is not None:
+            sims = self.dense[start:stop] @ self.dense.T
+        else:
+            sims = np.zeros((stop - start, self.n_rows), dtype=np.float32)
+        tail = (self.sparse[start:stop] @ self.sparse_t).tocoo()
+        sims[tail.row, tail.col] += tail.data
+        return sims
+
+
+def _select_top_k(
+    sims: np.ndarray,
+    k: int,
+    candidates: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` columns per row, sorted; mapped through ``candidates`` if given."""
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    part = np.take_along_axis(part, order, axis=1)
+    if candidates is not None:
+        part = np.take_along_axis(candidates, part, axis=1)
+    return part.astype(np.int32), np.take_along_axis(part_scores, order, axis=1).astype(np.float16)
+
+
+def _top_k_block(split: _SplitMatrix, start: int, stop: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    sims = split.similarities(start, stop)
+    rows = np.arange(stop - start)
+    # A movie is never its own recommendation
+    sims[rows, rows + start] = -np.inf
+    return _select_top_k(sims, k)
+
+
+def _top_k_rows(matrix, matrix_t, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-``k`` for an arbitrary set of rows of a normalized matrix."""
+    sims = (matrix[rows] @ matrix_t).toarray()
+    sims[np.arange(len(rows)), rows] = -np.inf
+    return _select_top_k(sims, k)
+
+
+def _normalized_rows(tfidf_matrix):
+    # sklearn and joblib are imported only where tables are built, so
+    # serving a stored table does not pay for them at startup
+    from sklearn.preprocessing import normalize
+
+    return normalize(tfidf_matrix.tocsr().astype(np.float32), norm='l2', copy=True)
+
+
+def matrix_fingerprint(tfidf_matrix) -> np.ndarray:
+    """Digest of a matrix's shape and row lengths (cheap; hashes ``indptr`` only)."""
+    matrix = csr_matrix(tfidf_matrix)
+    digest = hashlib.blake2b(np.asarray(matrix.shape, dtype=np.int64).tobytes(), digest_size=16)
+    digest.update(np.ascontiguousarray(matrix.indptr, dtype=np.int64).tobytes())
+    return np.frombuffer(digest.digest(), dtype=np.uint8)
+
+
+def exact_neighbors(tfidf_matrix, rows: np.ndarray, k: int) -> np.ndarray:
+    """
+    Exact top-``k`` cosine neighbor rows of ``rows`` (each excluding
+    itself), best first, computed in blocks of at most ``BLOCK_CELL_BUDGET``
+    similarity cells.
+    """
+    matrix = _normalized_rows(tfidf_matrix)
+    matrix_t = matrix.T.tocsr()
+    rows = np.asarray(rows, dtype=np.int64)
+    k = min(k, matrix.shape[0] - 1)
+    ids = np.empty((len(rows), k), dtype=np.int32)
+    step = max(1, BLOCK_CELL_BUDGET // matrix.shape[0])
+    for i in range(0, len(rows), step):
+        ids[i:i + step] = _top_k_rows(matrix, matrix_t, rows[i:i + step], k)[0]
+    return ids
+
+
+def build_neighbor_table(
+    tfidf_matrix,
+    k: int = DEFAULT_TOP_K,
+    block_size: Optional[int] = None,
+    n_jobs: int = -1
+) -> NeighborTable:
+    """
+    Compute the top-``k`` cosine neighbors of every row.
+
+    Args:
+        tfidf_matrix: Sparse TF-IDF matrix (one row per movie)
+        k: Number of neighbors to keep per movie
+        block_size: Rows per sparse matrix product; derived from
+            ``BLOCK_CELL_BUDGET`` when omitted
+        n_jobs: Parallel workers (joblib semantics, -1 = all cores)
+
+    Returns:
+        NeighborTable with int32 ids and float16 scores
+    """
+    matrix = _normalized_rows(tfidf_matrix)
+    n_rows = matrix.shape[0]
+    k = min(k, n_rows - 1)
+    if k < 1:
+        raise ValueError("Need at least two movies to build a neighbor table")
+
+    if block_size is None:
+        block_size = max(1, min(n_rows, BLOCK_CELL_BUDGET // n_rows))
+    dense_terms = min(DENSE_TERMS, matrix.shape[1], BLOCK_CELL_BUDGET // n_rows)
+    split = _SplitMatrix(matrix, dense_terms)
+
+    from joblib import Parallel, delayed
+
+    # Sparse products and argpartition release the GIL, so threads avoid
+    # copying the matrix into every worker.
+    blocks = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_top_k_block)(split, start, min(start + block_size, n_rows), k)
+        for start in range(0, n_rows, block_size)
+    )
+    ids = np.vstack([b[0] for b in blocks])
+    scores = np.vstack([b[1] for b in blocks])
+    return NeighborTable(ids, scores)
+
+
+def update_neighbor_table(
+    table: NeighborTable,
+    tfidf_matrix,
+    changed_rows,
+    block_size: Optional[int] = None
+) -> NeighborTable:
+    """
+    Patch a neighbor table after rows were replaced or appended.
+
+    Only the changed rows are recomputed in full. Every other row merges its
+    stored list (minus changed rows) with its similarities to the changed
+    rows; it is recomputed as well only when a changed row left its list and
+    the merged list no longer holds ``k`` entries at or above the old k-th
+    score, since something outside the list could then have moved up.
+
+    Args:
+        table: Table for the rows before the update
+        tfidf_matrix: Updated matrix; rows past ``len(table)`` are appended
+        changed_rows: Positions of replaced and appended rows
+
+    Returns:
+        NeighborTable covering every row of ``tfidf_matrix``
+    """
+    matrix = _normalized_rows(tfidf_matrix)
+    matrix_t = matrix.T.tocsr()
+    n_rows, n_old, k = matrix.shape[0], len(table), table.k
+    changed = np.union1d(np.asarray(changed_rows, dtype=np.int64), np.arange(n_old, n_rows))
+
+    ids = np.zeros((n_rows, k), dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float16)
+    ids[:n_old] = table.ids
+    scores[:n_old] = table.scores
+    if changed.size == 0:
+        return NeighborTable(ids, scores)
+
+    is_changed = np.zeros(n_rows, dtype=bool)
+    is_changed[changed] = True
+    changed_t = matrix[changed].T.tocsr()
+    if block_size is None:
+        block_size = max(1, BLOCK_CELL_BUDGET // (len(changed) + k))
+
+    stale = []
+    for start in range(0, n_old, block_size):
+        stop = min(start + block_size, n_old)
+        old_ids = np.asarray(table.ids[start:stop])
+        old_scores = np.asarray(table.scores[start:stop], dtype=np.float32)
+        dropped = is_changed[old_ids]
+
+        candidates = np.hstack([old_ids, np.broadcast_to(changed.astype(np.int32), (stop - start, len(changed)))])
+        candidate_scores = np.hstack([
+            np.where(dropped, -np.inf, old_scores),
+            (matrix[start:stop] @ changed_t).toarray(),
+        ])
+        block_ids, block_scores = _select_top_k(candidate_scores, k, candidates)
+        ids[start:stop] = block_ids
+        scores[start:stop] = block_scores
+
+        certified = (block_scores >= old_scores[:, -1:]).sum(axis=1) >= k
+        stale.append(start + np.flatnonzero(dropped.any(axis=1) & ~certified))
+
+    recompute = np.union1d(changed, np.concatenate(stale))
+    step = max(1, BLOCK_CELL_BUDGET // n_rows)
+    for i in range(0, len(recompute), step):
+        rows = recompute[i:i + step]
+        ids[rows], scores[rows] = _top_k_rows(matrix, matrix_t, rows, k)
+    return NeighborTable(ids, scores)
+
+
+def save_neighbor_table(table: NeighborTable, path: str = NEIGHBORS_PATH):
+    np.savez(path, ids=table.ids, scores=table.scores)
+
+
+def load_neighbor_table(path: str = NEIGHBORS_PATH) -> NeighborTable:
+    with np.load(path) as data:
+        return NeighborTable(data['ids'], data['scores'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-K neighbor table")
+    parser.add_argument('--matrix', default='Pkled Files/tfidf_matrix.pkl')
+    parser.add_argument('--output', default=NEIGHBORS_PATH)
+    parser.add_argument('--k', type=int, default=DEFAULT_TOP_K)
+    parser.add_argument('--block-size', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    with open(args.matrix, 'rb') as f:
+        tfidf_matrix = pickle.load(f)
+
+    table = build_neighbor_table(tfidf_matrix, args.k, args.block_size, args.n_jobs)
+    save_neighbor_table(table, args.output)
+    print(f"Saved {len(table)} x {table.k} neighbor table to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
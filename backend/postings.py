@@ -0,0 +1,222 @@
+# backend/postings.py
+"""
+Exact cosine kNN over term posting lists.
+
+TF-IDF rows are L2-normalized, so cosine similarity is a sparse dot product
+and only movies sharing at least one term with the query can score above
+zero. ``PostingIndex`` keeps a CSC (term -> movies) copy of the matrix and
+accumulates scores over the query terms' posting lists only, so a query
+costs the length of its posting lists rather than a pass over the catalog.
+
+For top-K it prunes max-score style. Terms are visited by their largest
+possible contribution (query weight x the term's largest weight in any
+movie). Once the k-th best partial score exceeds what all remaining terms
+together could add, no unseen movie can reach the top K. The remaining,
+typically long and low-IDF lists (genres, decade labels) are then never
+opened; instead only the few movies still in contention are completed
+from their own rows. The result is exact.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# A pruning check costs a pass over the score array; it is only tried before
+# posting lists at least this long (and at least 1/PRUNE_FRACTION of the
+# catalog), where skipping them can pay for it
+PRUNE_MIN_POSTINGS = 256
+PRUNE_FRACTION = 32
+# Gathering a contender's row entry costs about this many posting entries
+COMPLETION_COST = 2
+
+
+class SparseRows:
+    """
+    Stored entries of a few CSR rows, gathered straight from the CSR arrays
+    for dot products with sparse vectors (slicing and multiplying scipy
+    matrices costs far more at this size).
+    """
+
+    def __init__(self, matrix, rows: np.ndarray):
+        indptr = matrix.indptr
+        starts = indptr[rows].astype(np.int64)
+        lengths = indptr[rows + 1] - starts
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
+        self.n = len(rows)
+        # Segment starts of the non-empty rows for np.add.reduceat, which is
+        # much faster than a weighted bincount
+        self._nonempty = lengths > 0
+        self._starts = (ends - lengths)[self._nonempty]
+        self.columns = matrix.indices[positions]
+        self.values = matrix.data[positions]
+        self._dense = np.zeros(matrix.shape[1], dtype=np.float32)
+        self._matrix = matrix
+
+    def dot(self, indices: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """Dot product of every row with the sparse vector (indices, data)."""
+        sims = np.zeros(self.n)
+        if len(self.values) == 0:
+            return sims
+        dense = self._dense
+        dense[indices] = data
+        sims[self._nonempty] = np.add.reduceat(self.values * dense[self.columns], self._starts)
+        dense[indices] = 0
+        return sims
+
+    def dot_row(self, row: int) -> np.ndarray:
+        """Dot product of every row with row ``row`` of the matrix."""
+        start, stop = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+        return self.dot(self._matrix.indices[start:stop], self._matrix.data[start:stop])
+
+
+class PostingIndex:
+    """
+    Exact cosine kNN with the interface of
+    ``NearestNeighbors(metric='cosine', algorithm='brute')``, scored over
+    posting lists with max-score pruning.
+    """
+
+    def __init__(self, tfidf_matrix, n_neighbors: int = 11):
+        self.matrix = csr_matrix(tfidf_matrix)
+        self.n_neighbors = n_neighbors
+        postings = self.matrix.tocsc()
+        self.indptr = postings.indptr
+        self.rows = postings.indices
+        self.weights = postings.data
+        # Largest weight per term: the most a term can add per unit of query weight
+        self.max_weight = np.zeros(postings.shape[1], dtype=np.float32)
+        nonempty = np.flatnonzero(np.diff(self.indptr))
+        if len(nonempty):
+            self.max_weight[nonempty] = np.maximum.reduceat(self.weights, self.indptr[nonempty])
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the posting copy (the CSR matrix is shared with the model)."""
+        return self.indptr.nbytes + self.rows.nbytes + self.weights.nbytes + self.max_weight.nbytes
+
+    def _query(
+        self,
+        indices: np.ndarray,
+        data: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Best ``k`` allowed rows that share a term with the query, and their dot products."""
+        bounds = data * self.max_weight[indices]
+        order = np.argsort(-bounds, kind='stable')
+        terms, weights = indices[order], data[order].astype(np.float32)
+        # remaining[i]: the most terms i.. can still add to any movie;
+        # postings_left[i]: entries in their posting lists
+        remaining = np.cumsum(bounds[order][::-1])[::-1]
+        lengths = self.indptr[terms + 1] - self.indptr[terms]
+        postings_left = np.cumsum(lengths[::-1])[::-1]
+        check_length = max(PRUNE_MIN_POSTINGS, len(self) // PRUNE_FRACTION)
+
+        indptr, posting_rows, posting_weights = self.indptr, self.rows, self.weights
+        scores = np.zeros(len(self), dtype=np.float32)
+        # Movies scored so far; a bool array scans several times faster
+        # than the scores when a check needs them
+        visited = np.zeros(len(self), dtype=bool)
+        processed, next_check = 0, 0
+        for i, (term, weight) in enumerate(zip(terms.tolist(), weights.tolist())):
+            if processed and lengths[i] >= check_length and processed >= next_check:
+                pruned = self._prune(
+                    scores, np.flatnonzero(visited), k, mask, remaining[i], postings_left[i], terms[i:], weights[i:]
+                )
+                if pruned is not None:
+                    return pruned
+                # Space failed checks geometrically, so there are only a
+                # few per query
+                next_check = 2 * processed
+            start, stop = indptr[term], indptr[term + 1]
+            # Rows are unique within a posting list, so fancy += is safe
+            rows = posting_rows[start:stop]
+            scores[rows] += weight * posting_weights[start:stop]
+            visited[rows] = True
+            processed += stop - start
+
+        rows = np.flatnonzero(visited)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        return self._top(rows, scores[rows].astype(np.float64), k)
+
+    def _prune(self, scores, seen, k, mask, remaining, postings_left, terms, weights):
+        """
+        Top ``k`` without the remaining terms' posting lists, or None when
+        pruning cannot be shown safe or would cost more than scanning them.
+        """
+        if mask is not None:
+            seen = seen[mask[seen]]
+        if len(seen) < k:
+            return None
+        kth = np.partition(scores[seen], len(seen) - k)[len(seen) - k]
+        # An unseen movie scores at most `remaining`
+        if remaining >= kth:
+            return None
+        # Only movies whose partial score plus everything left could still
+        # reach the k-th best are completed, from their own rows
+        contenders = seen[scores[seen] + remaining >= kth]
+        # Completing a row entry costs about COMPLETION_COST posting entries
+        entries = (self.matrix.indptr[contenders + 1] - self.matrix.indptr[contenders]).sum()
+        if COMPLETION_COST * entries >= postings_left:
+            return None
+        sims = scores[contenders] + SparseRows(self.matrix, contenders).dot(terms, weights)
+        return self._top(contenders, sims, k)
+
+    @staticmethod
+    def _top(rows: np.ndarray, sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(rows) > k:
+            top = np.argpartition(-sims, k - 1)[:k]
+            rows, sims = rows[top], sims[top]
+        order = np.argsort(-sims, kind='stable')
+        return rows[order], sims[order]
+
+    def kneighbors(
+        self,
+        X,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True,
+        mask: Optional[np.ndarray] = None
+    ):
+        """
+        Exact cosine kNN for TF-IDF rows, nearest first.
+
+        Movies sharing no term with a query follow at distance 1 when
+        fewer than ``n_neighbors`` do; rows rejected by ``mask`` come last
+        at distance inf.
+
+        Returns:
+            ``(distances, indices)`` like NearestNeighbors, or only the
+            indices when ``return_distance`` is False
+        """
+        X = csr_matrix(X)
+        n_neighbors = min(n_neighbors or self.n_neighbors, len(self))
+        distances = np.empty((X.shape[0], n_neighbors))
+        indices = np.empty((X.shape[0], n_neighbors), dtype=np.int64)
+        for q in range(X.shape[0]):
+            start, stop = X.indptr[q], X.indptr[q + 1]
+            data = X.data[start:stop]
+            rows, sims = self._query(X.indices[start:stop], data, n_neighbors, mask)
+            sims = sims / max(np.sqrt(np.dot(data, data)), 1e-12)
+            if len(rows) < n_neighbors:
+                rows, sims = self._pad(rows, sims, n_neighbors, mask)
+            indices[q] = rows
+            distances[q] = 1.0 - sims
+        if not return_distance:
+            return indices
+        return distances, indices
+
+    def _pad(self, rows, sims, n, mask) -> Tuple[np.ndarray, np.ndarray]:
+        unused = np.ones(len(self), dtype=bool)
+        unused[rows] = False
+        fill = np.flatnonzero(unused if mask is None else unused & mask)[:n - len(rows)]
+        fill_sims = np.zeros(len(fill))
+        if len(rows) + len(fill) < n:
+            rejected = np.flatnonzero(unused & ~mask)[:n - len(rows) - len(fill)]
+            fill = np.concatenate([fill, rejected])
+            fill_sims = np.concatenate([fill_sims, np.full(len(rejected), -np.inf)])
+        return np.concatenate([rows, fill]), np.concatenate([sims, fill_sims])
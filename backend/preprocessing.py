@@ -0,0 +1,108 @@
+# backend/preprocessing.py
+"""
+Text preprocessing shared by the offline build and the serving side.
+
+Mirrors the notebook: overviews lose 4-digit years and punctuation, are
+lowercased and Porter-stemmed; genres and keywords are lowercased and
+stripped; the TF-IDF input ("soup") is genres + keywords + stemmed overview
++ decade label.
+
+pandas, scikit-learn and nltk are imported where used, so the serving side
+(free-text search, see text_search.py) can share the normalization without
+loading the build dependencies. ``CachedStemmer`` imports nltk (about two
+seconds, as it pulls in scipy.stats, scikit-learn and pandas) on its first
+memo miss rather than when it is created.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_YEAR_PATTERN = re.compile(r'\b(19[0-9]{2}|20[0-9]{2})\b')
+_PUNCT_PATTERN = re.compile(r'[^\w\s]')
+
+# TfidfVectorizer settings used for the served model
+TFIDF_PARAMS = dict(
+    stop_words='english',
+    min_df=10,
+    max_df=0.6,
+    max_features=15000,
+    ngram_range=(1, 2),
+)
+
+
+class CachedStemmer:
+    """
+    PorterStemmer with a word -> stem memo (titles reuse a small vocabulary).
+
+    Args:
+        max_size: Stop memoizing new words at this many entries (None: no
+            limit); bounds the memo when the words come from user input
+    """
+
+    def __init__(self, cache: Optional[Dict[str, str]] = None, max_size: Optional[int] = None):
+        self._stemmer = None
+        self.cache: Dict[str, str] = dict(cache or {})
+        self.max_size = max_size
+
+    def stem(self, word: str) -> str:
+        try:
+            return self.cache[word]
+        except KeyError:
+            if self._stemmer is None:
+                from nltk.stem.porter import PorterStemmer
+
+                self._stemmer = PorterStemmer()
+            stemmed = self._stemmer.stem(word)
+            if self.max_size is None or len(self.cache) < self.max_size:
+                self.cache[word] = stemmed
+            return stemmed
+
+
+def tokenize_overview(text: str) -> List[str]:
+    """Year removal, lowercasing and punctuation stripping, then split."""
+    text = _YEAR_PATTERN.sub('', text)
+    text = text.lower()
+    text = _PUNCT_PATTERN.sub('', text)
+    return text.split()
+
+
+def clean_and_stem_overview(text: str, stemmer: Optional[CachedStemmer] = None) -> str:
+    """
+    Clean and stem the overview text
+    """
+    stemmer = stemmer or CachedStemmer()
+    return ' '.join(stemmer.stem(word) for word in tokenize_overview(text))
+
+
+def clean_text(text) -> str:
+    """
+    Convert text to lowercase and strip whitespace
+    """
+    import pandas as pd
+
+    if pd.isna(text):
+        return ""
+
+    return str(text).lower().strip()
+
+
+def decade_label(year) -> str:
+    return f"{(int(year) // 10) * 10}s"
+
+
+def build_soup(genres: str, keywords: str, overview_stemmed: str, decade: str) -> str:
+    return genres + ' ' + keywords + ' ' + overview_stemmed + ' ' + decade
+
+
+def frozen_vectorizer(terms: Sequence[str], idf: np.ndarray) -> 'TfidfVectorizer':
+    """
+    Rebuild the fitted TfidfVectorizer from its stored vocabulary (in column
+    order) and IDF weights, so new soups map into the existing feature space
+    without a refit.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS, vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.idf_ = np.asarray(idf, dtype=np.float64)
+    return vectorizer
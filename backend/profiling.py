@@ -0,0 +1,109 @@
+# backend/profiling.py
+"""
+Opt-in sampling profiler for slow requests.
+
+When ``PROFILE_SLOW_MS`` is set, a daemon thread samples the Python stack of
+every thread currently inside ``profiler.track(...)`` every
+``PROFILE_INTERVAL_MS``. A tracked block that runs longer than the
+threshold writes its samples as collapsed stacks (``frame;frame;frame
+count`` per line) to ``PROFILE_DIR``; ``flamegraph.pl``, speedscope and
+inferno read that format directly. Requests under the threshold discard
+their samples, and nothing runs at all when the variable is unset.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))  # 0 disables profiling
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """
+    Args:
+        threshold_ms: Blocks slower than this are written out
+        interval_ms: Sampling period
+        output_dir: Directory for ``.folded`` files
+    """
+
+    def __init__(self, threshold_ms: float, interval_ms: float = PROFILE_INTERVAL_MS, output_dir: str = PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.dumped = 0
+        self._active: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            self._sampler.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+    @contextmanager
+    def track(self, name: str):
+        """Sample the current thread for the duration of the block."""
+        thread_id = threading.get_ident()
+        stacks: Counter = Counter()
+        with self._lock:
+            self._ensure_sampler()
+            self._active[thread_id] = stacks
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                del self._active[thread_id]
+            if elapsed >= self.threshold and stacks:
+                self._dump(name, elapsed, stacks)
+
+    def _dump(self, name: str, elapsed: float, stacks: Counter):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(self.output_dir, f'{stamp}-{name}-{int(elapsed * 1000)}ms-{threading.get_ident()}.folded')
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        self.dumped += 1
+
+
+@contextmanager
+def _disabled(name: str):
+    yield
+
+
+def track(name: str):
+    """``profiler.track`` when profiling is enabled, else a no-op block."""
+    if profiler is None:
+        return _disabled(name)
+    return profiler.track(name)
+
+
+profiler = SlowRequestProfiler(PROFILE_SLOW_MS) if PROFILE_SLOW_MS > 0 else None
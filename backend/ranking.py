@@ -0,0 +1,122 @@
+# backend/ranking.py
+"""
+Re-ranking of retrieved candidates with per-movie priors and diversity.
+
+Retrieval ranks by TF-IDF cosine alone, which often surfaces obscure movies
+whose text happens to match. The build stores three priors per movie, each
+in [0, 1], as one contiguous ``(n_rows, 3)`` float32 array:
+
+* ``popularity``: ``log1p`` of TMDB popularity over the catalog maximum
+* ``rating``: vote average shrunk towards the catalog mean by vote count
+  (a weighted rating, so a 10/10 from three votes does not dominate) / 10
+* ``recency``: release year scaled from the oldest to the newest movie
+
+A ``Reranker`` scores a candidate as ``similarity + sum(weight * prior)``
+and can pick the page by maximal marginal relevance (MMR), trading that
+score against similarity to the movies already picked. Looking up the
+priors of a hundred candidates is a single fancy index.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+from postings import SparseRows
+
+PRIOR_NAMES = ('popularity', 'rating', 'recency')
+# Candidates retrieved before re-ranking (never fewer than the page needs)
+RERANK_CANDIDATES = int(os.environ.get('RERANK_CANDIDATES', 100))
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, np.nan)
+
+
+def compute_priors(popularity, vote_average, vote_count, release_year) -> np.ndarray:
+    """
+    Prior array for a catalog; missing values give a prior of 0 (rating:
+    the catalog mean).
+
+    Returns:
+        float32 array of shape ``(n_rows, len(PRIOR_NAMES))``
+    """
+    popularity = np.log1p(np.nan_to_num(_finite(popularity)).clip(0))
+    priors = np.zeros((len(popularity), len(PRIOR_NAMES)), dtype=np.float32)
+    if len(popularity) == 0:
+        return priors
+    if popularity.max() > 0:
+        priors[:, 0] = popularity / popularity.max()
+
+    votes = np.nan_to_num(_finite(vote_count)).clip(0)
+    average = _finite(vote_average)
+    rated = (votes > 0) & np.isfinite(average)
+    if rated.any():
+        mean = average[rated].mean()
+        # Votes at which a movie's own average and the mean weigh equally
+        m = np.median(votes[rated])
+        average = np.where(rated, average, mean)
+        priors[:, 1] = ((votes * average + m * mean) / (votes + m) / 10).clip(0, 1)
+
+    years = _finite(release_year)
+    known = np.isfinite(years)
+    if known.any():
+        low, high = years[known].min(), years[known].max()
+        priors[:, 2] = np.where(known, (years - low) / max(high - low, 1), 0)
+    return priors
+
+
+def _mmr(scores: np.ndarray, rows: np.ndarray, candidates: SparseRows, n: int, diversity: float) -> np.ndarray:
+    """Greedy MMR: ``(1 - diversity) * score - diversity * max sim to picked``."""
+    gain = (1.0 - diversity) * scores
+    penalty = np.zeros(len(scores))
+    available = np.ones(len(scores), dtype=bool)
+    picked = []
+    for _ in range(min(n, len(scores))):
+        best = int(np.argmax(np.where(available, gain - diversity * penalty, -np.inf)))
+        picked.append(best)
+        available[best] = False
+        # Rows are L2-normalized, so dot products are cosines
+        np.maximum(penalty, candidates.dot_row(rows[best]), out=penalty)
+    return np.asarray(picked, dtype=np.int64)
+
+
+class Reranker:
+    """
+    Per-request blend of similarity, priors and diversity.
+
+    Args:
+        popularity, rating, recency: Weights of the priors (0 ignores one)
+        diversity: MMR trade-off in [0, 1]; 0 keeps the blended order
+    """
+
+    def __init__(self, popularity: float = 0.0, rating: float = 0.0, recency: float = 0.0, diversity: float = 0.0):
+        self.weights = np.array([popularity, rating, recency], dtype=np.float32)
+        self.diversity = float(diversity)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.weights.any()) or self.diversity > 0
+
+    def pool_size(self, n: int) -> int:
+        """Candidates to retrieve for a page ending at ``n``."""
+        return max(n, RERANK_CANDIDATES)
+
+    def rerank(self, rows, query, tfidf_matrix, priors: Optional[np.ndarray], n: int) -> np.ndarray:
+        """
+        Best ``n`` of the candidate ``rows`` for a TF-IDF ``query`` row.
+
+        Args:
+            priors: The catalog's prior array; None scores similarity only
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return rows
+        candidates = SparseRows(tfidf_matrix, rows)
+        norm = np.sqrt(np.dot(query.data, query.data))
+        scores = candidates.dot(query.indices, query.data) / max(norm, 1e-12)
+        if priors is not None and self.weights.any():
+            scores = scores + np.asarray(priors)[rows] @ self.weights
+        if self.diversity > 0:
+            return rows[_mmr(scores, rows, candidates, n, self.diversity)]
+        return rows[np.argsort(-scores, kind='stable')[:n]]
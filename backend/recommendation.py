@@ -1,72 +1,538 @@
 # backend/recommendation.py
 import pickle
-import pandas as pd
-from sklearn.neighbors import NearestNeighbors
-import difflib
-from typing import List, Optional, Tuple
-
-def load_model_components():
-    with open('Pkled Files/dataframe.pkl', 'rb') as f:
-        df = pickle.load(f)
-
-    with open('Pkled Files/tfidf_matrix.pkl', 'rb') as f:
-        tfidf_matrix = pickle.load(f)
-
-    with open('Pkled Files/indices.pkl', 'rb') as f:
-        indices = pickle.load(f)
-
-    nn_model = NearestNeighbors(
-        n_neighbors=11,
-        metric='cosine',
-        algorithm='brute',
-        n_jobs=-1
+import numpy as np
+from scipy.sparse import csr_matrix
+import os
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from artifacts import ARTIFACT_DIR, ModelArtifacts, artifacts_exist, load_artifacts
+from dedup import DUPLICATES_PATH, load_duplicates
+from ivf import IVF_PATH, IVFIndex, load_ivf_index
+from lsa import LSA_PATH, LSAIndex, load_lsa_index
+from metrics import TITLE_LOOKUPS, stage_timer
+from movie_store import MovieStore
+from neighbors import NEIGHBORS_PATH, ExactIndex, NeighborTable, load_neighbor_table
+from postings import PostingIndex, SparseRows
+from ranking import Reranker
+from title_index import TitleIndex, normalize_title
+
+# Live kNN engine: 'exact' (cosine over term posting lists, see postings.py),
+# 'brute' (the same results from a product with the whole matrix), 'lsa'
+# (dense low-rank vectors, see lsa.py) or 'ivf' (inverted lists, see
+# ivf.py); the last two are approximate. The precomputed neighbor table
+# still answers known titles first.
+SIMILARITY_ENGINE = os.environ.get('SIMILARITY_ENGINE', 'exact')
+
+def build_similarity_engine(
+    tfidf_matrix,
+    artifacts: Optional[ModelArtifacts] = None,
+    engine: str = SIMILARITY_ENGINE
+):
+    """
+    kNN model with a NearestNeighbors-style ``kneighbors``. Falls back to
+    exact search when the requested engine has no index for this catalog.
+    """
+    index = None
+    if engine == 'lsa':
+        if artifacts is not None:
+            index = artifacts.lsa_index
+        if index is None and os.path.exists(LSA_PATH):
+            try:
+                index = load_lsa_index(tfidf_matrix, LSA_PATH)
+            except ValueError as exc:
+                print(f"Ignoring stale LSA index: {exc}")
+    elif engine == 'ivf':
+        if artifacts is not None:
+            index = artifacts.ivf_index
+        if index is None and os.path.exists(IVF_PATH):
+            try:
+                index = load_ivf_index(tfidf_matrix, IVF_PATH)
+            except ValueError as exc:
+                print(f"Ignoring stale IVF index: {exc}")
+    elif engine == 'brute':
+        return ExactIndex(tfidf_matrix)
+    elif engine != 'exact':
+        raise ValueError(f"Unknown similarity engine {engine!r}")
+
+    if index is not None and len(index) == tfidf_matrix.shape[0]:
+        return index
+    if engine != 'exact':
+        print(f"No {engine} index matching the catalog, using exact kNN")
+
+    return PostingIndex(tfidf_matrix)
+
+def load_model_components(timings: Optional[Dict[str, float]] = None):
+    """
+    Load the serving components.
+
+    Args:
+        timings: If given, filled with seconds per load stage
+
+    Returns:
+        ``(movies, tfidf_matrix, indices, nn_model, neighbor_table)``
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+
+    def mark(stage: str):
+        nonlocal start
+        now = time.perf_counter()
+        timings[stage] = now - start
+        start = now
+
+    # Prefer the memory-mapped artifact directory (see artifacts.py); the
+    # pickles remain supported until they have been converted.
+    artifacts = None
+    if artifacts_exist(ARTIFACT_DIR):
+        artifacts = load_artifacts(ARTIFACT_DIR)
+        movies = MovieStore.from_artifacts(artifacts)
+        tfidf_matrix = artifacts.tfidf_matrix
+        neighbor_table = artifacts.neighbor_table
+    else:
+        with open('Pkled Files/dataframe.pkl', 'rb') as f:
+            df = pickle.load(f)
+        # Near-duplicate clusters from ``dedup.py build``, if it was run
+        clusters = load_duplicates(DUPLICATES_PATH) if os.path.exists(DUPLICATES_PATH) else None
+        # Only the column store is kept; the DataFrame is not used for serving
+        movies = MovieStore.from_dataframe(df.reset_index(drop=True), clusters)
+        del df
+
+        with open('Pkled Files/tfidf_matrix.pkl', 'rb') as f:
+            tfidf_matrix = pickle.load(f)
+
+        # Optional precomputed neighbors (see neighbors.py); live kNN otherwise
+        neighbor_table = None
+        if os.path.exists(NEIGHBORS_PATH):
+            neighbor_table = load_neighbor_table(NEIGHBORS_PATH)
+    mark('catalog')
+
+    # Title/id/row lookups replace the pickled title -> id Series
+    indices = TitleIndex(movies.titles, movies.ids, movies.years)
+    mark('title_index')
+
+    nn_model = build_similarity_engine(tfidf_matrix, artifacts)
+    mark('engine')
+
+    return movies, tfidf_matrix, indices, nn_model, neighbor_table
+
+# Queries per stacked kNN call in batch mode (bounds the dense distance block)
+BATCH_CHUNK_SIZE = 256
+# Default cutoff for fuzzy title correction, shared by the API and the UI
+DEFAULT_MIN_SIMILARITY = 0.6
+
+def resolve_title(
+    movie_title: str,
+    movies: MovieStore,
+    indices: TitleIndex,
+    min_similarity: float,
+    release_year: Optional[int] = None
+) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Row for a title, exact first and fuzzy (``min_similarity`` cutoff) second.
+
+    Returns:
+        ``(row, corrected_title)``; corrected_title is set only when the
+        fuzzy match was used, row is None when nothing matches
+    """
+    key = normalize_title(movie_title)
+    corrected_title = None
+
+    with stage_timer('resolve'):
+        row_idx = indices.resolve(key, release_year)
+    if row_idx is not None:
+        TITLE_LOOKUPS.inc(result='exact')
+        return row_idx, None
+    # A known title from another year is a miss, not a typo to correct
+    if indices.unmatched_years(key, release_year) is not None:
+        TITLE_LOOKUPS.inc(result='not_found')
+        return None, None
+
+    with stage_timer('fuzzy'):
+        # "Titel (1999)" is corrected as "Titel", keeping the year
+        base, year = indices.split_year(key, release_year)
+        close_matches = indices.fuzzy.get_close_matches(base, n=1, cutoff=min_similarity)
+        if close_matches:
+            row_idx = indices.resolve(close_matches[0], year)
+            if row_idx is not None:
+                corrected_title = movies.titles[row_idx]
+    TITLE_LOOKUPS.inc(result='fuzzy' if row_idx is not None else 'not_found')
+
+    return row_idx, corrected_title
+
+# Below this fraction of allowed rows, only the allowed rows are scored
+MASK_GATHER_FRACTION = 0.25
+
+def _masked_exact(tfidf_matrix, query, n: int, mask: np.ndarray) -> np.ndarray:
+    """Exact top-``n`` cosine rows among those allowed by ``mask``."""
+    allowed = np.flatnonzero(mask)
+    # TF-IDF rows are L2-normalized, so the dot product is the cosine
+    if len(allowed) < MASK_GATHER_FRACTION * len(mask):
+        candidates = allowed
+        sims = (tfidf_matrix[allowed] @ query.T).toarray().ravel()
+    else:
+        candidates = None
+        sims = (tfidf_matrix @ query.T).toarray().ravel()
+        sims[~mask] = -np.inf
+    n = min(n, len(allowed))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-sims, n - 1)[:n]
+    top = top[np.argsort(-sims[top], kind='stable')]
+    return top if candidates is None else candidates[top]
+
+def _search_rows(query, tfidf_matrix, nn_model, n: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Best ``n`` rows for a TF-IDF query row among those allowed by ``mask``."""
+    n = min(n, tfidf_matrix.shape[0])
+    if mask is None:
+        _, found = nn_model.kneighbors(query, n_neighbors=n, return_distance=True)
+        return found[0]
+    # The posting index takes masks natively, but scoring only the allowed
+    # rows is cheaper when they are few
+    native = isinstance(nn_model, (LSAIndex, IVFIndex)) or (
+        isinstance(nn_model, PostingIndex) and np.count_nonzero(mask) >= MASK_GATHER_FRACTION * len(mask)
     )
-    nn_model.fit(tfidf_matrix)
+    if not native:
+        return _masked_exact(tfidf_matrix, query, n, mask)
+    distances, found = nn_model.kneighbors(query, n_neighbors=n, return_distance=True, mask=mask)
+    return found[0][np.isfinite(distances[0])]
+
+def _neighbor_rows(
+    row_idx: int,
+    tfidf_matrix,
+    nn_model,
+    neighbor_table: Optional[NeighborTable],
+    n: int,
+    mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    The ``n`` rows most similar to ``row_idx`` (itself excluded) among the
+    rows allowed by ``mask``, best first; fewer only if the mask allows fewer.
+    """
+    if neighbor_table is not None and row_idx in neighbor_table:
+        rows = neighbor_table.ids[row_idx]
+        # The table is the true top-K, so its allowed entries are the best
+        # allowed rows; it answers whenever it holds enough of them
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if len(rows) >= n:
+            return rows[:n]
+
+    found = _search_rows(tfidf_matrix[row_idx], tfidf_matrix, nn_model, n + 1, mask)
+    return found[found != row_idx][:n]
+
+# Extra candidates retrieved so a page survives collapsing near-duplicates
+DEDUP_EXTRA = 10
+
+def _dedupe(rows, clusters: Optional[np.ndarray], exclude: Sequence[int] = ()) -> np.ndarray:
+    """
+    ``rows`` keeping the first of each near-duplicate cluster (see dedup.py)
+    and none of the clusters of ``exclude`` (the seeds), order preserved.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if clusters is None or len(rows) == 0:
+        return rows
+    labels = clusters[rows]
+    keep = np.zeros(len(rows), dtype=bool)
+    keep[np.unique(labels, return_index=True)[1]] = True
+    if len(exclude):
+        keep &= ~np.isin(labels, clusters[np.asarray(exclude, dtype=np.int64)])
+    return rows[keep]
 
-    return df, tfidf_matrix, indices, nn_model
+def _distinct(fetch: Callable[[int], np.ndarray], pool: int, n: int, clusters, exclude: Sequence[int] = ()) -> np.ndarray:
+    """
+    ``fetch(pool)`` with near-duplicates collapsed, fetching twice as deep
+    while duplicates leave fewer than ``n`` rows and more are available.
+    """
+    rows = fetch(pool)
+    if clusters is None:
+        return rows
+    while True:
+        distinct = _dedupe(rows, clusters, exclude)
+        if len(distinct) >= n or len(rows) < pool:
+            return distinct
+        pool *= 2
+        rows = fetch(pool)
+
+def recommend_for_row(
+    row_idx: int,
+    movies: MovieStore,
+    tfidf_matrix,
+    nn_model: ExactIndex,
+    neighbor_table: Optional[NeighborTable] = None,
+    k: int = 10,
+    offset: int = 0,
+    mask: Optional[np.ndarray] = None,
+    reranker: Optional[Reranker] = None
+) -> np.ndarray:
+    """
+    Rows of recommendations ``offset .. offset + k`` for a resolved row.
+
+    An active ``reranker`` re-orders a larger candidate pool by similarity,
+    priors and diversity before the page is cut. Near-duplicates of the
+    seed and of better-ranked results are left out when the model has
+    cluster labels.
+    """
+    clusters = movies.clusters
+    n = pool = offset + k
+    rerank = reranker is not None and reranker.active
+    if rerank:
+        pool = reranker.pool_size(n)
+    elif clusters is not None:
+        pool = n + DEDUP_EXTRA
+    # A stored row re-ranks / dedupes its table entries instead of paying
+    # for a live scan (build with a larger --neighbors-k for a deeper pool)
+    if pool > n and neighbor_table is not None and row_idx in neighbor_table:
+        pool = max(n, min(pool, neighbor_table.k))
+    with stage_timer('neighbors'):
+        rows = _distinct(
+            lambda size: _neighbor_rows(row_idx, tfidf_matrix, nn_model, neighbor_table, size, mask),
+            pool, n, clusters, [row_idx]
+        )
+    if rerank:
+        with stage_timer('rerank'):
+            rows = reranker.rerank(rows, tfidf_matrix[row_idx], tfidf_matrix, movies.priors, n)
+    return np.asarray(rows[offset:n], dtype=np.int64)
+
+def recommend_for_query(
+    query,
+    movies: MovieStore,
+    tfidf_matrix,
+    nn_model: ExactIndex,
+    k: int = 10,
+    offset: int = 0,
+    mask: Optional[np.ndarray] = None,
+    reranker: Optional[Reranker] = None
+) -> np.ndarray:
+    """
+    Rows of recommendations ``offset .. offset + k`` for a TF-IDF query
+    row that is not a catalog movie (free-text search). Only movies sharing
+    a term with the query are returned.
+    """
+    if query.nnz == 0:
+        return np.empty(0, dtype=np.int64)
+    n = offset + k
+    rerank = reranker is not None and reranker.active
+    pool = reranker.pool_size(n) if rerank else n + (DEDUP_EXTRA if movies.clusters is not None else 0)
+
+    def fetch(size: int) -> np.ndarray:
+        rows = _search_rows(query, tfidf_matrix, nn_model, size, mask)
+        # Engines fill up with unrelated movies when fewer share a term
+        return rows[SparseRows(tfidf_matrix, rows).dot(query.indices, query.data) > 0]
+
+    with stage_timer('neighbors'):
+        rows = _distinct(fetch, pool, n, movies.clusters)
+    if rerank:
+        with stage_timer('rerank'):
+            rows = reranker.rerank(rows, query, tfidf_matrix, movies.priors, n)
+    return np.asarray(rows[offset:n], dtype=np.int64)
 
 def get_recommendations(
     movie_title: str,
-    df: pd.DataFrame,
+    movies: MovieStore,
     tfidf_matrix,
-    indices: pd.Series,
-    nn_model: NearestNeighbors,
-    min_similarity: float = 0.6
-) -> Tuple[List[dict], Optional[str]]:
-    key = movie_title.lower().strip()
-    corrected_title = None
+    indices: TitleIndex,
+    nn_model: ExactIndex,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    neighbor_table: Optional[NeighborTable] = None,
+    release_year: Optional[int] = None,
+    k: int = 10,
+    offset: int = 0,
+    mask: Optional[np.ndarray] = None,
+    reranker: Optional[Reranker] = None
+) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """
+    Recommendations ``offset .. offset + k`` for one title.
 
-    if key not in indices.index:
-        close_matches = difflib.get_close_matches(key, indices.index, n=1, cutoff=min_similarity)
-        if close_matches:
-            key = close_matches[0]
-            corrected_movie_id = indices[[key]].iloc[0]
-            corrected_title = df[df['id'] == corrected_movie_id]['title'].iloc[0]
+    ``mask`` (see filters.py) restricts the candidates during scoring, so a
+    filtered page is still full whenever enough movies pass the filter.
+
+    Returns:
+        ``(records, corrected_title)``; records is None when the title
+        cannot be resolved
+    """
+    row_idx, corrected_title = resolve_title(movie_title, movies, indices, min_similarity, release_year)
+    if row_idx is None:
+        return None, None
+    rows = recommend_for_row(row_idx, movies, tfidf_matrix, nn_model, neighbor_table, k, offset, mask, reranker)
+    with stage_timer('serialize'):
+        return movies.records(rows), corrected_title
+
+# Seeds per multi-seed request, and the rank constant of reciprocal-rank fusion
+MAX_SEEDS = 500
+RRF_K = 60
+
+def _resolve_query(
+    query: dict,
+    movies: MovieStore,
+    indices: TitleIndex,
+    min_similarity: float
+) -> Tuple[Optional[int], Optional[str]]:
+    """Row for a ``{"id"}`` or ``{"title", "release_year"}`` query."""
+    if query.get('id') is not None:
+        return indices.row_for_id(query['id']), None
+    if query.get('title'):
+        return resolve_title(query['title'], movies, indices, min_similarity, query.get('release_year'))
+    return None, None
+
+def get_multi_seed_recommendations(
+    seeds: Sequence[dict],
+    movies: MovieStore,
+    tfidf_matrix,
+    indices: TitleIndex,
+    nn_model: ExactIndex,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    neighbor_table: Optional[NeighborTable] = None,
+    method: str = 'centroid',
+    k: int = 10,
+    offset: int = 0,
+    mask: Optional[np.ndarray] = None,
+    reranker: Optional[Reranker] = None
+) -> Tuple[np.ndarray, List[int], List[dict]]:
+    """
+    "More like these" for a set of seed movies, seeds excluded.
+
+    Each seed is a query dict as in batch mode plus an optional ``weight``.
+
+    * ``centroid`` sums the seeds' TF-IDF rows by weight into one query and
+      runs a single similarity pass, so cost barely depends on the number
+      of seeds.
+    * ``rrf`` fuses the per-seed rankings with weighted reciprocal-rank
+      fusion; seeds in the neighbor table cost a lookup, others one search
+      each.
+
+    An active ``reranker`` re-orders the candidates by their similarity to
+    the weighted centroid, priors and diversity. Near-duplicates of the
+    seeds and of better-ranked results are left out.
+
+    Returns:
+        ``(rows of recommendations offset .. offset + k, seed rows,
+        unresolved seed queries)``
+    """
+    weights: Dict[int, float] = {}
+    unresolved = []
+    for seed in seeds:
+        row_idx, _ = _resolve_query(seed, movies, indices, min_similarity)
+        if row_idx is None:
+            unresolved.append(seed)
         else:
-            return [], None
-
-    movie_id = indices[[key]].iloc[0]
-    movie_row = df[df['id'] == movie_id]
-    if len(movie_row) == 0:
-        return [], None
-
-    row_idx = movie_row.index[0]
-    movie_vector = tfidf_matrix[row_idx]
-    distances, neighbor_indices = nn_model.kneighbors(movie_vector, return_distance=True)
-    recommended_indices = neighbor_indices[0][1:11]
-    
-    # CHANGE: Return full movie objects instead of just titles
-    recommended_movies_data = df.iloc[recommended_indices]
-    recommended_movies = []
-    
-    for _, movie in recommended_movies_data.iterrows():
-        movie_obj = {
-            "title": movie['title'],
-            "overview": movie.get('overview', 'No description available'),
-            "poster_path": movie.get('poster_path', ''),
-            "genres": movie.get('genres', ''),
-            "release_year": movie.get('release_year', None)
-        }
-        recommended_movies.append(movie_obj)
-
-    return recommended_movies, corrected_title
+            weights[row_idx] = weights.get(row_idx, 0.0) + float(seed.get('weight') or 1.0)
+    if not weights:
+        return np.empty(0, dtype=np.int64), [], unresolved
+
+    seed_rows = np.fromiter(weights, dtype=np.int64, count=len(weights))
+    allowed = np.ones(tfidf_matrix.shape[0], dtype=bool) if mask is None else mask.copy()
+    allowed[seed_rows] = False
+    n = offset + k
+    rerank = reranker is not None and reranker.active
+    pool = reranker.pool_size(n) if rerank else n + (DEDUP_EXTRA if movies.clusters is not None else 0)
+    seed_weights = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+    centroid = csr_matrix(csr_matrix(seed_weights[None, :]) @ tfidf_matrix[seed_rows])
+
+    def fetch(size: int) -> np.ndarray:
+        if method == 'centroid':
+            return _search_rows(centroid, tfidf_matrix, nn_model, size, allowed)
+        # Each seed ranks enough candidates to fill the page on its own
+        scores: Dict[int, float] = {}
+        for row_idx, weight in weights.items():
+            ranked = _neighbor_rows(row_idx, tfidf_matrix, nn_model, neighbor_table, size, allowed)
+            for rank, row in enumerate(ranked.tolist()):
+                scores[row] = scores.get(row, 0.0) + weight / (RRF_K + rank + 1)
+        return np.asarray(sorted(scores, key=scores.get, reverse=True)[:size], dtype=np.int64)
+
+    if method not in ('centroid', 'rrf'):
+        raise ValueError(f"Unknown multi-seed method {method!r}")
+    with stage_timer('neighbors'):
+        rows = _distinct(fetch, pool, n, movies.clusters, seed_rows)
+    if rerank:
+        with stage_timer('rerank'):
+            rows = reranker.rerank(rows, centroid, tfidf_matrix, movies.priors, n)
+    return np.asarray(rows[offset:n], dtype=np.int64), seed_rows.tolist(), unresolved
+
+def iter_batch_recommendations(
+    queries: Iterable[dict],
+    movies: MovieStore,
+    tfidf_matrix,
+    indices: TitleIndex,
+    nn_model: ExactIndex,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    neighbor_table: Optional[NeighborTable] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE
+) -> Iterator[dict]:
+    """
+    Recommendations for many movies, yielded one result per query in order.
+
+    Each query is a dict with a ``title`` or TMDB ``id`` (and optionally a
+    ``release_year``). Queries are resolved in chunks; rows missing from the
+    neighbor table are stacked into one sparse matrix per chunk and answered
+    by a single kNN call, so memory stays bounded for any batch size.
+    Near-duplicates are collapsed as in ``recommend_for_row``.
+
+    Yields:
+        ``{"query", "recommended", "corrected_title"}`` on success or
+        ``{"query", "error"}`` when the movie cannot be resolved
+    """
+    queries = iter(queries)
+    while True:
+        chunk = list(islice(queries, chunk_size))
+        if not chunk:
+            return
+
+        resolved = []
+        for query in chunk:
+            resolved.append(_resolve_query(query, movies, indices, min_similarity))
+
+        clusters = movies.clusters
+        depth = 10 if clusters is None else 10 + DEDUP_EXTRA
+        neighbors = {}
+        live_rows = []
+        for row_idx, _ in resolved:
+            if row_idx is None or row_idx in neighbors:
+                continue
+            if neighbor_table is not None and row_idx in neighbor_table and neighbor_table.k >= 10:
+                neighbors[row_idx] = neighbor_table.lookup(row_idx, depth)[0]
+            else:
+                neighbors[row_idx] = None
+                live_rows.append(row_idx)
+
+        if live_rows:
+            with stage_timer('neighbors'):
+                _, neighbor_indices = nn_model.kneighbors(
+                    tfidf_matrix[live_rows], n_neighbors=depth + 1, return_distance=True
+                )
+            for row_idx, row_neighbors in zip(live_rows, neighbor_indices):
+                neighbors[row_idx] = row_neighbors[row_neighbors != row_idx][:depth]
+
+        if clusters is not None:
+            for row_idx, rows in neighbors.items():
+                rows = _dedupe(rows, clusters, [row_idx])
+                if len(rows) < 10:
+                    # Mostly duplicates: search this one deeper on its own
+                    rows = _distinct(
+                        lambda size: _neighbor_rows(row_idx, tfidf_matrix, nn_model, neighbor_table, size),
+                        2 * depth, 10, clusters, [row_idx]
+                    )
+                neighbors[row_idx] = rows[:10]
+
+        for query, (row_idx, corrected_title) in zip(chunk, resolved):
+            if row_idx is None:
+                yield {"query": query, "error": "Movie not found"}
+            else:
+                yield {
+                    "query": query,
+                    "recommended": movies.records(neighbors[row_idx]),
+                    "corrected_title": corrected_title
+                }
+
+def get_batch_recommendations(
+    queries: Iterable[dict],
+    movies: MovieStore,
+    tfidf_matrix,
+    indices: TitleIndex,
+    nn_model: ExactIndex,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    neighbor_table: Optional[NeighborTable] = None
+) -> List[dict]:
+    return list(iter_batch_recommendations(
+        queries, movies, tfidf_matrix, indices, nn_model, min_similarity, neighbor_table
+    ))
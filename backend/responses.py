@@ -0,0 +1,209 @@
+# backend/responses.py
+"""
+Fast, cache-friendly JSON responses for the recommendation endpoints.
+
+Cached responses hold result rows, not movie records. A response body is
+assembled from per-movie JSON fragments. Each fragment is encoded once per
+(row, field selection, overview length) and kept in an LRU, so a response
+for known movies is a few dict lookups and a byte join. Encoding uses
+orjson when it is installed and the standard library otherwise.
+
+Clients can ask for fewer fields (``fields=title,poster_path``) and for
+overviews cut to ``overview_chars``. Bodies get a strong ETag (a hash of
+the bytes), and GET requests whose ``If-None-Match`` matches are answered
+with 304 and no body. Bodies above ``RESPONSE_COMPRESS_MIN_BYTES`` are
+compressed with brotli (if the ``brotli`` package is installed) or gzip,
+whichever the client accepts. Batch streams are compressed chunk by chunk.
+"""
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from typing import AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from cache import LRUCache
+from movie_store import MovieStore
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is offered without it
+    brotli = None
+
+# Fields of a movie record, in response order
+RESPONSE_FIELDS = ('id', 'title', 'overview', 'poster_path', 'genres', 'release_year')
+# Encoded movie fragments kept per process (entries and bytes)
+FRAGMENT_CACHE_SIZE = int(os.environ.get('RESPONSE_FRAGMENT_CACHE', 50_000))
+FRAGMENT_CACHE_BYTES = int(os.environ.get('RESPONSE_FRAGMENT_CACHE_BYTES', 64 * 1024 * 1024))
+# Smaller bodies are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Field selection from a comma-separated list, in response order (None:
+    all fields).
+
+    Raises:
+        ValueError: On an unknown field name
+    """
+    if fields is None or not fields.strip():
+        return None
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = names.difference(RESPONSE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields {sorted(unknown)}; choose from {list(RESPONSE_FIELDS)}")
+    return tuple(name for name in RESPONSE_FIELDS if name in names)
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """``text`` cut to at most ``max_chars`` characters at a word boundary, with an ellipsis."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    # Back off to the last space unless that loses most of the text
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,.;:') + '…'
+
+
+def select_fields(record: dict, fields: Optional[Tuple[str, ...]], overview_chars: Optional[int]) -> dict:
+    """A movie record with only the selected fields and a truncated overview."""
+    if overview_chars is not None and record.get('overview'):
+        record = {**record, 'overview': truncate(record['overview'], overview_chars)}
+    if fields is not None:
+        record = {name: record[name] for name in fields}
+    return record
+
+
+class MovieFragments:
+    """Encoded JSON objects of movie records, per row, field selection and overview length."""
+
+    def __init__(self, movies: MovieStore, max_entries: int = FRAGMENT_CACHE_SIZE, max_bytes: int = FRAGMENT_CACHE_BYTES):
+        self.movies = movies
+        self._cache = LRUCache(max_entries, max_bytes, ttl=None)
+
+    def encode(
+        self,
+        rows: Sequence[int],
+        fields: Optional[Tuple[str, ...]] = None,
+        overview_chars: Optional[int] = None
+    ) -> bytes:
+        """JSON array of the records of ``rows``."""
+        fragments = [self._cache.get((row, fields, overview_chars)) for row in rows]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        if missing:
+            records = self.movies.records([rows[i] for i in missing])
+            for i, record in zip(missing, records):
+                fragment = fragments[i] = dumps(select_fields(record, fields, overview_chars))
+                self._cache.put((rows[i], fields, overview_chars), fragment, size=len(fragment))
+        return b'[' + b','.join(fragments) + b']'
+
+
+def encode_page(
+    fragments: MovieFragments,
+    response: dict,
+    fields: Optional[Tuple[str, ...]] = None,
+    overview_chars: Optional[int] = None
+) -> bytes:
+    """JSON body of a cached response dict whose ``recommended`` holds rows."""
+    body = b'{"recommended":' + fragments.encode(response['recommended'], fields, overview_chars)
+    rest = {key: value for key, value in response.items() if key != 'recommended'}
+    return body + (b',' + dumps(rest)[1:] if rest else b'}')
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """``'br'`` or ``'gzip'`` when the client accepts it, else None."""
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: equal bodies compress to equal bytes under the same tag
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+async def compress_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """Compress a streamed body, flushing after every chunk so lines are not held back."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        async for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison; tags of compressed variants carry a suffix
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        tag = tag[2:] if tag.startswith('W/') else tag
+        for suffix in ('-gzip"', '-br"'):
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)] + '"'
+        if tag == etag:
+            return True
+    return False
+
+
+def prepare_body(
+    body: bytes,
+    method: str,
+    if_none_match: Optional[str] = None,
+    accept_encoding: Optional[str] = None
+) -> Tuple[int, bytes, Dict[str, str]]:
+    """
+    Status, body and headers for a JSON body: a strong ETag, 304 without a
+    body for a matching conditional GET, compression when the body is
+    large and the client accepts it.
+    """
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    # Each encoding is its own representation and needs its own strong tag
+    headers['ETag'] = etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+    if method in ('GET', 'HEAD') and _etag_matches(if_none_match, etag):
+        return 304, b'', headers
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
@@ -0,0 +1,129 @@
+# backend/serving.py
+"""
+Bounded compute pool for the async FastAPI serving path.
+
+Similarity work runs on a dedicated, fixed-size thread pool; threads share
+the memory-mapped model, and the heavy kernels release the GIL: SciPy's
+sparse products (brute-force kNN, IVF rescoring), NumPy's BLAS product for
+LSA, ``argpartition``/``argsort`` and the vectorized gathers and sums of the
+posting-list scan. The scan's per-term Python loop and the response
+encoding do hold it. The pool admits at most ``max_workers + max_queue``
+tasks; beyond that callers get ``OverloadedError`` so the API can answer
+503 with a Retry-After estimate instead of letting latency grow without
+bound. Identical in-flight requests are coalesced: the first caller starts
+the computation and every later caller with the same key awaits it.
+
+Admission and coalescing state is only touched on the event loop thread,
+so no locks are needed.
+"""
+import asyncio
+import functools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+COMPUTE_WORKERS = int(os.environ.get('RECOMMEND_WORKERS', os.cpu_count() or 1))
+COMPUTE_MAX_QUEUE = int(os.environ.get('RECOMMEND_MAX_QUEUE', 64))
+
+
+class OverloadedError(Exception):
+    """Raised when the compute pool's queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Compute pool is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ComputePool:
+    """
+    Fixed-size executor with admission control and request coalescing.
+
+    Args:
+        max_workers: Threads running similarity work concurrently
+        max_queue: Tasks allowed to wait for a free worker
+    """
+
+    def __init__(self, max_workers: int = COMPUTE_WORKERS, max_queue: int = COMPUTE_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommend')
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._pending = 0
+        self._avg_seconds = 0.01  # EWMA of task duration, for Retry-After
+        self.counters = {'submitted': 0, 'coalesced': 0, 'rejected': 0}
+
+    @property
+    def pending(self) -> int:
+        """Tasks queued or running."""
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def retry_after(self) -> int:
+        # Time for the current backlog to drain, rounded up to whole seconds
+        return max(1, math.ceil(self._avg_seconds * self._pending / self.max_workers))
+
+    def check_admission(self):
+        if self._pending >= self.capacity:
+            self.counters['rejected'] += 1
+            raise OverloadedError(self.retry_after())
+
+    def _timed(self, fn: Callable, args: tuple) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * elapsed
+
+    def _task_done(self, key: Optional[Hashable], future: asyncio.Future):
+        self._pending -= 1
+        if key is not None and self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def run(self, fn: Callable, *args, key: Optional[Hashable] = None, admit: bool = True) -> Any:
+        """
+        Run ``fn(*args)`` on the pool and await the result.
+
+        Args:
+            key: Coalescing key; concurrent calls with an equal key share
+                one computation
+            admit: Apply the queue limit (continuation work for a request
+                that was already admitted passes False)
+
+        Raises:
+            OverloadedError: When admission is requested and the pool is full
+        """
+        if key is not None and key in self._inflight:
+            self.counters['coalesced'] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        if admit:
+            self.check_admission()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(self._timed, fn, args))
+        self._pending += 1
+        self.counters['submitted'] += 1
+        if key is not None:
+            self._inflight[key] = future
+        future.add_done_callback(functools.partial(self._task_done, key))
+        # shield: a disconnecting client must not cancel work others await
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'inflight_keys': len(self._inflight),
+            'avg_task_seconds': self._avg_seconds,
+            **self.counters,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
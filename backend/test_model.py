@@ -1,101 +1,61 @@
 #!/usr/bin/env python3
 """
-Test script for the Movie Recommendation System
+Smoke test for the Movie Recommendation System.
+
+Loads the model the same way the API does and runs a few titles through
+``recommendation.get_recommendations``. Run it with ``python test_model.py``;
+unit tests live in ``tests/`` (``python -m pytest``), timings in ``benchmark.py``.
 """
 
-import pickle
-import pandas as pd
-from sklearn.neighbors import NearestNeighbors
+from recommendation import get_recommendations, load_model_components
 
-def test_model_loading():
+def check_model_loading():
     """Test if all model components can be loaded successfully."""
     print("🧪 Testing model component loading...")
-    
+
     try:
-        # Load the dataframe
-        print("Loading dataframe...")
-        with open('dataframe', 'rb') as f:
-            df = pickle.load(f)
-        print(f"✅ DataFrame loaded successfully! Shape: {df.shape}")
-        
-        # Load the TF-IDF matrix
-        print("Loading TF-IDF matrix...")
-        with open('tfidf_matrix', 'rb') as f:
-            tfidf_matrix = pickle.load(f)
+        movies, tfidf_matrix, indices, nn_model, neighbor_table = load_model_components()
+        print(f"✅ Catalog loaded successfully! Movies: {len(movies)}")
         print(f"✅ TF-IDF matrix loaded successfully! Shape: {tfidf_matrix.shape}")
-        
-        # Load the indices
-        print("Loading indices...")
-        with open('indices', 'rb') as f:
-            indices = pickle.load(f)
-        print(f"✅ Indices loaded successfully! Length: {len(indices)}")
-        
-        # Create and fit the NearestNeighbors model
-        print("Fitting NearestNeighbors model...")
-        nn_model = NearestNeighbors(
-            n_neighbors=11,
-            metric='cosine',
-            algorithm='brute',
-            n_jobs=-1
-        )
-        nn_model.fit(tfidf_matrix)
-        print("✅ NearestNeighbors model fitted successfully!")
-        
-        return df, tfidf_matrix, indices, nn_model
-        
+        print(f"✅ Title index loaded successfully! Titles: {len(indices.keys())}")
+        print(f"✅ Similarity engine ready: {type(nn_model).__name__}")
+        if neighbor_table is not None:
+            print(f"✅ Neighbor table loaded (k={neighbor_table.k})")
+        return movies, tfidf_matrix, indices, nn_model, neighbor_table
+
     except Exception as e:
         print(f"❌ Error loading model components: {str(e)}")
-        return None, None, None, None
+        return None
 
-def test_recommendations(df, tfidf_matrix, indices, nn_model):
-    """Test the recommendation function with sample movies."""
+def check_recommendations(movies, tfidf_matrix, indices, nn_model, neighbor_table):
+    """Test the recommendation function with sample movies, including a typo."""
     print("\n🎬 Testing recommendation function...")
-    
+
     test_movies = [
         "The Godfather",
-        "Inception", 
+        "Inception",
         "Pulp Fiction",
-        "The Shawshank Redemption"
+        "The Shawshank Redemption",
+        "Incepton"
     ]
-    
+
     for movie in test_movies:
         try:
             print(f"\nTesting: {movie}")
-            
-            # Normalize the input title
-            key = movie.lower().strip()
-            
-            if key not in indices.index:
+            recommended, corrected = get_recommendations(
+                movie, movies, tfidf_matrix, indices, nn_model,
+                neighbor_table=neighbor_table, k=5
+            )
+            if recommended is None:
                 print(f"❌ Movie '{movie}' not found in database")
                 continue
-            
-            # Get the movie ID for the title
-            movie_id = indices[key]
-            
-            # Find the row index in the DataFrame
-            movie_row = df[df['id'] == movie_id]
-            if len(movie_row) == 0:
-                print(f"❌ Movie with ID {movie_id} not found in DataFrame")
-                continue
-            
-            row_idx = movie_row.index[0]
-            
-            # Get the TF-IDF vector for this movie
-            movie_vector = tfidf_matrix[row_idx]
-            
-            # Find the 11 nearest neighbors (including the movie itself)
-            distances, neighbor_indices = nn_model.kneighbors(movie_vector, return_distance=True)
-            
-            # Remove the first neighbor (it's the movie itself) and get the next 10
-            recommended_indices = neighbor_indices[0][1:6]  # Get first 5 recommendations
-            
-            # Get the recommended movie titles
-            recommended_movies = df.iloc[recommended_indices]['title'].tolist()
-            
-            print(f"✅ Found {len(recommended_movies)} recommendations:")
-            for i, rec in enumerate(recommended_movies, 1):
-                print(f"   {i}. {rec}")
-                
+            if corrected:
+                print(f"   (matched as '{corrected}')")
+
+            print(f"✅ Found {len(recommended)} recommendations:")
+            for i, rec in enumerate(recommended, 1):
+                print(f"   {i}. {rec['title']}")
+
         except Exception as e:
             print(f"❌ Error testing '{movie}': {str(e)}")
 
@@ -103,14 +63,12 @@ def main():
     """Main test function."""
     print("🎬 Movie Recommendation System - Model Test")
     print("=" * 50)
-    
-    # Test model loading
-    df, tfidf_matrix, indices, nn_model = test_model_loading()
-    
-    if df is not None:
-        # Test recommendations
-        test_recommendations(df, tfidf_matrix, indices, nn_model)
-        
+
+    components = check_model_loading()
+
+    if components is not None:
+        check_recommendations(*components)
+
         print("\n" + "=" * 50)
         print("✅ All tests completed successfully!")
         print("🚀 The model is ready to use with the Streamlit app!")
@@ -118,4 +76,4 @@ def main():
         print("\n❌ Model loading failed. Please check the model files.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
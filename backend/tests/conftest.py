@@ -0,0 +1,41 @@
+# backend/tests/conftest.py
+"""Shared fixtures: small random TF-IDF matrices and their brute-force cosine."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix, hstack, random as sparse_random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def tfidf_like(n_rows: int, n_terms: int = 3000, seed: int = 0) -> csr_matrix:
+    """
+    L2-normalized float32 CSR matrix shaped like a TF-IDF catalog: a long
+    tail of rare terms plus a few frequent "genre" columns, so posting
+    lists are long enough for pruning to kick in.
+    """
+    rng = np.random.default_rng(seed)
+    rare = sparse_random(n_rows, n_terms, density=0.01, random_state=rng, dtype=np.float32)
+    common = sparse_random(n_rows, 8, density=0.5, random_state=rng, dtype=np.float32)
+    matrix = hstack([common, rare]).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    return csr_matrix(matrix.multiply(1 / np.maximum(norms, 1e-12)[:, None]), dtype=np.float32)
+
+
+def brute_similarities(matrix, queries=None) -> np.ndarray:
+    """Dense cosine similarities of ``queries`` (default: every row) to every row."""
+    queries = matrix if queries is None else queries
+    return (queries @ matrix.T).toarray()
+
+
+def top_scores(sims: np.ndarray, k: int) -> np.ndarray:
+    """The ``k`` largest values of each row, best first."""
+    return -np.sort(-sims, axis=1)[:, :k]
+
+
+@pytest.fixture(scope='session')
+def matrix() -> csr_matrix:
+    return tfidf_like(600)
@@ -0,0 +1,50 @@
+# backend/tests/test_api.py
+"""Request validation of the API models (no model needs to be loaded)."""
+
+import pytest
+from pydantic import ValidationError
+
+import main
+
+
+def test_decades_are_normalized():
+    req = main.MovieRequest(title='Heat', decades=[' 1990S', '2000', '1985'])
+    assert req.decades == ['1990s', '2000s', '1980s']
+
+
+@pytest.mark.parametrize('options', [
+    {'decades': ['nineties']},
+    {'year_min': 2000, 'year_max': 1990},
+])
+def test_invalid_filters_are_rejected(options):
+    for model in (main.MovieRequest, main.SearchRequest):
+        with pytest.raises(ValidationError):
+            model(title='Heat', query='heist', **options)
+
+
+@pytest.mark.parametrize('movie_id', [-1, 2**63, 2**64])
+def test_ids_must_fit_in_64_bits(movie_id):
+    with pytest.raises(ValidationError):
+        main.MovieRequest(id=movie_id)
+    with pytest.raises(ValidationError):
+        main.SeedItem(id=movie_id)
+    with pytest.raises(ValidationError):
+        main.BatchItem(id=movie_id)
+    with pytest.raises(ValidationError):
+        main.MovieRequest(title='Heat', exclude_ids=[movie_id])
+    assert main.BatchItem(id=2**63 - 1).id == 2**63 - 1
+
+
+@pytest.mark.parametrize('token, headers', [
+    (None, {}),
+    (None, {'X-Reload-Token': ''}),
+    ('s3cret', {}),
+    ('s3cret', {'X-Reload-Token': 'guess'}),
+])
+def test_model_reload_needs_the_token(monkeypatch, token, headers):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, 'MODEL_RELOAD_TOKEN', token)
+    # No lifespan: the check must come before any reload is attempted
+    response = TestClient(main.app).post('/model/reload', headers=headers)
+    assert response.status_code == 403
@@ -0,0 +1,71 @@
+# backend/tests/test_cache.py
+"""Response cache limits and tiering."""
+
+import time
+
+from cache import LRUCache, SqliteCache, TieredCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, max_bytes=1000, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+
+
+def test_lru_byte_limit():
+    cache = LRUCache(max_entries=100, max_bytes=10, ttl=None)
+    cache.put('a', 'x', size=4)
+    cache.put('b', 'y', size=4)
+    cache.put('c', 'z', size=4)
+    assert cache.get('a') is None and cache.current_bytes == 8
+
+    # Values larger than the whole budget are not cached at all
+    cache.put('big', 'w', size=11)
+    assert cache.get('big') is None and len(cache) == 2
+
+    cache.put('b', 'y2', size=2)
+    assert cache.current_bytes == 6
+    cache.clear()
+    assert len(cache) == 0 and cache.current_bytes == 0
+
+
+def test_lru_sizes_values_by_encoding():
+    cache = LRUCache(max_entries=10, max_bytes=1000, ttl=None)
+    cache.put('k', {'title': 'Up'})
+    assert cache.current_bytes == len('{"title":"Up"}')
+
+
+def test_lru_ttl():
+    cache = LRUCache(max_entries=10, max_bytes=1000, ttl=0.05)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+    assert cache.get('a') is None and cache.current_bytes == 0
+
+
+def test_tiered_cache_counts_and_promotes(tmp_path):
+    path = str(tmp_path / 'shared.sqlite')
+    writer = TieredCache('v1', LRUCache(ttl=None), SqliteCache(path, 'v1'))
+    writer.put(('recommend', 'up'), {'recommended': [1, 2]})
+
+    reader = TieredCache('v1', LRUCache(ttl=None), SqliteCache(path, 'v1'))
+    assert reader.get_local(('recommend', 'up')) is None
+    assert reader.get(('recommend', 'up')) == {'recommended': [1, 2]}
+    assert reader.get(('recommend', 'up')) == {'recommended': [1, 2]}
+    assert reader.get(('recommend', 'cars')) is None
+
+    stats = reader.stats()
+    assert (stats['shared_hits'], stats['local_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_new_version_never_sees_old_entries(tmp_path):
+    path = str(tmp_path / 'shared.sqlite')
+    TieredCache('v1', LRUCache(ttl=None), SqliteCache(path, 'v1')).put(('k',), 'old')
+
+    assert TieredCache('v2', LRUCache(ttl=None), SqliteCache(path, 'v2')).get(('k',)) is None
@@ -0,0 +1,45 @@
+# backend/tests/test_dedup.py
+"""Near-duplicate clustering and collapsing of recommendation lists."""
+
+import numpy as np
+from scipy.sparse import vstack
+
+from conftest import tfidf_like
+from dedup import cluster_near_duplicates, cluster_sizes
+from recommendation import _dedupe
+
+
+def with_duplicates():
+    """Catalog where rows 20 and 30 copy row 10 (30 with one weight changed)."""
+    base = tfidf_like(60, seed=5)
+    reweighted = base[10].copy()
+    reweighted.data[0] *= 0.5
+    rows = [base[i] for i in range(60)]
+    rows[20], rows[30] = base[10], reweighted
+    return vstack(rows).tocsr()
+
+
+def test_planted_duplicates_share_a_cluster():
+    labels = cluster_near_duplicates(with_duplicates())
+
+    assert labels[10] == labels[20] == labels[30] == 10
+    others = np.setdiff1d(np.arange(60), [10, 20, 30])
+    np.testing.assert_array_equal(labels[others], others)
+    assert cluster_sizes(labels)[[10, 20, 30, 0]].tolist() == [3, 3, 3, 1]
+
+
+def test_short_rows_are_never_clustered():
+    matrix = with_duplicates()
+    labels = cluster_near_duplicates(matrix, min_terms=matrix.getnnz(axis=1).max() + 1)
+    np.testing.assert_array_equal(labels, np.arange(matrix.shape[0]))
+
+
+def test_dedupe_keeps_first_per_cluster():
+    clusters = np.array([0, 1, 1, 3, 0, 5])
+    np.testing.assert_array_equal(_dedupe([2, 4, 1, 0, 3], clusters), [2, 4, 3])
+
+
+def test_dedupe_drops_seed_clusters():
+    clusters = np.array([0, 1, 1, 3, 0, 5])
+    np.testing.assert_array_equal(_dedupe([2, 4, 5, 3], clusters, exclude=[1]), [4, 5, 3])
+    np.testing.assert_array_equal(_dedupe([2, 4], None, exclude=[1]), [2, 4])
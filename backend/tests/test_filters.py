@@ -0,0 +1,74 @@
+# backend/tests/test_filters.py
+"""CatalogFilters masks against plain numpy conditions."""
+
+import numpy as np
+import pytest
+
+from filters import CatalogFilters, parse_decade, split_genres
+
+GENRE_NAMES = ['Action', 'Drama', 'Comedy', 'Science Fiction', 'Horror']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    rng = np.random.default_rng(3)
+    n = 500
+    years = rng.integers(1950, 2025, n).astype(float)
+    years[rng.random(n) < 0.05] = np.nan
+    genres = [
+        ', '.join(rng.choice(GENRE_NAMES, rng.integers(0, 3), replace=False))
+        for _ in range(n)
+    ]
+    row_genres = [set(split_genres(g)) for g in genres]
+    return CatalogFilters(years, genres), years, row_genres
+
+
+def test_split_genres_and_parse_decade():
+    assert split_genres('Action, Science Fiction,') == ['action', 'science fiction']
+    assert parse_decade('1990s') == 1990
+    assert parse_decade(1997) == 1990
+    with pytest.raises(ValueError):
+        parse_decade('nineties')
+
+
+def test_no_filters_is_none(catalog):
+    filters, _, _ = catalog
+    assert filters.mask() is None
+
+
+def test_year_bounds(catalog):
+    filters, years, _ = catalog
+    with np.errstate(invalid='ignore'):
+        expected = (years >= 1980) & (years <= 1999)
+    np.testing.assert_array_equal(filters.mask(year_min=1980, year_max=1999), expected)
+
+
+def test_decades(catalog):
+    filters, years, _ = catalog
+    with np.errstate(invalid='ignore'):
+        expected = ((years >= 1960) & (years < 1970)) | ((years >= 2010) & (years < 2020))
+    np.testing.assert_array_equal(filters.mask(decades=['1960s', 2010]), expected)
+
+
+def test_genres(catalog):
+    filters, _, row_genres = catalog
+    expected = np.array([bool(g & {'drama', 'horror'}) and 'comedy' not in g for g in row_genres])
+    np.testing.assert_array_equal(filters.mask(genres=['Drama', 'horror '], exclude_genres=['Comedy']), expected)
+
+
+def test_unknown_genre_matches_nothing(catalog):
+    filters, _, _ = catalog
+    assert not filters.mask(genres=['western']).any()
+    assert filters.mask(exclude_genres=['western']).all()
+    assert filters.unknown_genres(['Western', ' drama ', 'Horor']) == ['Western', 'Horor']
+
+
+def test_exclude_rows_combines_with_other_filters(catalog):
+    filters, years, _ = catalog
+    only_rows = filters.mask(exclude_rows=[0, 5])
+    assert only_rows.sum() == len(years) - 2 and not only_rows[[0, 5]].any()
+
+    with np.errstate(invalid='ignore'):
+        expected = years >= 2000
+    expected[[1, 2]] = False
+    np.testing.assert_array_equal(filters.mask(year_min=2000, exclude_rows=[1, 2]), expected)
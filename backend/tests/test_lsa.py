@@ -0,0 +1,43 @@
+# backend/tests/test_lsa.py
+"""Saved LSA indexes are only served for the matrix they were fitted on."""
+
+import numpy as np
+import pytest
+from scipy.sparse import vstack
+
+from conftest import tfidf_like
+from lsa import LSAIndex, load_lsa_index, save_lsa_index
+from recommendation import build_similarity_engine
+
+
+@pytest.fixture(scope='module')
+def saved(tmp_path_factory, matrix):
+    path = str(tmp_path_factory.mktemp('lsa') / 'lsa.npz')
+    index = LSAIndex.fit(matrix, 32)
+    save_lsa_index(index, matrix, path)
+    return index, path
+
+
+def test_roundtrip(saved, matrix):
+    index, path = saved
+    loaded = load_lsa_index(matrix, path)
+    np.testing.assert_allclose(loaded.vectors, index.vectors)
+
+
+def test_same_row_count_other_matrix_is_rejected(saved, matrix):
+    _, path = saved
+    # One replaced row, as an incremental update leaves it
+    updated = vstack([matrix[:-1], tfidf_like(1, seed=9)]).tocsr()
+    assert updated.shape == matrix.shape
+
+    with pytest.raises(ValueError):
+        load_lsa_index(updated, path)
+
+
+def test_engine_falls_back_to_exact_search(saved, matrix, monkeypatch):
+    _, path = saved
+    monkeypatch.setattr('recommendation.LSA_PATH', path)
+    updated = vstack([matrix[:-1], tfidf_like(1, seed=9)]).tocsr()
+
+    assert isinstance(build_similarity_engine(matrix, engine='lsa'), LSAIndex)
+    assert not isinstance(build_similarity_engine(updated, engine='lsa'), LSAIndex)
@@ -0,0 +1,73 @@
+# backend/tests/test_neighbors.py
+"""Neighbor tables against brute-force cosine, including incremental patches."""
+
+import numpy as np
+from scipy.sparse import vstack
+
+from conftest import brute_similarities, tfidf_like, top_scores
+from neighbors import NeighborTable, build_neighbor_table, exact_neighbors, update_neighbor_table
+
+K = 10
+# Stored scores are float16
+ATOL = 2e-3
+
+
+def brute_table_scores(matrix, k: int) -> np.ndarray:
+    sims = brute_similarities(matrix)
+    np.fill_diagonal(sims, -np.inf)
+    return top_scores(sims, k)
+
+
+def assert_matches_brute_force(table: NeighborTable, matrix):
+    sims = brute_similarities(matrix)
+    np.testing.assert_allclose(table.scores.astype(np.float32), brute_table_scores(matrix, table.k), atol=ATOL)
+    rows = np.arange(len(table))[:, None]
+    assert (table.ids != rows).all()
+    np.testing.assert_allclose(sims[rows, table.ids], table.scores.astype(np.float32), atol=ATOL)
+
+
+def test_build_neighbor_table_matches_brute_force(matrix):
+    table = build_neighbor_table(matrix, k=K, n_jobs=1)
+    assert table.ids.shape == (matrix.shape[0], K)
+    assert_matches_brute_force(table, matrix)
+
+
+def test_build_neighbor_table_small_blocks(matrix):
+    table = build_neighbor_table(matrix, k=K, block_size=64, n_jobs=2)
+    assert_matches_brute_force(table, matrix)
+
+
+def test_exact_neighbors_matches_brute_force(matrix):
+    rows = np.array([0, 13, 599])
+    ids = exact_neighbors(matrix, rows, K)
+    sims = brute_similarities(matrix, matrix[rows])
+    sims[np.arange(len(rows)), rows] = -np.inf
+
+    assert (ids != rows[:, None]).all()
+    np.testing.assert_allclose(np.take_along_axis(sims, ids.astype(np.int64), axis=1), top_scores(sims, K), atol=1e-5)
+
+
+def test_update_neighbor_table_replaced_and_appended_rows(matrix):
+    old = matrix[:500]
+    table = build_neighbor_table(old, k=K, n_jobs=1)
+
+    replacements = tfidf_like(4, seed=7)
+    replaced = np.array([3, 50, 51, 499])
+    # Copy an existing row too, so old lists gain a near-perfect match
+    replacements = vstack([replacements[:3], matrix[[10]]]).tocsr()
+    updated = old.tolil()
+    updated[replaced] = replacements
+    updated = vstack([updated.tocsr(), matrix[500:]]).tocsr()
+
+    patched = update_neighbor_table(table, updated, replaced)
+
+    assert len(patched) == updated.shape[0]
+    assert_matches_brute_force(patched, updated)
+
+
+def test_update_neighbor_table_without_changes(matrix):
+    table = build_neighbor_table(matrix[:200], k=K, n_jobs=1)
+    patched = update_neighbor_table(table, matrix[:200], [])
+
+    np.testing.assert_array_equal(patched.ids, table.ids)
+    np.testing.assert_array_equal(patched.scores, table.scores)
@@ -0,0 +1,93 @@
+# backend/tests/test_postings.py
+"""PostingIndex and ExactIndex against brute-force cosine."""
+
+import numpy as np
+import pytest
+
+from conftest import brute_similarities, top_scores
+from neighbors import ExactIndex
+from postings import PostingIndex, SparseRows
+
+QUERIES = [0, 1, 17, 250, 599]
+
+
+@pytest.mark.parametrize('index_class', [PostingIndex, ExactIndex])
+@pytest.mark.parametrize('k', [1, 11, 40])
+def test_kneighbors_matches_brute_force(matrix, index_class, k):
+    queries = matrix[QUERIES]
+    distances, indices = index_class(matrix).kneighbors(queries, n_neighbors=k)
+    sims = brute_similarities(matrix, queries)
+
+    np.testing.assert_allclose(1 - distances, top_scores(sims, k), atol=1e-5)
+    # Ties may come in any order, but every id must carry its own score
+    np.testing.assert_allclose(np.take_along_axis(sims, indices, axis=1), 1 - distances, atol=1e-5)
+    assert (indices[:, 0] == QUERIES).all()
+
+
+@pytest.mark.parametrize('index_class', [PostingIndex, ExactIndex])
+def test_kneighbors_respects_mask(matrix, index_class):
+    rng = np.random.default_rng(1)
+    mask = rng.random(matrix.shape[0]) < 0.2
+    queries = matrix[QUERIES]
+    k = 15
+    distances, indices = index_class(matrix).kneighbors(queries, n_neighbors=k, mask=mask)
+    sims = brute_similarities(matrix, queries)
+    sims[:, ~mask] = -np.inf
+
+    assert mask[indices].all()
+    np.testing.assert_allclose(1 - distances, top_scores(sims, k), atol=1e-5)
+
+
+def test_kneighbors_pads_when_mask_allows_too_few(matrix):
+    mask = np.zeros(matrix.shape[0], dtype=bool)
+    mask[[3, 7]] = True
+    distances, indices = PostingIndex(matrix).kneighbors(matrix[[0]], n_neighbors=5, mask=mask)
+
+    assert set(indices[0, :2]) == {3, 7}
+    assert np.isinf(distances[0, 2:]).all()
+    assert len(set(indices[0])) == 5
+
+
+def test_kneighbors_pads_unrelated_rows_at_distance_one(matrix):
+    # A query on a single rare term matches only the few rows sharing it
+    column = 100
+    query = matrix[[0]].copy()
+    query.data[:] = 0
+    query.indices[0], query.data[0] = column, 1.0
+    query.eliminate_zeros()
+    sharing = np.diff(matrix.tocsc()[:, column].indptr).sum()
+    k = sharing + 5
+
+    distances, indices = PostingIndex(matrix).kneighbors(query, n_neighbors=k)
+
+    assert len(set(indices[0])) == k
+    np.testing.assert_allclose(distances[0, sharing:], 1.0)
+    np.testing.assert_allclose(1 - distances[0], top_scores(brute_similarities(matrix, query), k)[0], atol=1e-5)
+
+
+def test_sparse_rows_dot(matrix):
+    rows = np.array([5, 0, 599, 42, 42])
+    sparse_rows = SparseRows(matrix, rows)
+    query = matrix[9]
+
+    expected = brute_similarities(matrix[rows], query)[0]
+    np.testing.assert_allclose(sparse_rows.dot(query.indices, query.data), expected, atol=1e-6)
+    np.testing.assert_allclose(sparse_rows.dot_row(9), expected, atol=1e-6)
+
+
+def test_pruned_queries_stay_exact(matrix, monkeypatch):
+    pruned = []
+    prune = PostingIndex._prune
+
+    def recording_prune(self, *args):
+        result = prune(self, *args)
+        pruned.append(result is not None)
+        return result
+
+    monkeypatch.setattr(PostingIndex, '_prune', recording_prune)
+    queries = matrix[QUERIES]
+    distances, _ = PostingIndex(matrix).kneighbors(queries, n_neighbors=1)
+
+    # The fixture's frequent columns are long enough to be skipped
+    assert any(pruned)
+    np.testing.assert_allclose(1 - distances, top_scores(brute_similarities(matrix, queries), 1), atol=1e-5)
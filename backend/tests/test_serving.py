@@ -0,0 +1,75 @@
+# backend/tests/test_serving.py
+"""ComputePool admission control and coalescing, and the API's 503 mapping."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from serving import ComputePool, OverloadedError
+
+
+async def wait_for_pending(pool: ComputePool, n: int):
+    while pool.pending < n:
+        await asyncio.sleep(0.001)
+
+
+def test_full_pool_rejects_new_work():
+    async def scenario():
+        pool = ComputePool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        busy = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await wait_for_pending(pool, 2)
+
+        with pytest.raises(OverloadedError) as overloaded:
+            await pool.run(sum, [1, 2])
+        assert overloaded.value.retry_after >= 1
+        # Continuation work of admitted requests still runs
+        follow_up = asyncio.ensure_future(pool.run(sum, [1, 2], admit=False))
+
+        release.set()
+        await asyncio.gather(*busy)
+        assert await follow_up == 3
+        assert await pool.run(sum, [1, 2]) == 3
+        assert pool.counters['rejected'] == 1 and pool.pending == 0
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_equal_keys_share_one_computation():
+    async def scenario():
+        pool = ComputePool(max_workers=2, max_queue=0)
+        release = threading.Event()
+        calls = []
+
+        def work(value):
+            calls.append(value)
+            release.wait()
+            return value * 2
+
+        # Coalesced callers do not count against the queue limit
+        first = [asyncio.ensure_future(pool.run(work, 21, key='k')) for _ in range(3)]
+        other = asyncio.ensure_future(pool.run(work, 1, key='other'))
+        await wait_for_pending(pool, 2)
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await asyncio.gather(*first) == [42, 42, 42]
+        assert await other == 2
+        assert sorted(calls) == [1, 21]
+        assert pool.counters['coalesced'] == 2 and pool.stats()['inflight_keys'] == 0
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_api_answers_503_with_retry_after():
+    import main
+
+    response = asyncio.run(main.overloaded_handler(None, OverloadedError(7)))
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
+    assert json.loads(response.body) == {'detail': 'Server is busy, please retry'}
@@ -0,0 +1,43 @@
+# backend/tests/test_title_index.py
+"""Title and release-year resolution."""
+
+import numpy as np
+import pytest
+
+from title_index import TitleIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    titles = ['Dune', 'Heat', 'Dune', 'Nosferatu (1922)', 'Solaris', 'Solaris']
+    years = [2021, 1995, 1984, 1922, np.nan, np.nan]
+    return TitleIndex(titles, [10, 11, 12, 13, 14, 15], years)
+
+
+def test_resolve_prefers_first_row(index):
+    assert index.resolve('dune') == 0
+    assert index.resolve('  DUNE ') == 0
+    assert index.resolve('Blade Runner') is None
+
+
+def test_resolve_by_year(index):
+    assert index.resolve('Dune', 1984) == 2
+    assert index.resolve('Dune (1984)') == 2
+    assert index.resolve('Dune', 1999) is None
+    assert index.unmatched_years('Dune', 1999) == [1984, 2021]
+    assert index.unmatched_years('Dune', 1984) is None
+
+
+def test_literal_title_with_year_suffix(index):
+    assert index.split_year('Nosferatu (1922)') == ('nosferatu (1922)', None)
+    assert index.resolve('Nosferatu (1922)') == 3
+
+
+def test_unknown_years_cannot_reject(index):
+    assert index.resolve('Solaris', 1972) == 4
+    assert index.unmatched_years('Solaris', 1972) is None
+
+
+def test_ids(index):
+    assert index.row_for_id(12) == 2 and index.id_for_row(2) == 12
+    assert index.row_for_id(99) is None
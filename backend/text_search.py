@@ -0,0 +1,111 @@
+# backend/text_search.py
+"""
+Free-text queries ("heist movie in space") in the frozen TF-IDF space.
+
+A query is turned into a soup the way a movie is: the lowercased words
+stand in for genres and keywords, followed by the text cleaned and stemmed
+with ``clean_and_stem_overview``. ``QueryVectorizer`` then reproduces the
+fitted TfidfVectorizer (token pattern, stop words, unigrams and bigrams,
+counts x IDF, L2 norm) from the vocabulary, IDF weights and stop words
+stored with the artifacts, so queries land in the catalog's feature space
+without a fitted vectorizer. Creating the vectorizer imports neither nltk
+nor scikit-learn, so model loads stay fast: the Porter stemmer (nltk, about
+two seconds to import) is loaded by the first search, and scikit-learn's
+stop word list only for artifacts built before stop words were stored.
+Stems are memoized, so a query of known words costs dict lookups rather
+than Porter stemming.
+"""
+import re
+from collections import Counter
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from artifacts import ARTIFACT_DIR, ModelArtifacts, artifacts_exist, load_artifacts, manifest_version
+from preprocessing import TFIDF_PARAMS, CachedStemmer, clean_and_stem_overview
+
+# TfidfVectorizer's default token_pattern
+_TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+# Distinct query words whose stems are memoized
+STEM_CACHE_SIZE = 100_000
+
+
+def query_soup(text: str, stemmer: Optional[CachedStemmer] = None) -> str:
+    """TF-IDF input for free text: raw words (genre/keyword terms) + stemmed words (overview terms)."""
+    return text.lower().strip() + ' ' + clean_and_stem_overview(text, stemmer)
+
+
+class QueryVectorizer:
+    """
+    ``TfidfVectorizer.transform`` for single queries, from the stored
+    vocabulary (terms in column order), IDF weights and stop words.
+    """
+
+    def __init__(self, terms: Sequence[str], idf: np.ndarray, stop_words: Optional[Iterable[str]] = None):
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self._stop_words = None if stop_words is None else frozenset(stop_words)
+        self.ngram_range = TFIDF_PARAMS['ngram_range']
+        self.stemmer = CachedStemmer(max_size=STEM_CACHE_SIZE)
+
+    @classmethod
+    def from_artifacts(cls, artifacts: ModelArtifacts) -> Optional['QueryVectorizer']:
+        """None when the artifacts carry no vocabulary (converted pickles)."""
+        if artifacts.vocabulary is None or artifacts.idf is None:
+            return None
+        stop_words = artifacts.stop_words
+        return cls(artifacts.vocabulary.tolist(), artifacts.idf, None if stop_words is None else stop_words.tolist())
+
+    @property
+    def stop_words(self) -> frozenset:
+        if self._stop_words is None:
+            # Built before the stop words were stored; TFIDF_PARAMS uses
+            # scikit-learn's English list
+            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+            self._stop_words = frozenset(ENGLISH_STOP_WORDS)
+        return self._stop_words
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vocabulary)
+
+    def analyze(self, soup: str) -> List[str]:
+        """Terms of a soup, as TfidfVectorizer's word analyzer produces them."""
+        tokens = [token for token in _TOKEN_PATTERN.findall(soup.lower()) if token not in self.stop_words]
+        low, high = self.ngram_range
+        terms = list(tokens) if low == 1 else []
+        for n in range(max(low, 2), min(high, len(tokens)) + 1):
+            terms.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def transform(self, text: str) -> csr_matrix:
+        """One L2-normalized float32 TF-IDF row for free text (all zero if no term is known)."""
+        vocabulary = self.vocabulary
+        counts = Counter(
+            vocabulary[term] for term in self.analyze(query_soup(text, self.stemmer)) if term in vocabulary
+        )
+        indices = np.fromiter(sorted(counts), dtype=np.int32, count=len(counts))
+        data = np.fromiter((counts[i] for i in indices.tolist()), dtype=np.float64, count=len(counts))
+        data *= self.idf[indices]
+        norm = np.sqrt(np.dot(data, data))
+        if norm > 0:
+            data /= norm
+        return csr_matrix(
+            (data.astype(np.float32), indices, np.array([0, len(indices)])), shape=(1, self.n_features)
+        )
+
+
+def load_query_vectorizer(version: str, path: str = ARTIFACT_DIR) -> Optional[QueryVectorizer]:
+    """
+    The query vectorizer of the artifact directory, if it is still model
+    ``version`` and stores a vocabulary; None otherwise (pickled models
+    have no vocabulary).
+    """
+    if not artifacts_exist(path):
+        return None
+    artifacts = load_artifacts(path)
+    # A newer version is picked up by the next reload as a whole
+    if artifacts.version != manifest_version(version):
+        return None
+    return QueryVectorizer.from_artifacts(artifacts)
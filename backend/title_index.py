@@ -0,0 +1,136 @@
+# backend/title_index.py
+"""
+Constant-time lookups between normalized titles, TMDB ids and row positions.
+
+Built once at load time so the request path never scans the DataFrame.
+Titles shared by several movies (remakes, same-named films) keep every
+row; callers disambiguate with a release year, either passed explicitly or
+written as a trailing ``"(1998)"`` in the title. A year that none of the
+same-titled movies was released in resolves to nothing rather than to the
+most popular of them.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fuzzy import FuzzyMatcher
+
+_YEAR_SUFFIX = re.compile(r'^(.*?)\s*\((\d{4})\)$')
+
+
+def normalize_title(title: str) -> str:
+    """Normalization used for every title key (matches ``indices.pkl``)."""
+    return str(title).lower().strip()
+
+
+class TitleIndex:
+    """
+    Maps normalized title -> row positions, TMDB id -> row position and
+    row position -> TMDB id.
+
+    Rows sharing a title are kept in catalog order, which is popularity
+    order for the notebook-built catalog, so the default pick for an
+    ambiguous title is the most popular one.
+    """
+
+    def __init__(self, titles: Sequence[str], ids: Sequence[int], years: Optional[Sequence] = None):
+        self.ids = np.asarray(ids)
+        self.years = None if years is None else np.asarray(years, dtype=np.float64)
+
+        by_title: Dict[str, List[int]] = {}
+        for row, title in enumerate(titles):
+            by_title.setdefault(normalize_title(title), []).append(row)
+        self._rows_by_title: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in by_title.items()}
+        self._row_by_id: Dict[int, int] = {int(movie_id): row for row, movie_id in enumerate(self.ids.tolist())}
+        self._keys = list(self._rows_by_title)
+        # Typo tolerance for titles that miss (see fuzzy.py)
+        self.fuzzy = FuzzyMatcher(self._keys)
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'TitleIndex':
+        years = df['release_year'].to_numpy(dtype=np.float64, na_value=np.nan) if 'release_year' in df else None
+        return cls(df['title'].tolist(), df['id'].to_numpy(), years)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, title: str) -> bool:
+        return normalize_title(title) in self._rows_by_title
+
+    def keys(self) -> List[str]:
+        """Distinct normalized titles."""
+        return self._keys
+
+    def rows_for_title(self, title: str) -> Tuple[int, ...]:
+        return self._rows_by_title.get(normalize_title(title), ())
+
+    def is_ambiguous(self, title: str) -> bool:
+        return len(self.rows_for_title(title)) > 1
+
+    def row_for_id(self, movie_id: int) -> Optional[int]:
+        return self._row_by_id.get(int(movie_id))
+
+    def id_for_row(self, row: int) -> int:
+        return int(self.ids[row])
+
+    def year_for_row(self, row: int) -> Optional[int]:
+        if self.years is None or np.isnan(self.years[row]):
+            return None
+        return int(self.years[row])
+
+    def split_year(self, title: str, year: Optional[int] = None) -> Tuple[str, Optional[int]]:
+        """
+        ``(title, year)`` with a trailing ``"(YYYY)"`` moved into the year,
+        unless the literal title is in the catalog or ``year`` is given.
+        """
+        key = normalize_title(title)
+        if key in self._rows_by_title:
+            return key, year
+        match = _YEAR_SUFFIX.match(key)
+        if not match:
+            return key, year
+        return match.group(1), int(match.group(2)) if year is None else year
+
+    def _lookup(self, title: str, year: Optional[int]) -> Tuple[Tuple[int, ...], Optional[int]]:
+        """Rows for a title and the requested year (see ``split_year``)."""
+        title, year = self.split_year(title, year)
+        return self.rows_for_title(title), year
+
+    def resolve(self, title: str, year: Optional[int] = None) -> Optional[int]:
+        """
+        Row position for a title, or None if it is not in the catalog.
+
+        Args:
+            title: Title as typed; a trailing ``"(YYYY)"`` is used as the
+                year when the literal title is unknown
+            year: Release year used to pick between same-titled movies
+
+        Returns:
+            The first (most popular) row with that title and year; None
+            when a year is given and none of the title's movies has it
+            (see ``unmatched_years``)
+        """
+        rows, year = self._lookup(title, year)
+        if not rows:
+            return None
+        if year is None or self.years is None:
+            return rows[0]
+        years = self.years[list(rows)]
+        matching = np.flatnonzero(years == year)
+        if len(matching):
+            return rows[matching[0]]
+        # Movies of unknown year cannot be told apart by year
+        if np.isnan(years).all():
+            return rows[0]
+        return None
+
+    def unmatched_years(self, title: str, year: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Release years of the title's movies when the title is known but the
+        requested year matches none of them; None otherwise.
+        """
+        rows, year = self._lookup(title, year)
+        if not rows or year is None or self.resolve(title, year) is not None:
+            return None
+        return sorted({y for y in (self.year_for_row(row) for row in rows) if y is not None})
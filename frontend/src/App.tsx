@@ -57,9 +57,9 @@ function App() {
 
     try {
       const apiUrl = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000'
-      const response = await axios.post(`${apiUrl}/recommend`, {
-        title: movie,
-        similarity_threshold: threshold
+      // GET lets the browser revalidate with the ETag; cards show 120 characters of overview
+      const response = await axios.get(`${apiUrl}/recommend`, {
+        params: { title: movie, similarity_threshold: threshold, overview_chars: 120 }
       })
       
       setResults(response.data.recommended)